@@ -0,0 +1,271 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from arrears import aging_report
+from change_cache import cached, table_versions
+from database import db_conn
+from ledger import ensure_current
+from payment_history import PAGE_SIZE, fetch_page, totals
+from settlement import allocate, compute_settlement, load_expenses, load_landlord, load_tenant, load_tenants_for_year
+
+# Lokale JSON-API (nur lesend) neben der Streamlit-Oberfläche, z.B. für die
+# Buchhaltungs-Synchronisation oder eine Anzeige in der Hausautomation.
+#
+# Jede Antwort trägt ein ETag aus den Änderungszählern der benutzten Tabellen
+# (table_change_counters, Migration 0005/0008), der Epoche der Datenbank (neu
+# nach jedem Restore) und der Adresse. Schickt der Client
+# es als If-None-Match zurück und hat sich nichts geändert, antwortet die API
+# mit 304, ohne die Daten zu laden. Abrechnungen werden zusätzlich über
+# change_cache im Speicher gehalten.
+#
+# Start:  python api.py  (Standard 127.0.0.1:8502; API_TOKEN setzt ein Bearer-Token)
+#
+#   GET /api/tenants                         Mieter mit Wohnung
+#   GET /api/tenants/<id>                    ein Mieter
+#   GET /api/tenants/<id>/ledger?jahr=2025   Mieterkonto je Monat (Soll, Ist, Saldo)
+#   GET /api/ledger?monat=2025-06            Mieterkonto aller Mieter in einem Monat
+#   GET /api/payments?mieter=&von=&bis=&typ=&nach=&limit=
+#                                            Zahlungen, neueste zuerst; "nach" aus "next"
+#   GET /api/settlements/<jahr>?mieter=<id>  Nebenkostenabrechnungen
+#   GET /api/arrears?stichtag=2025-06-30     Rückstände nach Alter
+
+HOST = os.environ.get("API_HOST", "127.0.0.1")
+PORT = int(os.environ.get("API_PORT", "8502"))
+TOKEN = os.environ.get("API_TOKEN", "")
+MAX_LIMIT = 500
+
+_log = logging.getLogger("hausverwaltung.api")
+
+
+class NotFound(Exception):
+    pass
+
+
+def _param(query, name, typ=str, default=None):
+    # Ungültige Werte -> ValueError -> 400
+    werte = query.get(name)
+    if not werte or werte[0] == "":
+        return default
+    return typ(werte[0])
+
+
+def _monat(text):
+    return datetime.strptime(text, "%Y-%m").date()
+
+
+def _tenants(conn, match, query):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT t.id, t.first_name, t.last_name, t.apartment_id, a.unit_name, t.move_in, t.move_out,
+               t.occupants, t.base_rent, t.monthly_prepayment
+        FROM tenants t
+        LEFT JOIN apartments a ON a.id = t.apartment_id
+        WHERE %(id)s IS NULL OR t.id = %(id)s
+        ORDER BY t.last_name, t.first_name, t.id
+    """, {"id": int(match["id"]) if match.get("id") else None})
+    spalten = [d[0] for d in cur.description]
+    rows = [dict(zip(spalten, r)) for r in cur.fetchall()]
+    cur.close()
+    if match.get("id"):
+        if not rows:
+            raise NotFound(f"Mieter {match['id']} nicht gefunden")
+        return rows[0]
+    return rows
+
+
+def _ledger_rows(conn, where, params):
+    # Neuer Monat für laufende Mietverhältnisse (schreibt nur einmal je Monat)
+    ensure_current(conn)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT l.tenant_id, t.first_name, t.last_name, l.month, l.active, l.soll, l.ist, l.balance
+        FROM tenant_ledger_monthly l
+        JOIN tenants t ON t.id = l.tenant_id
+        WHERE {where}
+        ORDER BY l.month, t.last_name, l.tenant_id
+    """, params)
+    spalten = [d[0] for d in cur.description]
+    rows = [dict(zip(spalten, r)) for r in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def _tenant_ledger(conn, match, query):
+    jahr = _param(query, "jahr", int, date.today().year)
+    return _ledger_rows(conn, "l.tenant_id = %s AND l.month >= %s AND l.month < %s",
+                        (int(match["id"]), date(jahr, 1, 1), date(jahr + 1, 1, 1)))
+
+
+def _ledger(conn, match, query):
+    monat = _param(query, "monat", _monat, date.today().replace(day=1))
+    return _ledger_rows(conn, "l.month = %s", (monat,))
+
+
+def _payments(conn, match, query):
+    filters = {
+        "tenant_id": _param(query, "mieter", int),
+        "date_from": _param(query, "von", date.fromisoformat),
+        "date_to": _param(query, "bis", date.fromisoformat),
+        "payment_type": _param(query, "typ"),
+    }
+    limit = min(_param(query, "limit", int, PAGE_SIZE), MAX_LIMIT)
+    after = _param(query, "nach")
+    if after is not None:
+        # Format wie "next": <Datum>,<id>
+        datum, p_id = after.split(",")
+        after = (date.fromisoformat(datum), int(p_id))
+    rows, next_after = fetch_page(conn, filters, after, limit)
+    count, summe = totals(conn, filters)
+    spalten = ["id", "payment_date", "tenant_id", "first_name", "last_name", "amount", "payment_type", "note"]
+    return {
+        "count": count, "total": summe,
+        "payments": [dict(zip(spalten, r)) for r in rows],
+        "next": f"{next_after[0].isoformat()},{next_after[1]}" if next_after else None,
+    }
+
+
+def _settlements(conn, match, query):
+    jahr = int(match["jahr"])
+    t_id = _param(query, "mieter", int)
+    cur = conn.cursor()
+    try:
+        haus = load_landlord(cur, jahr=jahr)
+        if t_id is not None:
+            mieter = load_tenant(cur, t_id)
+            if not mieter:
+                raise NotFound(f"Mieter {t_id} nicht gefunden")
+            return compute_settlement(mieter, haus, load_expenses(cur, jahr, t_id), jahr)
+        return allocate(load_tenants_for_year(cur, jahr), haus, load_expenses(cur, jahr), jahr)
+    finally:
+        cur.close()
+
+
+def _arrears(conn, match, query):
+    rows, summen = aging_report(conn, _param(query, "stichtag", date.fromisoformat))
+    return {"tenants": rows, "totals": summen}
+
+
+# (Pfad, Tabellen für ETag/Cache, Funktion, hängt vom heutigen Datum ab, im Speicher halten)
+ROUTES = [
+    (r"/api/tenants", ("tenants", "apartments"), _tenants, False, False),
+    (r"/api/tenants/(?P<id>\d+)", ("tenants", "apartments"), _tenants, False, False),
+    (r"/api/tenants/(?P<id>\d+)/ledger", ("tenants", "payments"), _tenant_ledger, True, False),
+    (r"/api/ledger", ("tenants", "payments"), _ledger, True, False),
+    (r"/api/payments", ("payments", "tenants"), _payments, False, False),
+    (r"/api/settlements/(?P<jahr>\d{4})", ("tenants", "apartments", "operating_expenses", "landlord_settings"),
+     _settlements, False, True),
+    (r"/api/arrears", ("payments", "tenants", "apartments"), _arrears, True, False),
+]
+ROUTES = [(re.compile(muster + r"/?"), *rest) for muster, *rest in ROUTES]
+
+
+def _json_default(obj):
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"{type(obj).__name__} nicht serialisierbar")
+
+
+def _dumps(data):
+    return json.dumps(data, default=_json_default, ensure_ascii=False).encode("utf-8")
+
+
+def make_etag(url, versions, heute=None):
+    """ETag aus Adresse, Tabellenversionen und ggf. dem Tagesdatum."""
+    roh = f"{url}|{','.join(map(str, versions))}|{heute or ''}"
+    return '"' + hashlib.sha1(roh.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "Hausverwaltung-API/1"
+
+    def _send(self, status, body=b"", etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            # Immer nachfragen, aber die Antwort darf gespeichert werden
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304 and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status, text):
+        self._send(status, _dumps({"error": text}))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        if TOKEN and not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {TOKEN}"):
+            return self._error(401, "Token fehlt oder ist falsch")
+        url = urlsplit(self.path)
+        for muster, tabellen, funktion, tagesabhaengig, speichern in ROUTES:
+            match = muster.fullmatch(url.path)
+            if match:
+                break
+        else:
+            return self._error(404, "Unbekannter Pfad")
+
+        query = parse_qs(url.query)
+        heute = date.today() if tagesabhaengig else None
+        try:
+            with db_conn() as conn:
+                if not conn:
+                    return self._error(503, "Keine Datenbankverbindung")
+                # Nur die Änderungszähler lesen (ein Primärschlüssel-Zugriff)
+                etag = make_etag(self.path, table_versions(conn, tabellen), heute)
+                if etag in self.headers.get("If-None-Match", ""):
+                    return self._send(304, etag=etag)
+                args = match.groupdict()
+                if speichern:
+                    body = cached(conn, ("api", self.path), tabellen, lambda c: _dumps(funktion(c, args, query)))
+                else:
+                    body = _dumps(funktion(conn, args, query))
+        except NotFound as e:
+            return self._error(404, str(e))
+        except ValueError as e:
+            return self._error(400, f"Ungültiger Parameter: {e}")
+        except Exception as e:
+            _log.exception("Fehler bei %s", self.path)
+            return self._error(500, str(e))
+        self._send(200, body, etag)
+
+    def log_message(self, format, *args):
+        _log.info("%s - %s", self.address_string(), format % args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokale JSON-API (nur lesend) mit ETags")
+    parser.add_argument("--host", default=HOST, help=f"Adresse (Standard: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Port (Standard: {PORT})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    server.daemon_threads = True
+    print(f"🌐 API läuft auf http://{args.host}:{args.port}/api/" + (" (Token erforderlich)" if TOKEN else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,66 @@
 import streamlit as st
-import psycopg2
 import pandas as pd
 from datetime import datetime
+from database import db_conn
+from ledger import ensure_current, open_items, month_income, MONATE_DE
+from arrears import BUCKETS, aging_report
 
 # --- 1. KONFIGURATION ---
 st.set_page_config(page_title="Hausverwaltung Dashboard", layout="wide")
 
-def get_conn():
-    conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-    conn.set_client_encoding('UTF8')
-    return conn
-
 st.title("📊 Immobilien-Dashboard")
 
 # --- 2. DATEN LADEN ---
-current_month, current_year = datetime.now().month, datetime.now().year
-conn = get_conn()
-cur = conn.cursor()
-
-# Einnahmen
-cur.execute("SELECT SUM(amount) FROM payments WHERE period_month = %s AND period_year = %s", (current_month, current_year))
-total_income = cur.fetchone()[0] or 0.0
-
-# Leerstand
-cur.execute("SELECT COUNT(*) FROM apartments WHERE id NOT IN (SELECT apartment_id FROM tenants WHERE moved_out IS NULL)")
-vacant_count = cur.fetchone()[0]
-
-# Metriken anzeigen
-col1, col2 = st.columns(2)
-col1.metric("Einnahmen (Feb. 2026)", f"{total_income:.2f} Euro")
-col2.metric("Freie Wohnungen", vacant_count)
-
-st.divider()
-
-# Offene Posten
-st.subheader("⚠️ Offene Mieten")
-query = """
-    SELECT t.last_name as Mieter, a.unit_name as Wohnung, a.base_rent as Soll, 
-           COALESCE(SUM(p.amount), 0) as Gezahlt,
-           (a.base_rent - COALESCE(SUM(p.amount), 0)) as Differenz
-    FROM tenants t
-    JOIN apartments a ON t.apartment_id = a.id
-    LEFT JOIN payments p ON t.id = p.tenant_id AND p.period_month = %s AND p.period_year = %s
-    WHERE t.moved_out IS NULL
-    GROUP BY t.id, t.last_name, a.unit_name, a.base_rent
-    HAVING COALESCE(SUM(p.amount), 0) < a.base_rent;
-"""
-df_debtors = pd.read_sql(query, conn, params=(current_month, current_year))
-
-if not df_debtors.empty:
-    # Hier der Fix für die Terminal-Warnung (width="stretch")
-    st.dataframe(df_debtors, width="stretch")
-else:
-    st.success("Alle Mieten für Februar 2026 sind eingegangen.")
-
-conn.close()
\ No newline at end of file
+now = datetime.now()
+monat_text = f"{MONATE_DE[now.month - 1]} {now.year}"
+with db_conn() as conn:
+    if not conn:
+        st.error("❌ Keine Datenbankverbindung möglich.")
+        st.stop()
+    cur = conn.cursor()
+
+    # Neuer Monat? Dann Soll-Zeilen im Mieterkonto ergänzen
+    ensure_current(conn)
+
+    # Einnahmen (aus dem vorberechneten Mieterkonto)
+    total_income = month_income(conn)
+
+    # Leerstand
+    cur.execute("""
+        SELECT COUNT(*) FROM apartments a
+        WHERE NOT EXISTS (SELECT 1 FROM tenants t WHERE t.apartment_id = a.id AND t.move_out IS NULL)
+    """)
+    vacant_count = cur.fetchone()[0]
+
+    # Metriken anzeigen
+    col1, col2 = st.columns(2)
+    col1.metric(f"Einnahmen ({monat_text})", f"{total_income:.2f} Euro")
+    col2.metric("Freie Wohnungen", vacant_count)
+
+    st.divider()
+
+    # Offene Posten: Soll = Kaltmiete + NK-Vorauszahlung des Mieters
+    st.subheader("⚠️ Offene Mieten")
+    df_debtors = pd.DataFrame(open_items(conn), columns=["Vorname", "Mieter", "Wohnung", "Soll", "Gezahlt", "Differenz", "Kontosaldo"])
+
+    if not df_debtors.empty:
+        # Hier der Fix für die Terminal-Warnung (width="stretch")
+        st.dataframe(df_debtors.drop(columns=["Vorname"]), width="stretch")
+    else:
+        st.success(f"Alle Mieten für {monat_text} sind eingegangen.")
+
+    st.divider()
+
+    # Altersstruktur aller Rückstände (alle Monate und Jahre, ein SQL-Durchlauf)
+    st.subheader("⏳ Rückstände nach Alter")
+    aging_rows, aging_totals = aging_report(conn)
+    cols = st.columns(len(BUCKETS) + 1)
+    for col, stufe in zip(cols, BUCKETS):
+        col.metric(stufe, f"{aging_totals[stufe]:.2f} €")
+    cols[-1].metric("Gesamt", f"{aging_totals['gesamt']:.2f} €")
+
+    if aging_rows:
+        df_aging = pd.DataFrame(aging_rows).drop(columns=["tenant_id"]).rename(columns={
+            "name": "Mieter", "wohnung": "Wohnung", "gesamt": "Gesamt", "aelteste": "Älteste Forderung"
+        })
+        st.dataframe(df_aging, width="stretch", hide_index=True)
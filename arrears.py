@@ -0,0 +1,91 @@
+from datetime import date
+
+# Altersstruktur der Mietrückstände (offene Posten) für alle Mieter.
+#
+# Je Mieter wird mit generate_series die Reihe der Monats-Sollstellungen über
+# das Mietverhältnis erzeugt (Soll = Kaltmiete + NK-Vorauszahlung des Mieters,
+# fällig zum Monatsersten). Die Zahlungen bis zum Stichtag werden per
+# Fensterfunktion gegen die laufende Soll-Summe verrechnet, älteste Forderung
+# zuerst. Was übrig bleibt, wird nach Alter in Tagen auf die Stufen verteilt.
+# Alles in einer Abfrage, inkl. Summenzeile über den ganzen Bestand.
+
+BUCKETS = ["0-30 Tage", "31-60 Tage", "61-90 Tage", "über 90 Tage"]
+
+AGING_SQL = """
+    WITH t AS (
+        SELECT id, first_name, last_name, apartment_id, move_in, move_out,
+               COALESCE(base_rent, 0) + COALESCE(monthly_prepayment, 0) AS soll_monat
+        FROM tenants
+        WHERE move_in IS NULL OR move_in <= %(stichtag)s
+    ),
+    charges AS (
+        SELECT t.id AS tenant_id, m::date AS due, t.soll_monat AS soll
+        FROM t
+        CROSS JOIN LATERAL generate_series(
+            date_trunc('month', COALESCE(t.move_in, %(stichtag)s)),
+            date_trunc('month', LEAST(COALESCE(t.move_out, %(stichtag)s), %(stichtag)s)),
+            INTERVAL '1 month') m
+        WHERE t.soll_monat > 0
+          -- Aktiv-Regel wie im Mieterkonto: Einzug bis zum 28., Auszug nicht vor dem Monatsersten
+          AND (t.move_in IS NULL OR t.move_in <= m::date + 27)
+          AND (t.move_out IS NULL OR t.move_out >= m::date)
+    ),
+    paid AS (
+        SELECT tenant_id, SUM(amount) AS paid
+        FROM payments
+        WHERE payment_date <= %(stichtag)s AND tenant_id IS NOT NULL
+        GROUP BY tenant_id
+    ),
+    netted AS (
+        SELECT c.tenant_id, c.due, c.soll,
+               SUM(c.soll) OVER (PARTITION BY c.tenant_id ORDER BY c.due) AS cum_soll,
+               COALESCE(p.paid, 0) AS paid
+        FROM charges c
+        LEFT JOIN paid p ON p.tenant_id = c.tenant_id
+    ),
+    offen AS (
+        SELECT tenant_id, due, LEAST(soll, cum_soll - paid) AS betrag, %(stichtag)s - due AS tage
+        FROM netted
+        WHERE cum_soll > paid
+    )
+    SELECT t.id, t.first_name, t.last_name, a.unit_name,
+           COALESCE(SUM(o.betrag) FILTER (WHERE o.tage <= 30), 0),
+           COALESCE(SUM(o.betrag) FILTER (WHERE o.tage BETWEEN 31 AND 60), 0),
+           COALESCE(SUM(o.betrag) FILTER (WHERE o.tage BETWEEN 61 AND 90), 0),
+           COALESCE(SUM(o.betrag) FILTER (WHERE o.tage > 90), 0),
+           SUM(o.betrag), MIN(o.due), GROUPING(t.id)
+    FROM offen o
+    JOIN t ON t.id = o.tenant_id
+    LEFT JOIN apartments a ON a.id = t.apartment_id
+    GROUP BY GROUPING SETS ((t.id, t.first_name, t.last_name, a.unit_name), ())
+    ORDER BY GROUPING(t.id), SUM(o.betrag) DESC
+"""
+
+
+def aging_report(conn, stichtag=None):
+    """Rückstände je Mieter nach Alter und die Summen über alle Mieter.
+
+    Liefert (rows, totals):
+      rows:   Liste von Dicts (tenant_id, name, wohnung, Stufen aus BUCKETS, gesamt, aelteste)
+      totals: Dict mit den Stufen aus BUCKETS und gesamt
+    """
+    stichtag = stichtag or date.today()
+    cur = conn.cursor()
+    cur.execute(AGING_SQL, {"stichtag": stichtag})
+    result = cur.fetchall()
+    cur.close()
+
+    rows = []
+    totals = dict.fromkeys(BUCKETS + ["gesamt"], 0.0)
+    for r in result:
+        stufen = [float(v) for v in r[4:8]]
+        if r[10]:
+            # Summenzeile (GROUPING SETS ())
+            totals = dict(zip(BUCKETS, stufen), gesamt=float(r[8] or 0))
+            continue
+        row = {"tenant_id": r[0], "name": f"{r[1]} {r[2]}", "wohnung": r[3] or "-"}
+        row.update(zip(BUCKETS, stufen))
+        row["gesamt"] = float(r[8])
+        row["aelteste"] = r[9]
+        rows.append(row)
+    return rows, totals
@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from database import DB_PARAMS
+
+# Sicherung und Wiederherstellung der Datenbank.
+#
+# Sicherungen werden von pg_dump im Custom-Format (-Fc, eine komprimierte
+# Datei) oder im Verzeichnis-Format (-Fd, eine Datei je Tabelle, von pg_dump
+# mit mehreren Jobs parallel geschrieben) erzeugt. Beide Formate spielt
+# pg_restore mit -j parallel ein: Tabellen laden und Indizes aufbauen läuft
+# gleichzeitig statt Anweisung für Anweisung wie bei psql -f. Zu jeder
+# Sicherung gehört eine Prüfsummendatei (<name>.sha256 im Format von
+# sha256sum), die vor dem Restore geprüft wird. Alte Klartext-Sicherungen
+# (.sql) werden weiterhin über psql eingespielt.
+#
+# Aufruf:  python backup.py                      (Custom-Format)
+#          python backup.py --format directory -j 4 --behalten 14
+
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "/opt/hausverwaltung/backups")
+PREFIX = "hausverwaltung_backup_"
+# zlib-Stufe für pg_dump -Z (0 = unkomprimiert, 9 = maximal)
+COMPRESS = int(os.environ.get("BACKUP_COMPRESS", "6"))
+JOBS = max(1, min(4, os.cpu_count() or 1))
+KEEP_DAYS = 7
+
+FORMATE = {"custom": ".dump", "directory": ".dir", "sql": ".sql"}
+
+# Erkennung hochgeladener Dateien: Archive beginnen mit "PGDMP", Klartext-Dumps
+# mit dem Kommentarkopf von pg_dump
+CUSTOM_MAGIC = b"PGDMP"
+SQL_HEADER = b"PostgreSQL database dump"
+PSQL_META = (b"\\restrict", b"\\unrestrict")
+
+# Zeilen aus --verbose, die je Tabelle (pg_dump) bzw. je TOC-Eintrag
+# (pg_restore) genau einmal erscheinen
+_DUMP_SCHRITT = re.compile(r"dumping contents of table")
+_RESTORE_SCHRITT = re.compile(r"^pg_restore: (creating |processing data for table)")
+
+
+def _pg_args(dbname=None):
+    return ["-U", DB_PARAMS["user"], "-d", dbname or DB_PARAMS["dbname"]]
+
+
+def backup_format(path):
+    if os.path.isdir(path):
+        return "directory"
+    if path.endswith(".sql"):
+        return "sql"
+    return "custom"
+
+
+def _checksum_path(path):
+    return path.rstrip(os.sep) + ".sha256"
+
+
+def _sha256(path, chunk=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _files(path):
+    # Alle Dateien einer Sicherung, relativ zum Sicherungsordner
+    if not os.path.isdir(path):
+        return [os.path.basename(path)]
+    name = os.path.basename(path.rstrip(os.sep))
+    return [os.path.join(name, f) for f in sorted(os.listdir(path))]
+
+
+def write_checksum(path):
+    """Schreibt <path>.sha256 (bei Verzeichnissen eine Zeile je Datei)."""
+    basis = os.path.dirname(path.rstrip(os.sep))
+    zeilen = [f"{_sha256(os.path.join(basis, rel))}  {rel}\n" for rel in _files(path)]
+    with open(_checksum_path(path), "w", encoding="utf-8") as f:
+        f.writelines(zeilen)
+    return _checksum_path(path)
+
+
+def verify_checksum(path):
+    """True/False je nach Prüfsumme, None wenn keine .sha256 vorhanden ist."""
+    pruef = _checksum_path(path)
+    if not os.path.exists(pruef):
+        return None
+    basis = os.path.dirname(path.rstrip(os.sep))
+    erwartet = {}
+    with open(pruef, encoding="utf-8") as f:
+        for zeile in f:
+            if zeile.strip():
+                summe, rel = zeile.rstrip("\n").split(None, 1)
+                erwartet[rel.lstrip("*")] = summe
+    if set(erwartet) != set(_files(path)):
+        return False
+    return all(_sha256(os.path.join(basis, rel)) == summe for rel, summe in erwartet.items())
+
+
+def _run(cmd, schritt, gesamt, stufe, progress):
+    # Startet pg_dump/pg_restore mit --verbose und zählt die Fortschrittszeilen
+    # auf stderr mit. Liefert die letzten stderr-Zeilen für Fehlermeldungen.
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, errors="replace")
+    erledigt, letzte = 0, []
+    for zeile in proc.stderr:
+        if schritt.search(zeile):
+            erledigt += 1
+            if progress:
+                progress(stufe, min(erledigt, gesamt), gesamt)
+        elif "warning" in zeile or "error" in zeile:
+            letzte = (letzte + [zeile.rstrip()])[-20:]
+    proc.wait()
+    return proc.returncode, "\n".join(letzte)
+
+
+def _table_count():
+    cmd = ["psql", "-At", "-c",
+           "SELECT COUNT(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+           "WHERE c.relkind IN ('r', 'p') AND n.nspname NOT IN ('pg_catalog', 'information_schema')"]
+    res = subprocess.run(cmd + _pg_args(), capture_output=True, text=True)
+    return int(res.stdout.strip()) if res.returncode == 0 and res.stdout.strip().isdigit() else 0
+
+
+def create_backup(fmt="custom", jobs=JOBS, compress=COMPRESS, progress=None):
+    """Erzeugt eine Sicherung in BACKUP_DIR inkl. .sha256 und liefert
+    {"path", "format", "size", "seconds"}.
+
+    progress(stufe, erledigt, gesamt) wird je gesicherter Tabelle aufgerufen.
+    """
+    if fmt not in ("custom", "directory"):
+        raise ValueError(f"Unbekanntes Sicherungsformat '{fmt}'")
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    ziel = os.path.join(BACKUP_DIR, PREFIX + datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + FORMATE[fmt])
+
+    cmd = ["pg_dump", "--verbose", "-Z", str(compress), "-f", ziel]
+    if fmt == "directory":
+        cmd += ["-Fd", "-j", str(jobs)]
+    else:
+        cmd += ["-Fc"]
+    cmd += _pg_args()
+
+    t0 = time.perf_counter()
+    rc, log = _run(cmd, _DUMP_SCHRITT, _table_count(), "Sichern", progress)
+    if rc != 0:
+        delete_backup(ziel)
+        raise RuntimeError(f"pg_dump fehlgeschlagen:\n{log}")
+    if progress:
+        progress("Prüfsumme", 0, 1)
+    write_checksum(ziel)
+    return {"path": ziel, "format": fmt, "size": backup_size(ziel), "seconds": time.perf_counter() - t0}
+
+
+def backup_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def list_backups():
+    """Sicherungen in BACKUP_DIR, neueste zuerst."""
+    if not os.path.exists(BACKUP_DIR):
+        return []
+    result = []
+    for name in os.listdir(BACKUP_DIR):
+        if not name.endswith(tuple(FORMATE.values())):
+            continue
+        path = os.path.join(BACKUP_DIR, name)
+        result.append({
+            "name": name, "path": path, "format": backup_format(path),
+            "size": backup_size(path), "mtime": os.path.getmtime(path),
+            "checksum": os.path.exists(_checksum_path(path)),
+        })
+    return sorted(result, key=lambda b: b["mtime"], reverse=True)
+
+
+def delete_backup(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+    if os.path.exists(_checksum_path(path)):
+        os.remove(_checksum_path(path))
+
+
+def prune(days=KEEP_DAYS):
+    """Löscht Sicherungen (samt Prüfsumme), die älter als days Tage sind."""
+    grenze = time.time() - days * 86400
+    alt = [b for b in list_backups() if b["mtime"] < grenze and b["name"].startswith(PREFIX)]
+    for b in alt:
+        delete_backup(b["path"])
+    return [b["name"] for b in alt]
+
+
+def _toc_count(path):
+    res = subprocess.run(["pg_restore", "-l", path], capture_output=True, text=True)
+    if res.returncode != 0:
+        raise ValueError(f"Keine gültige pg_dump-Sicherung: {res.stderr.strip()}")
+    return sum(1 for z in res.stdout.splitlines() if z.strip() and not z.startswith(";"))
+
+
+def save_upload(fileobj, dest_dir=None, chunk=1024 * 1024):
+    """Speichert eine hochgeladene Sicherung als restore_temp.dump/.sql.
+
+    Die Datei wird blockweise (Custom-Format) bzw. zeilenweise (Klartext)
+    durchgereicht, der Speicherbedarf hängt nicht von der Dateigröße ab.
+    Vorher wird der Kopf geprüft (ValueError bei unbekanntem Inhalt); aus
+    Klartext-Dumps werden die \\restrict-/\\unrestrict-Zeilen neuerer
+    pg_dump-Versionen entfernt, die ältere psql nicht kennen. Zur gespeicherten
+    Datei wird eine .sha256 geschrieben.
+    Liefert {"path", "format", "sha256" (der hochgeladenen Datei), "size", "removed"}.
+    """
+    dest_dir = dest_dir or BACKUP_DIR
+    kopf = fileobj.read(4096)
+    fileobj.seek(0)
+    if kopf.startswith(CUSTOM_MAGIC):
+        fmt = "custom"
+    elif SQL_HEADER in kopf:
+        fmt = "sql"
+    else:
+        raise ValueError("Keine PostgreSQL-Sicherung (weder pg_dump-Archiv noch SQL-Dump mit Kopfzeile).")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    ziel = os.path.join(dest_dir, "restore_temp" + FORMATE[fmt])
+    h_upload, h_datei = hashlib.sha256(), hashlib.sha256()
+    size, removed = 0, 0
+    if fmt == "custom":
+        bloecke = iter(lambda: fileobj.read(chunk), b"")
+    else:
+        bloecke = iter(fileobj.readline, b"")
+    with open(ziel, "wb") as out:
+        for block in bloecke:
+            h_upload.update(block)
+            size += len(block)
+            if fmt == "sql" and block.lstrip().startswith(PSQL_META):
+                removed += 1
+                continue
+            h_datei.update(block)
+            out.write(block)
+    with open(_checksum_path(ziel), "w", encoding="utf-8") as f:
+        f.write(f"{h_datei.hexdigest()}  {os.path.basename(ziel)}\n")
+
+    if fmt == "custom":
+        # Inhaltsverzeichnis lesbar? (sonst ValueError, Datei wird verworfen)
+        try:
+            _toc_count(ziel)
+        except ValueError:
+            delete_backup(ziel)
+            raise
+    return {"path": ziel, "format": fmt, "sha256": h_upload.hexdigest(), "size": size, "removed": removed}
+
+
+def _recreate_database():
+    # Andere Sitzungen (z.B. Pools weiterer Streamlit-Sitzungen) werden beendet
+    user = ["-U", DB_PARAMS["user"]]
+    subprocess.run(["dropdb", *user, "--if-exists", "--force", DB_PARAMS["dbname"]],
+                   check=True, capture_output=True, text=True)
+    subprocess.run(["createdb", *user, DB_PARAMS["dbname"]], check=True, capture_output=True, text=True)
+
+
+def restore_backup(path, jobs=JOBS, progress=None):
+    """Löscht die Datenbank und spielt die Sicherung ein.
+
+    Custom-/Verzeichnis-Format über pg_restore -j, Klartext (.sql) über psql.
+    Vorher werden Format und Prüfsumme geprüft (ValueError), damit die
+    Datenbank bei einer unbrauchbaren Datei nicht gelöscht wird.
+    progress(stufe, erledigt, gesamt) je eingespieltem Eintrag bzw. je MB.
+    """
+    if verify_checksum(path) is False:
+        raise ValueError("Prüfsumme stimmt nicht – die Sicherung ist beschädigt oder unvollständig.")
+    fmt = backup_format(path)
+    gesamt = _toc_count(path) if fmt != "sql" else 0
+
+    t0 = time.perf_counter()
+    _recreate_database()
+    if fmt == "sql":
+        rc, log = _restore_sql(path, progress)
+    else:
+        cmd = ["pg_restore", "--verbose", "--no-owner", "-j", str(jobs), *_pg_args(), path]
+        rc, log = _run(cmd, _RESTORE_SCHRITT, gesamt, "Einspielen", progress)
+    if rc != 0:
+        raise RuntimeError(f"Wiederherstellung mit Fehlern beendet:\n{log}")
+    _new_epoch()
+    return {"format": fmt, "seconds": time.perf_counter() - t0, "warnings": log}
+
+
+def _new_epoch():
+    # Die Änderungszähler kommen mit alten Werten aus der Sicherung; eine neue
+    # Epoche macht alle Versionen ungültig (change_cache.table_versions, ETags der API)
+    epoch = uuid.uuid4().hex
+    sql = f"ALTER DATABASE \"{DB_PARAMS['dbname']}\" SET hausverwaltung.epoch = '{epoch}'"
+    subprocess.run(["psql", "-q", *_pg_args(), "-c", sql], check=True, capture_output=True, text=True)
+
+
+def _restore_sql(path, progress):
+    # psql liest die Datei über stdin; der Fortschritt ist der gelesene Anteil
+    gesamt = max(os.path.getsize(path) // (1024 * 1024), 1)
+    with tempfile.TemporaryFile("w+") as log:
+        proc = subprocess.Popen(["psql", "-q", *_pg_args()], stdin=subprocess.PIPE,
+                                stdout=subprocess.DEVNULL, stderr=log)
+        with open(path, "rb") as f:
+            while block := f.read(1024 * 1024):
+                proc.stdin.write(block)
+                if progress:
+                    progress("Einspielen", min(f.tell() // (1024 * 1024), gesamt), gesamt)
+        proc.stdin.close()
+        proc.wait()
+        log.seek(0)
+        fehler = [z.rstrip() for z in log if "ERROR" in z or "FEHLER" in z][-20:]
+    # Wie bisher mit psql -f: einzelne Fehler brechen das Einspielen nicht ab
+    return proc.returncode, "\n".join(fehler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Datenbank sichern (pg_dump, komprimiert, mit Prüfsumme)")
+    parser.add_argument("--format", choices=["custom", "directory"], default="custom",
+                        help="custom = eine Datei, directory = parallel geschrieben (Standard: custom)")
+    parser.add_argument("-j", "--jobs", type=int, default=JOBS, help="Parallele Jobs (nur directory)")
+    parser.add_argument("-Z", "--compress", type=int, default=COMPRESS, help="Kompressionsstufe 0-9")
+    parser.add_argument("--behalten", type=int, default=KEEP_DAYS, help="Sicherungen älter als N Tage löschen")
+    args = parser.parse_args(argv)
+
+    def progress(stufe, erledigt, gesamt):
+        if stufe == "Sichern" and gesamt:
+            print(f"   {stufe}: {erledigt}/{gesamt} Tabellen")
+
+    try:
+        result = create_backup(args.format, args.jobs, args.compress, progress)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    for name in prune(args.behalten):
+        print(f"🗑️  Alte Sicherung gelöscht: {name}")
+    print(f"✅ Backup erfolgreich erstellt: {result['path']} "
+          f"({result['size'] / 1024 / 1024:.1f} MB, {result['seconds']:.1f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
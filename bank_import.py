@@ -0,0 +1,140 @@
+import csv
+import hashlib
+import io
+import re
+
+import pandas as pd
+
+UNBEKANNT = "Unbekannt"
+DATUMSFORMATE = ["%d.%m.%Y", "%d.%m.%y", "%Y-%m-%d"]
+
+
+def parse_amounts(series):
+    # Vektorisiert: "1.234,56 €" -> 1234.56, "-50,00" -> -50.0, Unlesbares -> NaN
+    # Das zuletzt stehende Trennzeichen ist das Dezimalzeichen: "1,234.56" -> 1234.56
+    s = series.astype(str).str.strip().str.replace(r"[^\d,.\-]", "", regex=True)
+    deutsch = s.str.rfind(",") > s.str.rfind(".")
+    s = s.where(~deutsch, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    s = s.where(deutsch, s.str.replace(",", "", regex=False))
+    return pd.to_numeric(s, errors="coerce")
+
+
+def parse_dates(series):
+    # Vektorisiert über alle Zeilen; jedes Format nur für die noch offenen Werte
+    s = series.astype(str).str.strip()
+    result = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    for fmt in DATUMSFORMATE:
+        offen = result.isna()
+        if not offen.any():
+            break
+        result[offen] = pd.to_datetime(s[offen], format=fmt, errors="coerce")
+    return result.dt.date.where(result.notna(), None)
+
+
+def parse_transactions(df, col_date, col_amount, col_text, col_account=None):
+    """Bereitet die Bank-CSV auf: Datum, Betrag, Zweck, Konto (nur Eingänge).
+
+    col_account: Spalte mit dem Konto (IBAN) des Zahlers, optional
+    """
+    tx = pd.DataFrame({
+        "Datum": parse_dates(df[col_date]),
+        "Betrag": parse_amounts(df[col_amount]),
+        "Zweck": df[col_text].fillna("").astype(str),
+        "Konto": df[col_account].fillna("").astype(str) if col_account else "",
+    })
+    # Logik: Nur Haben-Buchungen (Eingänge) beachten; unlesbare Beträge bleiben
+    # drin und werden beim Speichern als fehlerhaft gezählt
+    return tx[~(tx["Betrag"] <= 0)].reset_index(drop=True)
+
+
+def fingerprints(df):
+    """Fingerabdruck je Buchung aus Datum, Betrag und normalisiertem Zweck.
+
+    Gleiche Buchungen innerhalb einer Datei (z.B. zwei Überweisungen am selben
+    Tag) werden durchnummeriert und bleiben so unterscheidbar; eine Datei mit
+    überlappendem Zeitraum ergibt für dieselben Buchungen dieselben Werte.
+    Das Konto des Zahlers zählt nicht mit: ob es gesetzt ist, hängt von der
+    gewählten Spalte ab, und dieselbe Datei muss immer dieselben Werte ergeben.
+    """
+    datum = parse_dates(df["Datum"]).map(str)
+    betrag = pd.to_numeric(df["Betrag"], errors="coerce").round(2).map("{:.2f}".format)
+    zweck = df["Zweck"].fillna("").astype(str).map(lambda z: re.sub(r"\s+", " ", z).strip().casefold())
+    schluessel = datum + "|" + betrag + "|" + zweck
+    nr = schluessel.groupby(schluessel).cumcount().astype(str)
+    return (schluessel + "|" + nr).map(lambda k: hashlib.sha1(k.encode("utf-8")).hexdigest())
+
+
+def count_known(conn, results):
+    """Anzahl der Buchungen, die schon importiert wurden (für Probeläufe)."""
+    df = pd.DataFrame(results)
+    if df.empty:
+        return 0
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM payments WHERE import_fingerprint = ANY(%s)", (fingerprints(df).tolist(),))
+    known = cur.fetchone()[0]
+    cur.close()
+    return known
+
+
+def commit_payments(conn, results, tenants):
+    """Speichert alle erkannten Zahlungen in einem Rutsch (COPY + INSERT ... SELECT).
+
+    results: DataFrame/Liste mit Datum, Betrag, Zweck, Mieter (optional Konto)
+    tenants: Name -> tenant_id
+    Bereits importierte Buchungen (gleicher Fingerabdruck, Migration 0007)
+    werden nicht noch einmal gespeichert, sondern als "duplicates" gezählt.
+    Liefert {"inserted", "skipped", "failed", "duplicates"}.
+    """
+    df = pd.DataFrame(results)
+    if df.empty:
+        return {"inserted": 0, "skipped": 0, "failed": 0, "duplicates": 0}
+    # Vor dem Filtern berechnen, damit die Nummerierung nicht von der Zuordnung abhängt
+    df = df.assign(import_fingerprint=fingerprints(df))
+
+    bekannt = df["Mieter"].map(tenants)
+    skipped = int(bekannt.isna().sum())
+    df = df[bekannt.notna()].assign(tenant_id=bekannt[bekannt.notna()].astype(int))
+
+    df = df.assign(
+        payment_date=parse_dates(df["Datum"]),
+        amount=pd.to_numeric(df["Betrag"], errors="coerce"),
+        note="Auto-Import: " + df["Zweck"].astype(str).str.slice(0, 50),
+    )
+    ok = df["payment_date"].notna() & df["amount"].notna()
+    failed = int((~ok).sum())
+    df = df[ok]
+
+    buf = io.StringIO()
+    df[["tenant_id", "amount", "payment_date", "note", "import_fingerprint"]].to_csv(
+        buf, index=False, header=False, quoting=csv.QUOTE_MINIMAL, float_format="%.2f")
+    buf.seek(0)
+
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TEMP TABLE import_payments (
+                tenant_id INTEGER, amount NUMERIC(10,2), payment_date DATE, note TEXT, import_fingerprint TEXT
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("COPY import_payments (tenant_id, amount, payment_date, note, import_fingerprint) "
+                        "FROM STDIN WITH (FORMAT csv)", buf)
+        # Mieter, die inzwischen gelöscht wurden, fallen hier heraus
+        cur.execute("DELETE FROM import_payments s WHERE NOT EXISTS (SELECT 1 FROM tenants t WHERE t.id = s.tenant_id)")
+        geloescht = cur.rowcount
+        # Bekannte Fingerabdrücke verwirft der eindeutige Index (ein Indexzugriff je Zeile)
+        cur.execute("""
+            INSERT INTO payments (tenant_id, amount, payment_date, note, import_fingerprint)
+            SELECT s.tenant_id, s.amount, s.payment_date, s.note, s.import_fingerprint
+            FROM import_payments s
+            ON CONFLICT (import_fingerprint) WHERE import_fingerprint IS NOT NULL DO NOTHING
+        """)
+        inserted = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {"inserted": inserted, "skipped": skipped + geloescht, "failed": failed,
+            "duplicates": len(df) - geloescht - inserted}
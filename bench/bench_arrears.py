@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+from datetime import date
+
+from arrears import aging_report
+from bench.explain_indexes import TESTDATEN
+from database import get_conn
+
+# Laufzeit der Rückstandsauswertung (arrears.aging_report) auf großer Historie.
+# Testdaten wie bei explain_indexes, innerhalb einer Transaktion erzeugt und
+# am Ende per ROLLBACK verworfen.
+#
+# Aufruf aus dem Projektverzeichnis:  python -m bench.bench_arrears --mieter 2000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Rückstände nach Alter")
+    parser.add_argument("--wohnungen", type=int, default=200)
+    parser.add_argument("--mieter", type=int, default=2000)
+    parser.add_argument("--jahre", type=int, default=20)
+    parser.add_argument("--laeufe", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    conn = get_conn()
+    if not conn:
+        print("❌ Keine Datenbankverbindung möglich.")
+        return 1
+    try:
+        cur = conn.cursor()
+        cur.execute(TESTDATEN, {"wohnungen": args.wohnungen, "mieter": args.mieter, "jahre": args.jahre})
+        cur.execute("SELECT COUNT(*) FROM tenants")
+        n_mieter = cur.fetchone()[0]
+        cur.close()
+
+        stichtag = date(2000 + args.jahre, 12, 31)
+        zeiten = []
+        for _ in range(args.laeufe):
+            t0 = time.perf_counter()
+            rows, totals = aging_report(conn, stichtag)
+            zeiten.append(time.perf_counter() - t0)
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print(f"Mieter: {n_mieter} | Jahre: {args.jahre} | Stichtag: {stichtag.strftime('%d.%m.%Y')}")
+    print(f"Mieter mit Rückstand: {len(rows)} | Rückstand gesamt: {totals['gesamt']:.2f} EUR")
+    print(f"Laufzeit: min {min(zeiten) * 1000:.1f} ms | max {max(zeiten) * 1000:.1f} ms ({args.laeufe} Läufe)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
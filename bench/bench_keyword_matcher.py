@@ -0,0 +1,81 @@
+import argparse
+import random
+import string
+import sys
+import time
+
+from keyword_matcher import KeywordMatcher
+
+# Micro-Benchmark: Aho-Corasick-Automat gegen die alte Schleife
+# (jeder Suchbegriff per "kw in purpose" für jede Buchung).
+#
+# Aufruf aus dem Projektverzeichnis:  python -m bench.bench_keyword_matcher
+
+
+def _wort(rng, n):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(n))
+
+
+def erzeuge_daten(n_keywords, n_tx, seed):
+    rng = random.Random(seed)
+    keywords = {}
+    while len(keywords) < n_keywords:
+        keywords[f"{_wort(rng, rng.randint(4, 8))} {_wort(rng, rng.randint(5, 10))}"] = len(keywords) % 500 + 1
+    kw_list = list(keywords)
+    purposes = []
+    for i in range(n_tx):
+        teile = ["sepa-ueberweisung", _wort(rng, 8), "miete", f"{rng.randint(1, 12):02d}/2025"]
+        # Etwa 80 % der Buchungen enthalten einen bekannten Suchbegriff
+        if i % 5:
+            teile.insert(rng.randint(0, len(teile)), rng.choice(kw_list))
+        purposes.append(" ".join(teile))
+    return keywords, purposes
+
+
+def naiv(keywords, purpose):
+    # Die bisherige Logik aus 09_Buchhaltung: erster Treffer gewinnt
+    for kw, t_id in keywords.items():
+        if kw in purpose:
+            return t_id
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Suchbegriff-Zuordnung")
+    parser.add_argument("--keywords", type=int, default=10_000)
+    parser.add_argument("--transaktionen", type=int, default=50_000)
+    parser.add_argument("--stichprobe", type=int, default=500, help="Buchungen für die (langsame) alte Schleife")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    keywords, purposes = erzeuge_daten(args.keywords, args.transaktionen, args.seed)
+
+    t0 = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ergebnisse = [matcher.match(p) for p in purposes]
+    t_scan = time.perf_counter() - t0
+
+    stichprobe = purposes[:args.stichprobe]
+    t0 = time.perf_counter()
+    alt = [naiv(keywords, p) for p in stichprobe]
+    t_naiv = (time.perf_counter() - t0) * len(purposes) / max(len(stichprobe), 1)
+
+    # Ohne Überschneidungen müssen beide Verfahren denselben Mieter liefern
+    abweichungen = sum(1 for a, r in zip(alt, ergebnisse) if not r.ambiguous and a != r.tenant_id)
+    zugeordnet = sum(1 for r in ergebnisse if r.tenant_id is not None)
+    mehrdeutig = sum(1 for r in ergebnisse if r.ambiguous)
+
+    print(f"Suchbegriffe: {len(keywords)} | Buchungen: {len(purposes)}")
+    print(f"Automat aufbauen:        {t_build * 1000:8.1f} ms")
+    print(f"Aho-Corasick (alle):     {t_scan * 1000:8.1f} ms ({len(purposes) / t_scan:,.0f} Buchungen/s)")
+    print(f"Alte Schleife (hochger.): {t_naiv * 1000:8.1f} ms (aus {len(stichprobe)} Buchungen)")
+    print(f"Faktor:                  {t_naiv / t_scan:8.1f}x")
+    print(f"Zugeordnet: {zugeordnet} | Mehrdeutig: {mehrdeutig} | Abweichungen Stichprobe: {abweichungen}")
+    return 0 if abweichungen == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench.bench_settlement import erzeuge_daten
+from nk_batch import _render
+from pdf_utils import clear_templates, generate_payment_history_pdf
+from settlement import allocate, pdf_stats
+
+# Durchsatz der PDF-Erzeugung (Dokumente pro Sekunde): Nebenkostenabrechnung
+# und Kontoauszug, jeweils mit zwischengespeicherter Vorlage und mit einer
+# Vorlage, die für jedes Dokument neu gezeichnet wird (entspricht dem Aufbau
+# ohne Cache). Optional zusätzlich im Prozess-Pool wie beim Sammellauf.
+#
+# Aufruf aus dem Projektverzeichnis:  python -m bench.bench_pdf --dokumente 500 -j 4
+
+HAUS = {"name": "Vermieter", "street": "Musterstraße 1", "city": "12345 Musterstadt",
+        "iban": "DE00 0000 0000 0000 0000 00", "bank": "Bank",
+        "total_area": 0.0, "total_occupants": 0}
+
+
+def messen(name, n, erzeugen, neu_zeichnen=False):
+    groesse = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        if neu_zeichnen:
+            clear_templates()
+        groesse += len(erzeugen(i))
+    dauer = time.perf_counter() - t0
+    print(f"{name:<38} {n / dauer:8.1f} Dok/s   Ø {groesse / n / 1024:5.1f} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF-Erzeugung")
+    parser.add_argument("--dokumente", type=int, default=500)
+    parser.add_argument("--kosten", type=int, default=15, help="Kostenpositionen je Abrechnung")
+    parser.add_argument("--jahr", type=int, default=2025)
+    parser.add_argument("-j", "--workers", type=int, default=0, help="Zusätzlich im Prozess-Pool messen")
+    args = parser.parse_args(argv)
+
+    haus, tenants, expenses = erzeuge_daten(max(args.dokumente, 1) * 2, args.kosten, args.jahr, seed=42)
+    haus = dict(HAUS, **haus)
+    abrechnungen = allocate(tenants, haus, expenses, args.jahr)
+    jobs = [(s, *pdf_stats(m, haus)) for m, s in zip(tenants, abrechnungen)]
+    jobs = (jobs * (args.dokumente // max(len(jobs), 1) + 1))[:args.dokumente]
+    _, h_stats = pdf_stats(tenants[0], haus)
+    verlauf = [{"Monat": f"{m:02d}/{args.jahr}", "Soll (€)": "650.00", "Ist (€)": "650.00",
+                "Saldo (€)": "0.00", "Status": "✅ Bezahlt"} for m in range(1, 13)]
+
+    def nk(i):
+        return _render(*jobs[i])
+
+    def konto(i):
+        return generate_payment_history_pdf(f"Mieter {i}", args.jahr, verlauf, h_stats, "von 01.01.2020 bis laufend")
+
+    print(f"Dokumente: {args.dokumente} | Kostenpositionen: {args.kosten}")
+    messen("Nebenkosten, Vorlage aus Cache", args.dokumente, nk)
+    messen("Nebenkosten, Vorlage je Dokument", args.dokumente, nk, neu_zeichnen=True)
+    messen("Kontoauszug, Vorlage aus Cache", args.dokumente, konto)
+    messen("Kontoauszug, Vorlage je Dokument", args.dokumente, konto, neu_zeichnen=True)
+
+    if args.workers:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as ex:
+            # Pool vorwärmen (Prozessstart und Import nicht mitmessen)
+            list(ex.map(_render, *zip(*jobs[:args.workers])))
+            t0 = time.perf_counter()
+            fertig = list(ex.map(_render, *zip(*jobs), chunksize=16))
+            dauer = time.perf_counter() - t0
+        print(f"{f'Nebenkosten, Prozess-Pool ({args.workers})':<38} {len(fertig) / dauer:8.1f} Dok/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
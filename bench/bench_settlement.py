@@ -0,0 +1,104 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from settlement import allocate, allocation_matrix
+
+# Micro-Benchmark: vektorisierte Umlage (settlement.allocate) gegen die alte
+# Schleife aus 01_Mieter_Akte (ein Mieter, eine Schleife über alle Kosten).
+#
+# Aufruf aus dem Projektverzeichnis:  python -m bench.bench_settlement
+
+
+def erzeuge_daten(n_mieter, n_kosten, jahr, seed):
+    rng = random.Random(seed)
+    haus = {"total_area": 0.0, "total_occupants": 0, "total_units": n_mieter}
+    tenants = []
+    for i in range(1, n_mieter + 1):
+        move_in = date(jahr - 3, 1, 1) + timedelta(days=rng.randint(0, 4 * 365))
+        move_out = move_in + timedelta(days=rng.randint(30, 900)) if i % 3 == 0 else None
+        tenants.append({
+            "id": i, "first_name": "Mieter", "last_name": str(i), "move_in": move_in, "move_out": move_out,
+            "monthly_prepayment": rng.randint(80, 250), "unit_name": f"W{i}",
+            "area": rng.randint(35, 110), "occupants": rng.randint(1, 5), "base_rent": 0,
+        })
+        haus["total_area"] += tenants[-1]["area"]
+        haus["total_occupants"] += tenants[-1]["occupants"]
+    expenses = []
+    for j in range(n_kosten):
+        # Etwa jede zehnte Position ist eine Direktzuordnung (Wallbox o.ä.)
+        direkt = rng.randint(1, n_mieter) if j % 10 == 0 else None
+        key = "direct" if direkt else rng.choice(["area", "persons", "unit"])
+        expenses.append((f"Kostenart {j}", rng.randint(50, 5000), key, direkt))
+    tenants = [t for t in tenants
+               if t["move_in"] <= date(jahr, 12, 31) and (t["move_out"] is None or t["move_out"] >= date(jahr, 1, 1))]
+    # Nenner des Personen-Schlüssels wie settlement.load_person_days
+    haus["person_days"] = sum(t["occupants"] * _tage(t, jahr) for t in tenants)
+    return haus, tenants, expenses
+
+
+def _tage(mieter, jahr):
+    m_start = max(mieter["move_in"] or date(jahr, 1, 1), date(jahr, 1, 1))
+    m_ende = min(mieter["move_out"] or date(jahr, 12, 31), date(jahr, 12, 31))
+    return (m_ende - m_start).days + 1
+
+
+def schleife(mieter, haus, expenses, jahr):
+    # Die bisherige Logik, Mieter für Mieter (inkl. der Tabellenzeilen für die PDF);
+    # Personen inzwischen nach Personentagen wie in settlement.allocation_matrix
+    tage_mieter = _tage(mieter, jahr)
+    tage_jahr = (date(jahr + 1, 1, 1) - date(jahr, 1, 1)).days
+    zeit_faktor = tage_mieter / tage_jahr
+    rows, summe = [], 0.0
+    for name, gesamt_h, key, tid in expenses:
+        if tid and tid != mieter["id"]:
+            continue
+        gesamt_h = float(gesamt_h)
+        anteil = 0.0
+        if tid:
+            anteil = gesamt_h * zeit_faktor
+        elif key == "area": anteil = (gesamt_h / float(haus["total_area"])) * float(mieter["area"]) * zeit_faktor
+        elif key == "persons": anteil = (gesamt_h / float(haus["person_days"])) * float(mieter["occupants"]) * tage_mieter
+        elif key == "unit": anteil = (gesamt_h / float(haus["total_units"])) * zeit_faktor
+        summe += anteil
+        rows.append({"Kostenart": name, "Gesamtkosten": f"{gesamt_h:.2f}", "Schlüssel": key, "Ihr Anteil": f"{anteil:.2f}"})
+    return summe, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Nebenkosten-Umlage")
+    parser.add_argument("--mieter", type=int, default=2_000)
+    parser.add_argument("--kosten", type=int, default=200)
+    parser.add_argument("--jahr", type=int, default=2025)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    haus, tenants, expenses = erzeuge_daten(args.mieter, args.kosten, args.jahr, args.seed)
+
+    t0 = time.perf_counter()
+    allocation_matrix(tenants, haus, expenses, args.jahr)
+    t_matrix = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ergebnisse = allocate(tenants, haus, expenses, args.jahr)
+    t_alloc = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    alt = [schleife(m, haus, expenses, args.jahr) for m in tenants]
+    t_loop = time.perf_counter() - t0
+
+    abweichung = max((abs(a[0] - r["summe"]) for a, r in zip(alt, ergebnisse)), default=0.0)
+
+    print(f"Mieter: {len(tenants)} | Kostenpositionen: {len(expenses)} | Jahr: {args.jahr}")
+    print(f"Matrix (nur Umlage):      {t_matrix * 1000:8.1f} ms")
+    print(f"allocate (inkl. Zeilen):  {t_alloc * 1000:8.1f} ms")
+    print(f"Alte Schleife:            {t_loop * 1000:8.1f} ms")
+    print(f"Faktor:                   {t_loop / t_alloc:8.1f}x")
+    print(f"Max. Abweichung Summe:    {abweichung:.2e} EUR")
+    return 0 if abweichung < 0.005 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import argparse
+import json
+import sys
+from datetime import date
+
+from database import get_conn
+
+# Prüft per EXPLAIN, dass die heißen Abfragen der Seiten Indizes nutzen.
+# Die Testdaten (viele Jahre Historie) werden innerhalb einer Transaktion
+# erzeugt und am Ende per ROLLBACK wieder verworfen.
+#
+# Aufruf aus dem Projektverzeichnis:  python -m bench.explain_indexes --jahre 20
+
+TESTDATEN = """
+    INSERT INTO apartments (unit_name, area, base_rent)
+    SELECT 'EXPLAIN-Whg ' || g, 50 + g %% 60, 500 FROM generate_series(1, %(wohnungen)s) g;
+
+    INSERT INTO tenants (first_name, last_name, apartment_id, move_in, move_out, occupants, monthly_prepayment, base_rent)
+    SELECT 'Test', 'Mieter ' || g,
+           (SELECT min(id) FROM apartments WHERE unit_name LIKE 'EXPLAIN-Whg %%') + g %% %(wohnungen)s,
+           DATE '2000-01-01' + (g %% 20) * 365,
+           CASE WHEN g %% 4 = 0 THEN NULL ELSE DATE '2000-01-01' + (g %% 20) * 365 + 700 END,
+           1 + g %% 4, 150, 600
+    FROM generate_series(1, %(mieter)s) g;
+
+    INSERT INTO payments (tenant_id, amount, payment_date, payment_type, note)
+    SELECT t.id, 750, m::date, 'Miete', 'EXPLAIN'
+    FROM tenants t
+    CROSS JOIN generate_series(DATE '2000-01-01', DATE '2000-01-01' + %(jahre)s * INTERVAL '1 year', INTERVAL '1 month') m
+    WHERE t.last_name LIKE 'Mieter %%';
+
+    INSERT INTO operating_expenses (expense_type, amount, distribution_key, expense_year)
+    SELECT 'Kostenart ' || k, 1000, 'area', y
+    FROM generate_series(2000, 2000 + %(jahre)s) y CROSS JOIN generate_series(1, 15) k;
+
+    INSERT INTO operating_expenses (expense_type, amount, distribution_key, expense_year, tenant_id)
+    SELECT 'Wallbox-Strom', 100, 'direct', y, t.id
+    FROM tenants t CROSS JOIN generate_series(2000, 2000 + %(jahre)s) y
+    WHERE t.last_name LIKE 'Mieter %%' AND t.id %% 2 = 0;
+
+    INSERT INTO meters (apartment_id, meter_type, meter_number, is_submeter)
+    SELECT NULL, 'Strom', 'EXPLAIN-' || g, FALSE FROM generate_series(1, 50) g;
+
+    INSERT INTO meter_readings (meter_id, reading_date, reading_value)
+    SELECT m.id, d::date, extract(epoch FROM d) / 10000
+    FROM meters m
+    CROSS JOIN generate_series(DATE '2000-01-01', DATE '2000-01-01' + %(jahre)s * INTERVAL '1 year', INTERVAL '1 month') d
+    WHERE m.meter_number LIKE 'EXPLAIN-%%';
+
+    ANALYZE apartments; ANALYZE tenants; ANALYZE payments; ANALYZE operating_expenses;
+    ANALYZE meters; ANALYZE meter_readings; ANALYZE tenant_ledger_monthly;
+"""
+
+# (Seite, Abfrage, Parameter, erwarteter Index)
+ABFRAGEN = [
+    ("01 Kontoauszug (Mieterkonto)",
+     "SELECT month, active, soll, ist, balance FROM tenant_ledger_monthly "
+     "WHERE tenant_id = %s AND month >= %s AND month < %s ORDER BY month",
+     ("MIETER", date(2014, 12, 1), date(2016, 1, 1)), "tenant_ledger_monthly_pkey"),
+    ("Zahlungen je Mieter und Zeitraum",
+     "SELECT payment_date, amount FROM payments WHERE tenant_id = %s AND payment_date >= %s AND payment_date < %s",
+     ("MIETER", date(2015, 1, 1), date(2016, 1, 1)), "idx_payments_tenant_date_id"),
+    ("01 Nebenkosten",
+     "SELECT expense_type, amount, distribution_key, tenant_id FROM operating_expenses "
+     "WHERE expense_year = %s AND (tenant_id IS NULL OR tenant_id = %s)",
+     (2015, "MIETER"), "idx_operating_expenses_year_tenant"),
+    ("03 Zählerstand Jahresanfang",
+     "SELECT reading_value FROM meter_readings WHERE meter_id = %s AND reading_date <= %s "
+     "ORDER BY reading_date DESC LIMIT 1",
+     ("ZAEHLER", date(2015, 1, 1)), "idx_meter_readings_meter_date"),
+    ("03 Zählerstand Jahresende",
+     "SELECT reading_value FROM meter_readings WHERE meter_id = %s AND reading_date >= %s "
+     "ORDER BY reading_date ASC LIMIT 1",
+     ("ZAEHLER", date(2016, 1, 1)), "idx_meter_readings_meter_date"),
+    ("06 Zahlungsverlauf je Mieter (Folgeseite)",
+     "SELECT p.id, p.payment_date, p.amount FROM payments p WHERE p.tenant_id = %s "
+     "AND (p.payment_date, p.id) < (%s, %s) ORDER BY p.payment_date DESC, p.id DESC LIMIT 51",
+     ("MIETER", date(2015, 6, 1), 2 ** 31 - 1), "idx_payments_tenant_date_id"),
+    ("06 Zahlungsverlauf alle (Folgeseite)",
+     "SELECT p.id, p.payment_date, p.amount FROM payments p "
+     "WHERE (p.payment_date, p.id) < (%s, %s) ORDER BY p.payment_date DESC, p.id DESC LIMIT 51",
+     (date(2015, 6, 1), 2 ** 31 - 1), "idx_payments_date_id"),
+    ("main Eingänge lfd. Monat",
+     "SELECT SUM(amount) FROM payments WHERE payment_date >= %s AND payment_date < %s",
+     (date(2015, 3, 1), date(2015, 4, 1)), "idx_payments_date_id"),
+    ("main Letzte Zahlungen",
+     "SELECT p.payment_date, p.amount FROM payments p ORDER BY p.payment_date DESC LIMIT 5",
+     (), "idx_payments_date_id"),
+    ("main Aktive Mieter je Wohnung",
+     "SELECT t.id FROM tenants t WHERE t.apartment_id = %s AND t.move_out IS NULL",
+     ("WOHNUNG",), "idx_tenants_active_apartment"),
+]
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def pruefe(conn, wohnungen, mieter, jahre):
+    cur = conn.cursor()
+    cur.execute(TESTDATEN, {"wohnungen": wohnungen, "mieter": mieter, "jahre": jahre})
+    cur.execute("SELECT min(id) FROM tenants WHERE last_name LIKE 'Mieter %'")
+    t_id = cur.fetchone()[0]
+    cur.execute("SELECT min(id) FROM meters WHERE meter_number LIKE 'EXPLAIN-%'")
+    m_id = cur.fetchone()[0]
+    cur.execute("SELECT apartment_id FROM tenants WHERE id = %s", (t_id,))
+    a_id = cur.fetchone()[0]
+    ersatz = {"MIETER": t_id, "ZAEHLER": m_id, "WOHNUNG": a_id}
+
+    ergebnisse = []
+    for name, sql, params, index in ABFRAGEN:
+        params = tuple(ersatz.get(p, p) if isinstance(p, str) else p for p in params)
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0][0]["Plan"]
+        nodes = list(_plan_nodes(plan))
+        used = sorted({n["Index Name"] for n in nodes if "Index Name" in n})
+        seq = sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"})
+        ergebnisse.append({"abfrage": name, "index": used, "seq_scan": seq, "ok": index in used})
+    cur.close()
+    return ergebnisse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN-Prüfung der Indizes auf großer Historie")
+    parser.add_argument("--wohnungen", type=int, default=200)
+    parser.add_argument("--mieter", type=int, default=1000)
+    parser.add_argument("--jahre", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args(argv)
+
+    conn = get_conn()
+    if not conn:
+        print("❌ Keine Datenbankverbindung möglich.")
+        return 1
+    try:
+        ergebnisse = pruefe(conn, args.wohnungen, args.mieter, args.jahre)
+    finally:
+        # Testdaten (und die ANALYZE-Statistiken dazu) verwerfen
+        conn.rollback()
+        conn.close()
+
+    if args.json:
+        print(json.dumps(ergebnisse, indent=2, ensure_ascii=False))
+    else:
+        for r in ergebnisse:
+            status = "✅" if r["ok"] else "❌"
+            print(f"{status} {r['abfrage']}: Index {', '.join(r['index']) or '-'}"
+                  f"{' | Seq Scan: ' + ', '.join(r['seq_scan']) if r['seq_scan'] else ''}")
+    return 0 if all(r["ok"] for r in ergebnisse) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
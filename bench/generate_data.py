@@ -0,0 +1,278 @@
+import argparse
+import csv
+import io
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg2
+
+from database import DB_PARAMS
+
+# Reproduzierbare Testdaten in beliebiger Größe (gleicher Seed -> gleiche Daten):
+# Wohnungen, Mieter mit Ein-/Auszügen und Leerstand, monatliche Zahlungen
+# (meist pünktlich, manchmal verspätet, gekürzt oder ausgefallen),
+# Betriebskosten je Jahr, Zähler mit Ablesungen (inkl. Zählerwechsel) und
+# Suchbegriffe für den Bank-Import. Die Daten werden per COPY in eine eigene
+# Benchmark-Datenbank geladen, nie in die produktive.
+#
+# Aufruf aus dem Projektverzeichnis:
+#   python -m bench.generate_data --wohnungen 500 --jahre 20 --neu
+#   (--neu legt die Datenbank hausverwaltung_bench neu an und spielt die Migrationen ein)
+
+BENCH_DB = "hausverwaltung_bench"
+
+VORNAMEN = ["Anna", "Ben", "Clara", "David", "Elif", "Felix", "Greta", "Hannes", "Ines", "Jonas",
+            "Katrin", "Lukas", "Mara", "Nils", "Olga", "Paul", "Rosa", "Sven", "Tanja", "Umut",
+            "Vera", "Wolfgang", "Yasemin", "Zoe"]
+NACHNAMEN = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+             "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Yilmaz", "Neumann",
+             "Schwarz", "Braun", "Zimmermann", "Krüger", "Hartmann", "Lange", "Kaya", "Werner"]
+
+# (Kostenart, Schlüssel, EUR je m² Gesamtfläche und Jahr)
+KOSTENARTEN = [
+    ("Grundsteuer", "area", 0.35), ("Wasser/Abwasser", "persons", 0.9), ("Müllabfuhr", "persons", 0.4),
+    ("Gebäudeversicherung", "area", 0.3), ("Allgemeinstrom", "unit", 0.08), ("Hausreinigung", "area", 0.25),
+    ("Gartenpflege", "area", 0.12), ("Schornsteinfeger", "unit", 0.04), ("Hauswart", "area", 0.3),
+    ("Aufzug", "unit", 0.15), ("Winterdienst", "area", 0.06), ("Heizung Wartung", "unit", 0.1),
+]
+
+SPALTEN = {
+    "apartments": ["id", "unit_name", "area", "base_rent", "service_charge_prepayment"],
+    "tenants": ["id", "first_name", "last_name", "apartment_id", "move_in", "move_out",
+                "occupants", "monthly_prepayment", "base_rent"],
+    "payments": ["tenant_id", "amount", "payment_date", "payment_type", "note"],
+    "operating_expenses": ["expense_type", "amount", "distribution_key", "expense_year", "tenant_id"],
+    "meters": ["id", "apartment_id", "meter_type", "meter_number", "is_submeter", "parent_meter_id"],
+    "meter_readings": ["meter_id", "reading_date", "reading_value"],
+    "tenant_keywords": ["tenant_id", "keyword"],
+}
+
+
+def _monate(von, bis):
+    m = von.replace(day=1)
+    while m <= bis:
+        yield m
+        m = (m + timedelta(days=32)).replace(day=1)
+
+
+def generate(wohnungen=50, jahre=5, seed=42, heute=None):
+    """Erzeugt alle Zeilen als Dict Tabelle -> Liste von Tupeln (Spalten wie SPALTEN).
+
+    IDs werden ab 1 vergeben; load() verschiebt sie hinter die vorhandenen.
+    """
+    rng = random.Random(seed)
+    heute = heute or date.today()
+    beginn = date(heute.year - jahre, 1, 1)
+    daten = {t: [] for t in SPALTEN}
+
+    # --- WOHNUNGEN & MIETER ---
+    mieter_id = 0
+    keywords = set()
+    for a_id in range(1, wohnungen + 1):
+        area = rng.randint(28, 120)
+        kalt = round(area * rng.uniform(7.5, 13.0), 2)
+        voraus = round(area * rng.uniform(2.0, 3.2), 2)
+        daten["apartments"].append((a_id, f"Whg {a_id:04d} ({'EG' if a_id % 8 == 1 else f'{a_id % 8}. OG'})",
+                                    area, kalt, voraus))
+
+        # Mietverhältnisse nacheinander, mit Leerstand dazwischen
+        einzug = beginn + timedelta(days=rng.randint(0, 400))
+        while einzug <= heute:
+            mieter_id += 1
+            dauer = int(rng.expovariate(1 / (5 * 365))) + 180
+            auszug = einzug + timedelta(days=dauer)
+            # Auszug zum Monatsende
+            auszug = (auszug.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            if auszug >= heute:
+                auszug = None
+            vorname, nachname = rng.choice(VORNAMEN), rng.choice(NACHNAMEN)
+            miete = round(kalt * (1 + 0.02 * (einzug.year - beginn.year)), 2)
+            daten["tenants"].append((mieter_id, vorname, nachname, a_id, einzug, auszug,
+                                     rng.choice([1, 1, 2, 2, 2, 3, 4, 5]), voraus, miete))
+            keyword = f"{nachname.lower()} whg {a_id:04d}"
+            if keyword not in keywords:
+                keywords.add(keyword)
+                daten["tenant_keywords"].append((mieter_id, keyword))
+
+            # --- ZAHLUNGEN ---
+            soll = round(miete + voraus, 2)
+            for monat in _monate(einzug, auszug or heute):
+                zufall = rng.random()
+                if zufall < 0.02:
+                    continue  # ausgefallen
+                betrag = soll if zufall > 0.05 else round(soll * rng.uniform(0.3, 0.9), 2)
+                tag = rng.randint(1, 5) if zufall > 0.10 else rng.randint(10, 28)
+                datum = monat.replace(day=tag)
+                if datum > heute:
+                    break
+                art = "Dauerauftrag" if mieter_id % 3 else "Überweisung"
+                daten["payments"].append((mieter_id, betrag, datum, art,
+                                          f"Miete {monat.month:02d}/{monat.year} {nachname} Whg {a_id:04d}"))
+
+            if auszug is None:
+                break
+            einzug = auszug + timedelta(days=1 + rng.choice([0, 0, 0, 30, 61, 92]))
+
+    # --- BETRIEBSKOSTEN ---
+    gesamtflaeche = sum(a[2] for a in daten["apartments"])
+    for jahr in range(beginn.year, heute.year + 1):
+        teuerung = 1 + 0.025 * (jahr - beginn.year)
+        for name, schluessel, satz in KOSTENARTEN:
+            betrag = round(gesamtflaeche * satz * teuerung * rng.uniform(0.9, 1.1), 2)
+            daten["operating_expenses"].append((name, betrag, schluessel, jahr, None))
+
+    # --- ZÄHLER & ABLESUNGEN ---
+    zaehler_id = 0
+    for a_id in range(1, wohnungen + 1):
+        for art, verbrauch in (("Wasser", 45.0), ("Strom", 2400.0)):
+            zaehler_id += 1
+            daten["meters"].append((zaehler_id, a_id, art, f"{art[0]}-{a_id:04d}", False, None))
+            stand = rng.uniform(0, 5000)
+            for jahr in range(beginn.year, heute.year + 1):
+                ablesung = date(jahr, 12, 31) - timedelta(days=rng.randint(0, 6))
+                if ablesung > heute:
+                    break
+                if rng.random() < 0.01:
+                    stand = rng.uniform(0, 50)  # Zählerwechsel
+                else:
+                    stand += verbrauch * rng.uniform(0.7, 1.3)
+                daten["meter_readings"].append((zaehler_id, ablesung, round(stand, 2)))
+    # Hauptzähler Allgemeinstrom mit Wallbox-Unterzählern (monatlich abgelesen)
+    zaehler_id += 1
+    haupt_strom = zaehler_id
+    daten["meters"].append((haupt_strom, None, "Strom", "HAUPT-STROM", False, None))
+    for i in range(max(wohnungen // 50, 1)):
+        zaehler_id += 1
+        daten["meters"].append((zaehler_id, None, "Strom", f"WALLBOX-{i + 1:02d}", True, haupt_strom))
+    staende = dict.fromkeys(range(haupt_strom, zaehler_id + 1), 0.0)
+    for monat in _monate(beginn, heute):
+        wallboxen = [rng.uniform(150, 400) for _ in range(haupt_strom + 1, zaehler_id + 1)]
+        # Der Hauptzähler misst die Wallboxen mit
+        for m_id, zuwachs in zip(staende, [sum(wallboxen) + rng.uniform(300, 800)] + wallboxen):
+            staende[m_id] += zuwachs
+            daten["meter_readings"].append((m_id, monat, round(staende[m_id], 2)))
+
+    return daten
+
+
+def _copy(cur, tabelle, zeilen, spalten):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(zeilen)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {tabelle} ({', '.join(spalten)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def load(conn, daten):
+    """Lädt die Daten per COPY (IDs hinter die vorhandenen verschoben) und
+    liefert die Zeilenzahl je Tabelle. Commit macht der Aufrufer."""
+    cur = conn.cursor()
+    offset = {}
+    for tabelle in ("apartments", "tenants", "meters"):
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabelle}")
+        offset[tabelle] = cur.fetchone()[0]
+    a_off, t_off, m_off = offset["apartments"], offset["tenants"], offset["meters"]
+
+    def mieter(t):
+        return None if t is None else t + t_off
+
+    umgerechnet = {
+        "apartments": [(i + a_off, *rest) for i, *rest in daten["apartments"]],
+        "tenants": [(i + t_off, v, n, a + a_off, *rest) for i, v, n, a, *rest in daten["tenants"]],
+        "payments": [(mieter(t), *rest) for t, *rest in daten["payments"]],
+        "operating_expenses": [(*rest, mieter(t)) for *rest, t in daten["operating_expenses"]],
+        "meters": [(i + m_off, a and a + a_off, art, nr, sub, p and p + m_off)
+                   for i, a, art, nr, sub, p in daten["meters"]],
+        "meter_readings": [(m + m_off, *rest) for m, *rest in daten["meter_readings"]],
+        "tenant_keywords": [(mieter(t), kw) for t, kw in daten["tenant_keywords"]],
+    }
+    # Reihenfolge wegen der Fremdschlüssel; die Mieterkonto-Trigger laufen je COPY einmal
+    for tabelle in SPALTEN:
+        _copy(cur, tabelle, umgerechnet[tabelle], SPALTEN[tabelle])
+    for tabelle in ("apartments", "tenants", "meters"):
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabelle}', 'id'), (SELECT MAX(id) FROM {tabelle}))")
+
+    # Summen für die Umlage (property_totals) pflegen die Trigger aus Migration 0006
+    cur.execute("UPDATE landlord_settings SET name = COALESCE(name, 'Benchmark Hausverwaltung') WHERE id = 1")
+    cur.execute("ANALYZE")
+    cur.close()
+    return {t: len(z) for t, z in umgerechnet.items()}
+
+
+def bank_csv(conn, monat, seed=42):
+    """Bank-CSV (Semikolon, deutsches Format) mit den Zahlungseingängen eines
+    Monats und etwa 10 % fremden Buchungen – Eingabe für den Import-Benchmark."""
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT p.payment_date, p.amount, p.note FROM payments p
+        WHERE p.payment_date >= %s AND p.payment_date < %s ORDER BY p.id
+    """, (monat, (monat + timedelta(days=32)).replace(day=1)))
+    zeilen = [(d.strftime("%d.%m.%Y"), f"{a:.2f}".replace(".", ","), f"SEPA-GUTSCHRIFT {n}".upper())
+              for d, a, n in cur.fetchall()]
+    cur.close()
+    for _ in range(len(zeilen) // 10 + 1):
+        zeilen.append((monat.strftime("%d.%m.%Y"), f"{rng.uniform(-300, 300):.2f}".replace(".", ","),
+                       f"KARTENZAHLUNG MARKT {rng.randint(1000, 9999)}"))
+    rng.shuffle(zeilen)
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(["Buchungstag", "Betrag", "Verwendungszweck"])
+    writer.writerows(zeilen)
+    return buf.getvalue()
+
+
+def connect(dbname):
+    return psycopg2.connect(**dict(DB_PARAMS, dbname=dbname))
+
+
+def recreate(dbname):
+    # Eigene Datenbank für Benchmarks: löschen, neu anlegen, Migrationen einspielen
+    user = ["-U", DB_PARAMS["user"]]
+    subprocess.run(["dropdb", *user, "--if-exists", "--force", dbname], check=True)
+    subprocess.run(["createdb", *user, dbname], check=True)
+    from migrate import migrate
+    conn = connect(dbname)
+    try:
+        migrate(conn, log=lambda *a: None)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Testdaten für Benchmarks erzeugen")
+    parser.add_argument("--db", default=BENCH_DB, help=f"Ziel-Datenbank (Standard: {BENCH_DB})")
+    parser.add_argument("--wohnungen", type=int, default=500)
+    parser.add_argument("--jahre", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--neu", action="store_true", help="Datenbank löschen, neu anlegen und migrieren")
+    args = parser.parse_args(argv)
+
+    if args.db == DB_PARAMS["dbname"]:
+        parser.error(f"'{args.db}' ist die produktive Datenbank – bitte eine eigene Benchmark-Datenbank angeben.")
+
+    t0 = time.perf_counter()
+    if args.neu:
+        recreate(args.db)
+    daten = generate(args.wohnungen, args.jahre, args.seed)
+    t_gen = time.perf_counter() - t0
+
+    conn = connect(args.db)
+    try:
+        t0 = time.perf_counter()
+        anzahl = load(conn, daten)
+        conn.commit()
+        t_load = time.perf_counter() - t0
+    finally:
+        conn.close()
+
+    for tabelle, n in anzahl.items():
+        print(f"   {tabelle:<20} {n:>10,}".replace(",", "."))
+    print(f"✅ Erzeugt in {t_gen:.1f} s, geladen in {t_load:.1f} s (Datenbank {args.db}, Seed {args.seed})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Importzeiten der Seiten beim Kaltstart (wie nach "systemctl restart").
+#
+# Je Seite werden die Importe auf oberster Ebene aus dem Quelltext gelesen und
+# in einem frischen Interpreter mit "python -X importtime" ausgeführt, nachdem
+# streamlit bereits geladen ist. Gemessen wird also nur, was die Seite selbst
+# zusätzlich lädt; Importe in Funktionen oder hinter Buttons zählen nicht mit.
+# Liegt eine Seite über dem Budget (--budget, Standard BUDGET_MS), endet der
+# Lauf mit Exit-Code 1.
+#
+# Aufruf aus dem Projektverzeichnis:
+#   python -m bench.import_profile
+#   python -m bench.import_profile --budget 600 --laeufe 5 -o importe.json
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASIS = "import streamlit"
+# Kaltstart-Budget je Seite: pandas (für Tabellen) plus die eigenen Module
+BUDGET_MS = 800.0
+
+
+def seiten():
+    return [os.path.join(APP_DIR, f) for f in ("main.py", "app.py")] + \
+        sorted(glob.glob(os.path.join(APP_DIR, "pages", "*.py")))
+
+
+def top_level_imports(pfad):
+    """Importanweisungen auf oberster Ebene einer Seite als Quelltext."""
+    with open(pfad, encoding="utf-8") as f:
+        baum = ast.parse(f.read(), pfad)
+    return [ast.unparse(n) for n in baum.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+
+
+def _importtime(code):
+    # Ausgabe von -X importtime: "import time: self [us] | cumulative | imported package"
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=APP_DIR,
+                         capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1])
+    module = []
+    for zeile in res.stderr.splitlines():
+        if not zeile.startswith("import time:") or "imported package" in zeile:
+            continue
+        selbst, kumuliert, name = zeile[len("import time:"):].split("|")
+        tiefe = (len(name) - len(name.lstrip()) - 1) // 2
+        module.append((name.strip(), int(selbst) / 1000, int(kumuliert) / 1000, tiefe))
+    return module
+
+
+def profil(pfad, basis, laeufe=3, top=5):
+    """Zusätzliche Importzeit der Seite gegenüber streamlit (Median über die Läufe).
+
+    basis: Namen der Module, die streamlit selbst schon lädt
+    """
+    importe = top_level_imports(pfad)
+    code = "\n".join([BASIS] + [i for i in importe if i != BASIS])
+    gesamt, schwer = [], {}
+    for _ in range(laeufe):
+        module = _importtime(code)
+        neu = [(name, selbst, kum, tiefe) for name, selbst, kum, tiefe in module if name not in basis]
+        gesamt.append(sum(selbst for _, selbst, _, _ in neu))
+        # Direkt von der Seite ausgelöste Importe mit ihrer kumulierten Zeit
+        for name, _, kum, tiefe in neu:
+            if tiefe == 0:
+                schwer.setdefault(name, []).append(kum)
+    schwer = sorted(((n, statistics.median(z)) for n, z in schwer.items()), key=lambda x: x[1], reverse=True)
+    return {"ms": round(statistics.median(gesamt), 1), "module": len(neu),
+            "schwer": [(n, round(z, 1)) for n, z in schwer[:top]]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importzeiten der Streamlit-Seiten (Kaltstart)")
+    parser.add_argument("--laeufe", type=int, default=3, help="Wiederholungen je Seite (Median)")
+    parser.add_argument("--top", type=int, default=5, help="Anzahl der teuersten Importe je Seite")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS,
+                        help=f"Höchstens so viele ms zusätzlich zu streamlit je Seite (Standard: {BUDGET_MS:.0f}, 0 = aus)")
+    parser.add_argument("--nur", help="Nur Seiten, deren Dateiname diesen Text enthält")
+    parser.add_argument("-o", "--output", help="Ergebnis als JSON speichern")
+    args = parser.parse_args(argv)
+
+    laeufe = [_importtime(BASIS) for _ in range(args.laeufe)]
+    basis = statistics.median(sum(s for _, s, _, _ in lauf) for lauf in laeufe)
+    basis_module = {name for lauf in laeufe for name, *_ in lauf}
+    print(f"⏱️  streamlit selbst: {basis:.0f} ms")
+    ergebnis, ueber = {}, 0
+    for pfad in seiten():
+        name = os.path.relpath(pfad, APP_DIR)
+        if args.nur and args.nur.lower() not in name.lower():
+            continue
+        try:
+            p = profil(pfad, basis_module, args.laeufe, args.top)
+        except RuntimeError as e:
+            print(f"❌ {name}: {e}")
+            ueber += 1
+            continue
+        ergebnis[name] = p
+        zu_langsam = bool(args.budget) and p["ms"] > args.budget
+        ueber += zu_langsam
+        print(f"{'🔴' if zu_langsam else '🟢'} {name:<32} {p['ms']:>7.0f} ms  {p['module']:>4} Module")
+        for modul, ms in p["schwer"]:
+            print(f"      {modul:<28} {ms:>7.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"streamlit_ms": round(basis, 1), "budget_ms": args.budget, "seiten": ergebnis},
+                      f, indent=2, ensure_ascii=False)
+        print(f"💾 Ergebnis gespeichert: {args.output}")
+    if ueber:
+        print(f"❌ {ueber} Seite(n) über dem Budget von {args.budget:.0f} ms oder fehlerhaft")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
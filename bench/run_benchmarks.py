@@ -0,0 +1,250 @@
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from arrears import aging_report
+from bank_import import commit_payments, parse_transactions
+from bench.generate_data import BENCH_DB, bank_csv, connect
+from database import DB_PARAMS
+from keyword_matcher import get_matcher
+from kpis import load_kpis
+from ledger import month_income, open_items, statement_history
+from meter_consumption import year_consumption
+from payment_history import fetch_page, totals
+from settlement import (allocate, allocation_matrix, compute_settlement, load_expenses, load_landlord,
+                        load_tenant, load_tenants_for_year)
+
+# Zeitmessung der Abfragen und Berechnungen hinter den Seiten, jeweils mit
+# denselben Funktionen, die auch die Seiten aufrufen. Läuft gegen die
+# Benchmark-Datenbank (siehe generate_data.py) und schreibt einen JSON-Bericht,
+# der mit einem früheren Bericht verglichen werden kann.
+#
+# Aufruf aus dem Projektverzeichnis:
+#   python -m bench.run_benchmarks -o bench_2025-06.json
+#   python -m bench.run_benchmarks --vergleich bench_2025-06.json --schwelle 1.2
+
+HEUTE = date.today()
+MONAT = HEUTE.replace(day=1)
+
+
+def _kontext(conn):
+    # Stichproben: aktuelle Mieter (mit langer Historie zuerst) und das Vorjahr
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id FROM tenants WHERE move_out IS NULL ORDER BY move_in NULLS FIRST, id LIMIT 20
+    """)
+    mieter = [r[0] for r in cur.fetchall()]
+    cur.close()
+    if not mieter:
+        raise ValueError("Keine aktiven Mieter – bitte zuerst bench.generate_data ausführen.")
+    return {"mieter": mieter, "jahr": HEUTE.year - 1}
+
+
+def _bank_import(conn, ctx):
+    df = pd.read_csv(io.StringIO(ctx["bank_csv"]), sep=None, engine="python")
+    tx = parse_transactions(df, "Buchungstag", "Betrag", "Verwendungszweck")
+    # Wie auf der Seite: Automat aus dem prozessweiten Cache
+    matcher = get_matcher(ctx["keywords"])
+    results = []
+    for datum, betrag, zweck in zip(tx["Datum"], tx["Betrag"], tx["Zweck"]):
+        treffer = matcher.match(zweck)
+        results.append({"Datum": datum, "Betrag": betrag, "Zweck": zweck,
+                        "Mieter": treffer.tenant_id or "Unbekannt"})
+    summary = commit_payments(conn, results, {t: t for t in ctx["keywords"].values()})
+    return summary["inserted"]
+
+
+def _bank_import_vorbereiten(conn, ctx):
+    ctx["bank_csv"] = bank_csv(conn, (MONAT - timedelta(days=1)).replace(day=1))
+    cur = conn.cursor()
+    cur.execute("SELECT keyword, tenant_id FROM tenant_keywords")
+    ctx["keywords"] = dict(cur.fetchall())
+    cur.close()
+
+
+def _bank_import_aufraeumen(conn, ctx):
+    # Die importierten Zahlungen wieder entfernen, damit jeder Lauf gleich groß ist
+    cur = conn.cursor()
+    cur.execute("DELETE FROM payments WHERE note LIKE 'Auto-Import: SEPA-GUTSCHRIFT%'")
+    conn.commit()
+    cur.close()
+
+
+def _einnahmen(conn, ctx):
+    month_income(conn)
+    return 1
+
+
+def _settlement_einzel(conn, ctx):
+    cur = conn.cursor()
+    haus = load_landlord(cur, jahr=ctx["jahr"])
+    n = 0
+    for t_id in ctx["mieter"]:
+        mieter = load_tenant(cur, t_id)
+        n += len(compute_settlement(mieter, haus, load_expenses(cur, ctx["jahr"], t_id), ctx["jahr"])["rows"])
+    cur.close()
+    return n
+
+
+def _settlement_alle(conn, ctx):
+    cur = conn.cursor()
+    haus = load_landlord(cur, jahr=ctx["jahr"])
+    tenants = load_tenants_for_year(cur, ctx["jahr"])
+    expenses = load_expenses(cur, ctx["jahr"])
+    cur.close()
+    return len(allocate(tenants, haus, expenses, ctx["jahr"]))
+
+
+def _verteilung(conn, ctx):
+    cur = conn.cursor()
+    haus = load_landlord(cur, jahr=ctx["jahr"])
+    tenants = load_tenants_for_year(cur, ctx["jahr"])
+    expenses = load_expenses(cur, ctx["jahr"])
+    cur.close()
+    return allocation_matrix(tenants, haus, expenses, ctx["jahr"])[0].size
+
+
+def _zahlungsverlauf(conn, ctx):
+    # Erste Seite, zehnmal "Weiter", Summen zum Filter
+    n, after = 0, None
+    for _ in range(11):
+        rows, after = fetch_page(conn, {}, after)
+        n += len(rows)
+        if after is None:
+            break
+    totals(conn, {})
+    return n
+
+
+# (Seite, Name, Funktion(conn, ctx) -> Anzahl Zeilen/Ergebnisse, Vorbereitung, Aufräumen)
+FAELLE = [
+    ("main", "Kennzahlen (ohne Cache)", lambda c, ctx: len(load_kpis(c, MONAT)["df_occ"]), None, None),
+    ("app", "Einnahmen lfd. Monat", _einnahmen, None, None),
+    ("app", "Offene Posten", lambda c, ctx: len(open_items(c)), None, None),
+    ("app", "Rückstände nach Alter", lambda c, ctx: len(aging_report(c)[0]), None, None),
+    ("01", "Kontoauszug (20 Mieter)",
+     lambda c, ctx: sum(len(statement_history(c, t, ctx["jahr"])) for t in ctx["mieter"]), None, None),
+    ("01", "Nebenkosten Einzelabrechnung (20 Mieter)", _settlement_einzel, None, None),
+    ("01", "Sammelabrechnung Berechnung (alle Mieter)", _settlement_alle, None, None),
+    ("03", "Zählerverbrauch Vorjahr (alle Zähler)", lambda c, ctx: len(year_consumption(c, ctx["jahr"])), None, None),
+    ("06", "Zahlungsverlauf 11 Seiten + Summen", _zahlungsverlauf, None, None),
+    ("07", "Verteilung prüfen (Matrix)", _verteilung, None, None),
+    ("09", "Bank-Import Vormonat (Parsen, Zuordnen, Speichern)", _bank_import,
+     _bank_import_vorbereiten, _bank_import_aufraeumen),
+]
+
+
+def _umfang(conn):
+    cur = conn.cursor()
+    umfang = {}
+    for tabelle in ("apartments", "tenants", "payments", "operating_expenses", "meters", "meter_readings"):
+        cur.execute(f"SELECT COUNT(*) FROM {tabelle}")
+        umfang[tabelle] = cur.fetchone()[0]
+    cur.execute("SHOW server_version")
+    version = cur.fetchone()[0]
+    cur.close()
+    return umfang, version
+
+
+def _git_stand():
+    res = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return res.stdout.strip() or None
+
+
+def run(conn, laeufe=5, filter_text=None, log=print):
+    """Führt alle Fälle aus und liefert den Bericht als Dict."""
+    ctx = _kontext(conn)
+    umfang, pg_version = _umfang(conn)
+    ergebnisse = {}
+    for seite, name, funktion, vorbereiten, aufraeumen in FAELLE:
+        schluessel = f"{seite}: {name}"
+        if filter_text and filter_text.lower() not in schluessel.lower():
+            continue
+        if vorbereiten:
+            vorbereiten(conn, ctx)
+        zeiten = []
+        for _ in range(laeufe):
+            t0 = time.perf_counter()
+            zeilen = funktion(conn, ctx)
+            zeiten.append((time.perf_counter() - t0) * 1000)
+            conn.rollback()
+            if aufraeumen:
+                aufraeumen(conn, ctx)
+        ergebnisse[schluessel] = {
+            "min_ms": round(min(zeiten), 2), "median_ms": round(statistics.median(zeiten), 2),
+            "max_ms": round(max(zeiten), 2), "zeilen": int(zeilen or 0),
+        }
+        log(f"   {schluessel:<62} {ergebnisse[schluessel]['median_ms']:>10.1f} ms")
+    return {
+        "erstellt": datetime.now().isoformat(timespec="seconds"),
+        "git": _git_stand(), "python": platform.python_version(), "postgres": pg_version,
+        "umfang": umfang, "laeufe": laeufe, "ergebnisse": ergebnisse,
+    }
+
+
+def vergleich(alt, neu, schwelle):
+    """Liste (Fall, alt_ms, neu_ms, Faktor, Regression?) über gemeinsame Fälle (Median)."""
+    zeilen = []
+    for fall, werte in neu["ergebnisse"].items():
+        if fall not in alt["ergebnisse"]:
+            continue
+        a, n = alt["ergebnisse"][fall]["median_ms"], werte["median_ms"]
+        faktor = n / a if a else float("inf")
+        zeilen.append((fall, a, n, faktor, faktor > schwelle))
+    return zeilen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks der Seitenabfragen (JSON-Bericht)")
+    parser.add_argument("--db", default=BENCH_DB, help=f"Benchmark-Datenbank (Standard: {BENCH_DB})")
+    parser.add_argument("--laeufe", type=int, default=5, help="Wiederholungen je Fall")
+    parser.add_argument("--nur", help="Nur Fälle, deren Name diesen Text enthält")
+    parser.add_argument("-o", "--output", help="Bericht als JSON speichern")
+    parser.add_argument("--vergleich", help="Früherer JSON-Bericht zum Vergleich")
+    parser.add_argument("--schwelle", type=float, default=1.25, help="Faktor, ab dem ein Fall als langsamer gilt")
+    args = parser.parse_args(argv)
+
+    if args.db == DB_PARAMS["dbname"]:
+        parser.error(f"'{args.db}' ist die produktive Datenbank – der Bank-Import-Fall schreibt Zahlungen.")
+    # Zusätzliche Verbindungen für parallele Abfragen (query_batch.py) aus derselben Datenbank
+    DB_PARAMS["dbname"] = args.db
+
+    conn = connect(args.db)
+    try:
+        print(f"⏱️  Benchmarks gegen {args.db} ({args.laeufe} Läufe, Median):")
+        bericht = run(conn, args.laeufe, args.nur)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+    print("   Umfang: " + ", ".join(f"{t} {n}" for t, n in bericht["umfang"].items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(bericht, f, indent=2, ensure_ascii=False)
+        print(f"💾 Bericht gespeichert: {args.output}")
+
+    if args.vergleich:
+        with open(args.vergleich, encoding="utf-8") as f:
+            alt = json.load(f)
+        if alt.get("umfang") != bericht["umfang"]:
+            print("⚠️  Datenumfang weicht vom Vergleichsbericht ab – Zeiten nur bedingt vergleichbar.")
+        langsamer = 0
+        for fall, a, n, faktor, regression in vergleich(alt, bericht, args.schwelle):
+            langsamer += regression
+            print(f"   {'🔴' if regression else '🟢'} {fall:<62} {a:>9.1f} -> {n:>9.1f} ms ({faktor:.2f}x)")
+        return 1 if langsamer else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
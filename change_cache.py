@@ -0,0 +1,70 @@
+import threading
+
+# Prozessweiter Cache für teure Auswertungen, invalidiert über die
+# Änderungszähler der Tabellen (table_change_counters, Migration 0005).
+# Statt eines festen Ablaufs (TTL) wird bei jedem Zugriff nur die Version der
+# benötigten Tabellen gelesen (ein Primärschlüssel-Zugriff); erst wenn sich
+# eine davon geändert hat, wird neu gerechnet.
+
+_lock = threading.Lock()
+_cache = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+def table_versions(conn, tables):
+    """Epoche der Datenbank und aktuelle Versionen der Tabellen als Tupel.
+
+    Liefert (epoche, version_1, ...) in der Reihenfolge von tables. Nach einem
+    Restore stehen die Zähler wieder auf alten Werten; die Epoche (OID der
+    Datenbank und die beim Restore gesetzte Kennung, siehe backup.py) sorgt
+    dafür, dass sich Versionen trotzdem nie wiederholen - auch für Caches in
+    anderen Prozessen wie api.py. Die Version ist die Summe der Slots (0008).
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT (SELECT oid FROM pg_database WHERE datname = current_database())::text
+                   || '/' || COALESCE(current_setting('hausverwaltung.epoch', true), ''),
+               (SELECT json_object_agg(table_name, version) FROM (
+                    SELECT table_name, SUM(version) AS version FROM table_change_counters
+                    WHERE table_name = ANY(%s) GROUP BY table_name
+                ) s)
+    """, (list(tables),))
+    epoch, versions = cur.fetchone()
+    cur.close()
+    versions = versions or {}
+    return (epoch,) + tuple(versions.get(t, 0) for t in tables)
+
+
+def cached(conn, key, tables, compute):
+    """Liefert compute(conn) aus dem Speicher, solange sich keine der Tabellen geändert hat.
+
+    key muss alles enthalten, wovon das Ergebnis außer den Tabellen abhängt
+    (z.B. den laufenden Monat). Das Ergebnis wird zwischen allen Sitzungen
+    geteilt und darf daher nicht verändert werden.
+    """
+    # Version vor dem Rechnen lesen: eine Änderung währenddessen führt beim
+    # nächsten Zugriff zu einer Neuberechnung, nie zu veralteten Daten
+    versions = table_versions(conn, tables)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == versions:
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+    value = compute(conn)
+    with _lock:
+        _cache[key] = (versions, value)
+    return value
+
+
+def invalidate(key=None):
+    with _lock:
+        if key is None:
+            _cache.clear()
+        else:
+            _cache.pop(key, None)
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_cache))
@@ -0,0 +1,206 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from datetime import date
+
+# Kommandozeile für nächtliche Jobs (cron/systemd-Timer), ohne Streamlit.
+# Benutzt dieselben Module wie die Seiten; jedes Unterkommando importiert nur,
+# was es braucht, damit der Start schnell bleibt.
+#
+#   python cli.py mieterkonto                 Mieterkonto fortschreiben (--neu: komplett)
+#   python cli.py rueckstaende                Einnahmen, offene Posten, Rückstände nach Alter
+#   python cli.py backup [--behalten 7]       Datenbank sichern (siehe backup.py)
+#   python cli.py abrechnungen 2025           Nebenkostenabrechnungen als ZIP (siehe nk_batch.py)
+#   python cli.py bankimport /srv/bank        Bank-CSVs eines Verzeichnisses verbuchen (Dateien mit
+#                                             offenen Zeilen bleiben liegen und werden erneut versucht)
+
+
+def _connect():
+    from database import get_conn
+    conn = get_conn()
+    if not conn:
+        print("❌ Keine Datenbankverbindung möglich.")
+    return conn
+
+
+def cmd_mieterkonto(args):
+    from ledger import ensure_current, refresh
+    conn = _connect()
+    if not conn:
+        return 1
+    try:
+        t0 = time.perf_counter()
+        if args.neu or args.mieter:
+            refresh(conn, args.mieter)
+            umfang = f"{len(args.mieter)} Mieter" if args.mieter else "alle Mieter"
+            print(f"✅ Mieterkonto neu berechnet ({umfang}, {time.perf_counter() - t0:.1f} s)")
+        else:
+            n = ensure_current(conn)
+            print(f"✅ Mieterkonto aktuell ({n} Mieter ergänzt, {time.perf_counter() - t0:.1f} s)")
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_rueckstaende(args):
+    from arrears import BUCKETS, aging_report
+    from ledger import ensure_current, month_income, open_items
+    conn = _connect()
+    if not conn:
+        return 1
+    try:
+        ensure_current(conn)
+        stichtag = args.stichtag or date.today()
+        total = month_income(conn, stichtag)
+        debtors = open_items(conn, stichtag)
+        aging_rows, aging_totals = aging_report(conn, stichtag)
+    finally:
+        conn.close()
+
+    print(f"📊 Hausverwaltung {stichtag.month:02d}/{stichtag.year}")
+    print(f"💰 Einnahmen im Monat: {total:.2f} Euro")
+    print("\n⚠️  Offene Mieten im Monat:")
+    if not debtors:
+        print("   ✅ Alle Mieten sind vollständig bezahlt!")
+    for vorname, nachname, _, soll, ist, offen, _ in debtors:
+        print(f"   ❌ {vorname} {nachname}: noch {offen:.2f} Euro offen (Soll: {soll:.2f} | Gezahlt: {ist:.2f})")
+
+    print(f"\n⏳ Rückstände nach Alter (gesamt {aging_totals['gesamt']:.2f} Euro):")
+    for stufe in BUCKETS:
+        print(f"   {stufe:<14} {aging_totals[stufe]:>10.2f} Euro")
+    for r in aging_rows[:args.top]:
+        print(f"   ❌ {r['name']} ({r['wohnung']}): {r['gesamt']:.2f} Euro, offen seit {r['aelteste'].strftime('%d.%m.%Y')}")
+
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame(aging_rows).to_csv(args.csv, sep=";", decimal=",", index=False, encoding="utf-8-sig")
+        print(f"💾 {len(aging_rows)} Zeilen in {args.csv}")
+    # Für Überwachung: Rückstände älter als 90 Tage als Fehlercode melden
+    return 2 if args.warnen and aging_totals[BUCKETS[-1]] > 0 else 0
+
+
+def cmd_backup(args):
+    import backup
+    return backup.main(args.rest)
+
+
+def cmd_abrechnungen(args):
+    import nk_batch
+    return nk_batch.main(args.rest)
+
+
+def _import_datei(conn, pfad, args, keywords):
+    import pandas as pd
+    from bank_import import commit_payments, count_known, parse_transactions
+    from keyword_matcher import get_matcher
+
+    df = pd.read_csv(pfad, sep=None, engine="python", encoding=args.encoding)
+    fehlend = [s for s in (args.datum, args.betrag, args.zweck, args.konto) if s and s not in df.columns]
+    if fehlend:
+        raise ValueError(f"Spalte(n) fehlen: {', '.join(fehlend)}")
+    tx = parse_transactions(df, args.datum, args.betrag, args.zweck, args.konto)
+    matcher = get_matcher(keywords)
+    results = []
+    for datum, betrag, zweck, konto in zip(tx["Datum"], tx["Betrag"], tx["Zweck"], tx["Konto"]):
+        treffer = matcher.match(zweck)
+        # Mehrdeutige Treffer liefern keinen Mieter und bleiben unverbucht
+        results.append({"Datum": datum, "Betrag": betrag, "Zweck": zweck, "Konto": konto, "Mieter": treffer.tenant_id})
+    if args.trocken:
+        erkannt = sum(r["Mieter"] is not None for r in results)
+        return {"inserted": 0, "skipped": len(results) - erkannt, "failed": 0, "erkannt": erkannt,
+                "duplicates": count_known(conn, results)}
+    # Mieter-Spalte enthält bereits die ID
+    ids = {r["Mieter"]: r["Mieter"] for r in results if r["Mieter"] is not None}
+    return commit_payments(conn, results, ids)
+
+
+def cmd_bankimport(args):
+    dateien = sorted(glob.glob(os.path.join(args.verzeichnis, args.muster)))
+    if not dateien:
+        print(f"ℹ️  Keine Dateien ({args.muster}) in {args.verzeichnis}")
+        return 0
+    conn = _connect()
+    if not conn:
+        return 1
+    archiv = args.archiv or os.path.join(args.verzeichnis, "importiert")
+    fehler = 0
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT keyword, tenant_id FROM tenant_keywords")
+        keywords = {row[0].lower(): row[1] for row in cur.fetchall()}
+        cur.close()
+        for pfad in dateien:
+            name = os.path.basename(pfad)
+            try:
+                summary = _import_datei(conn, pfad, args, keywords)
+            except Exception as e:
+                conn.rollback()
+                fehler += 1
+                print(f"❌ {name}: {e}")
+                continue
+            if args.trocken:
+                print(f"🔎 {name}: {summary['erkannt']} erkannt, {summary['skipped']} ohne Mieter, "
+                      f"{summary['duplicates']} bereits importiert")
+                continue
+            print(f"✅ {name}: {summary['inserted']} verbucht, {summary['duplicates']} bereits importiert, "
+                  f"{summary['skipped']} übersprungen, {summary['failed']} fehlerhaft")
+            if summary['skipped'] or summary['failed']:
+                # Offene Zeilen (kein/mehrdeutiger Mieter, unlesbar) beim nächsten Lauf erneut
+                # versuchen, z.B. nach neuen Suchbegriffen; Verbuchtes erkennt der Fingerabdruck
+                print(f"   ↩️  {name} bleibt im Eingang ({summary['skipped'] + summary['failed']} Zeilen offen)")
+                continue
+            # Vollständig verbuchte Dateien wegräumen
+            os.makedirs(archiv, exist_ok=True)
+            shutil.move(pfad, os.path.join(archiv, name))
+    finally:
+        conn.close()
+    return 1 if fehler else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hausverwaltung: Jobs für die Kommandozeile (cron)")
+    sub = parser.add_subparsers(dest="befehl", required=True)
+
+    p = sub.add_parser("mieterkonto", help="Mieterkonto (tenant_ledger_monthly) fortschreiben")
+    p.add_argument("--neu", action="store_true", help="Alle Mieter komplett neu berechnen")
+    p.add_argument("--mieter", type=int, nargs="+", help="Nur diese Mieter-IDs neu berechnen")
+    p.set_defaults(func=cmd_mieterkonto)
+
+    p = sub.add_parser("rueckstaende", help="Einnahmen, offene Posten und Rückstände nach Alter")
+    p.add_argument("--stichtag", type=date.fromisoformat, help="Stichtag JJJJ-MM-TT (Standard: heute)")
+    p.add_argument("--top", type=int, default=10, help="Anzahl Mieter in der Liste")
+    p.add_argument("--csv", help="Rückstände je Mieter als CSV speichern")
+    p.add_argument("--warnen", action="store_true", help="Exit-Code 2 bei Rückständen über 90 Tage")
+    p.set_defaults(func=cmd_rueckstaende)
+
+    # backup und abrechnungen reichen ihre Optionen an backup.py bzw. nk_batch.py weiter
+    p = sub.add_parser("backup", help="Datenbank sichern (Optionen wie backup.py)", add_help=False)
+    p.set_defaults(func=cmd_backup, weiter=True)
+
+    p = sub.add_parser("abrechnungen", help="Nebenkostenabrechnungen als ZIP (Optionen wie nk_batch.py)", add_help=False)
+    p.set_defaults(func=cmd_abrechnungen, weiter=True)
+
+    p = sub.add_parser("bankimport", help="Bank-CSVs eines Verzeichnisses zuordnen und verbuchen")
+    p.add_argument("verzeichnis", help="Verzeichnis mit den CSV-Dateien")
+    p.add_argument("--muster", default="*.csv", help="Dateimuster (Standard: *.csv)")
+    p.add_argument("--archiv", help="Ziel für vollständig verbuchte Dateien (Standard: <verzeichnis>/importiert)")
+    p.add_argument("--datum", default="Buchungstag", help="Spalte für das Datum")
+    p.add_argument("--betrag", default="Betrag", help="Spalte für den Betrag")
+    p.add_argument("--zweck", default="Verwendungszweck", help="Spalte für Verwendungszweck / Name")
+    p.add_argument("--konto", help="Spalte für Konto / IBAN des Zahlers (optional, ohne Einfluss auf den Fingerabdruck)")
+    p.add_argument("--encoding", default="utf-8-sig", help="Zeichensatz der CSV (z.B. latin-1)")
+    p.add_argument("--trocken", action="store_true", help="Nur zuordnen und berichten, nichts speichern")
+    p.set_defaults(func=cmd_bankimport)
+
+    args, rest = parser.parse_known_args(argv)
+    if not getattr(args, "weiter", False) and rest:
+        parser.error(f"Unbekannte Argumente: {' '.join(rest)}")
+    args.rest = rest
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
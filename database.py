@@ -1,17 +1,278 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool as pg_pool
+
+from query_log import TimedConnection, caller_page
+
+# --- KONFIGURATION ---
+# Wir geben NUR den Datenbanknamen und User an.
+# Ohne 'host' nutzt Python automatisch den lokalen Socket,
+# genau wie der erfolgreiche 'psql' Befehl.
+DB_PARAMS = {
+    "dbname": os.environ.get("DB_NAME", "hausverwaltung"),
+    "user": os.environ.get("DB_USER", "postgres"),
+    "client_encoding": "UTF8",
+}
+
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+# Wartezeit (Sekunden), wenn alle Verbindungen vergeben sind
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Verbindungen, die länger ungenutzt waren, werden vor der Ausgabe geprüft
+HEALTHCHECK_IDLE = float(os.environ.get("DB_HEALTHCHECK_IDLE", "30"))
+
+_log = logging.getLogger("hausverwaltung.db")
+
+# --- PROZESSWEITER POOL ---
+# Das Modul wird von Streamlit nur einmal pro Prozess importiert, der Pool
+# überlebt daher alle Reruns und Sessions.
+_pool = None
+_pool_lock = threading.Lock()
+# Begrenzt die Ausleihen über alle Pools hinweg (auch über einen Neuaufbau)
+_slots = threading.BoundedSemaphore(POOL_MAX)
+_last_used = {}
+_stats = {
+    "connects": 0,
+    "checkouts": 0,
+    "reconnects": 0,
+    "waits": 0,
+    "errors": 0,
+    "in_use": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(key, delta=1):
+    with _stats_lock:
+        _stats[key] += delta
+
+
+class _PoolConnection(TimedConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _count("connects")
+
+
+class _TrackedPool(pg_pool.ThreadedConnectionPool):
+    """psycopg2-Pool mit eigener Buchführung über freie und vergebene Verbindungen.
+
+    Nutzt nur die öffentlichen Methoden von psycopg2. Ein ausgemusterter Pool
+    (close_idle_connections) schließt seine freien Verbindungen sofort, gibt
+    keine mehr aus und wird geschlossen, sobald die letzte vergebene
+    Verbindung zurückkommt.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.idle = 0
+        self.in_use = 0
+        self.retired = False
+        self.track_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+        # Beim Anlegen baut psycopg2 minconn Verbindungen auf
+        self.idle = self.minconn
+
+    def getconn(self, key=None):
+        with self.track_lock:
+            if self.retired:
+                raise pg_pool.PoolError("Pool wurde ausgemustert")
+            conn = super().getconn(key)
+            # Freie Verbindungen werden zuerst vergeben
+            self.idle = max(self.idle - 1, 0)
+            self.in_use += 1
+        conn.owner = self
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        with self.track_lock:
+            super().putconn(conn, key, close=close or self.retired)
+            self.in_use -= 1
+            # Der Pool behält höchstens minconn freie Verbindungen, den Rest schließt er
+            if not conn.closed:
+                self.idle += 1
+            if self.retired and self.in_use == 0:
+                self.closeall()
+                self.idle = 0
+
+    def retire(self):
+        with self.track_lock:
+            self.retired = True
+            if self.in_use == 0:
+                self.closeall()
+            else:
+                # Freie Verbindungen kommen zuerst zurück - ausleihen und schließen
+                for _ in range(self.idle):
+                    super().putconn(super().getconn(), close=True)
+            self.idle = 0
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _TrackedPool(POOL_MIN, POOL_MAX, connection_factory=_PoolConnection, **DB_PARAMS)
+    return _pool
+
+
+def _getconn():
+    # Wird der Pool gerade ausgemustert, die Verbindung aus dem neuen holen
+    while True:
+        p = _get_pool()
+        try:
+            return p.getconn()
+        except pg_pool.PoolError:
+            if not p.retired:
+                raise
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    # Frisch aufgebaute oder gerade erst benutzte Verbindungen nicht extra prüfen
+    if last_used is None or time.monotonic() - last_used < HEALTHCHECK_IDLE:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def _checkout(page=None, wait=True):
+    if not _slots.acquire(blocking=False):
+        if not wait:
+            return None
+        _count("waits")
+        if not _slots.acquire(timeout=POOL_TIMEOUT):
+            raise pg_pool.PoolError("Keine freie Datenbankverbindung (Timeout)")
+    try:
+        conn = _getconn()
+        # Tote Verbindungen (z.B. nach Neustart von PostgreSQL) verwerfen und neu aufbauen
+        for _ in range(POOL_MAX):
+            if _is_healthy(conn):
+                break
+            _count("reconnects")
+            _last_used.pop(id(conn), None)
+            conn.owner.putconn(conn, close=True)
+            conn = _getconn()
+    except Exception:
+        _slots.release()
+        raise
+    _count("checkouts")
+    _count("in_use")
+    # Alle Abfragen bis zur Rückgabe zählen zu diesem Seitenaufruf (query_log)
+    conn.begin_render(page or caller_page())
+    return conn
+
+
+def _release(conn, failed=False):
+    try:
+        conn.end_render()
+        # Zurück in den Pool, aus dem sie kam (auch wenn der inzwischen ausgemustert ist)
+        conn.owner.putconn(conn, close=conn.closed or failed)
+        # Überzählige und ausgemusterte Verbindungen schließt der Pool selbst
+        if conn.closed:
+            _last_used.pop(id(conn), None)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+    finally:
+        _count("in_use", -1)
+        _slots.release()
+
+
+@contextmanager
+def db_conn():
+    """Leiht eine Verbindung aus dem Pool aus; liefert None, wenn die DB nicht erreichbar ist."""
+    try:
+        conn = _checkout()
+    except Exception as e:
+        _count("errors")
+        _log.warning("Verbindungsfehler: %s", e)
+        yield None
+        return
+
+    failed = False
+    try:
+        yield conn
+        if not conn.closed:
+            conn.commit()
+    except BaseException:
+        # Auch st.rerun()/st.stop() landen hier (BaseException) - offene Transaktion verwerfen
+        try:
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            failed = True
+        raise
+    finally:
+        _release(conn, failed=failed)
+
+
+@contextmanager
+def spare_conn(page=None):
+    """Zusätzliche Pool-Verbindung für parallele Leseabfragen (query_batch.py).
+
+    Wartet nicht: ist gerade keine Verbindung frei, wird None geliefert und der
+    Aufrufer arbeitet mit seiner eigenen Verbindung weiter.
+    """
+    try:
+        conn = _checkout(page, wait=False)
+    except Exception as e:
+        _count("errors")
+        _log.warning("Verbindungsfehler: %s", e)
+        conn = None
+    if conn is None:
+        yield None
+        return
+
+    failed = False
+    try:
+        yield conn
+    finally:
+        # Nur gelesen - Transaktion immer verwerfen
+        try:
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            failed = True
+        _release(conn, failed=failed)
+
+
+def pool_stats():
+    """Kennzahlen des Verbindungspools (für Diagnose und Monitoring)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["max_size"] = POOL_MAX
+    stats["idle"] = _pool.idle if _pool is not None else 0
+    stats["open"] = stats["idle"] + stats["in_use"]
+    return stats
+
+
+def close_idle_connections():
+    # Ungenutzte Pool-Verbindungen schließen (z.B. vor DROP DATABASE beim Restore):
+    # Pool ausmustern, die nächste Ausleihe baut einen neuen auf. Noch vergebene
+    # Verbindungen werden bei der Rückgabe geschlossen.
+    global _pool
+    with _pool_lock:
+        alt, _pool = _pool, None
+    if alt is not None:
+        alt.retire()
+
 
 def get_conn():
+    # Eigenständige Verbindung außerhalb des Pools (z.B. für DROP DATABASE beim Restore)
     try:
-        # Wir geben NUR den Datenbanknamen und User an.
-        # Ohne 'host' nutzt Python automatisch den lokalen Socket,
-        # genau wie dein erfolgreicher 'psql' Befehl eben.
-        conn = psycopg2.connect(
-            dbname="hausverwaltung",
-            user="postgres"
-        )
-        conn.set_client_encoding('UTF8')
+        conn = psycopg2.connect(connection_factory=TimedConnection, **DB_PARAMS)
+        _count("connects")
         return conn
     except Exception as e:
-        # Falls es im Streamlit-Log auftaucht
-        print(f"Verbindungsfehler: {e}")
+        # Landet im Streamlit-Log
+        _count("errors")
+        _log.warning("Verbindungsfehler: %s", e)
         return None
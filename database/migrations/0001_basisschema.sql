@@ -0,0 +1,88 @@
+-- 0001: Basisschema der Hausverwaltung
+-- Fasst die bisher in main.py, den Seiten, db_update.py und install/init_db.sql
+-- verstreuten Tabellen zusammen. Alle Befehle sind idempotent, damit auch
+-- bestehende Installationen (ohne schema_version) sauber übernommen werden.
+
+-- 1. Vermieter-Einstellungen
+CREATE TABLE IF NOT EXISTS landlord_settings (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255),
+    street VARCHAR(255),
+    city VARCHAR(255),
+    iban VARCHAR(50),
+    bank_name VARCHAR(255),
+    total_area NUMERIC(10,2) DEFAULT 0,
+    total_occupants INTEGER DEFAULT 0
+);
+ALTER TABLE landlord_settings ADD COLUMN IF NOT EXISTS total_units INTEGER DEFAULT 0;
+ALTER TABLE landlord_settings ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+INSERT INTO landlord_settings (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- 2. Wohnungen
+CREATE TABLE IF NOT EXISTS apartments (
+    id SERIAL PRIMARY KEY,
+    unit_name VARCHAR(255) NOT NULL,
+    area NUMERIC(10,2) DEFAULT 0,
+    base_rent NUMERIC(10,2) DEFAULT 0
+);
+ALTER TABLE apartments ADD COLUMN IF NOT EXISTS service_charge_prepayment NUMERIC(10,2) DEFAULT 0;
+
+-- 3. Mieter
+CREATE TABLE IF NOT EXISTS tenants (
+    id SERIAL PRIMARY KEY,
+    first_name VARCHAR(255),
+    last_name VARCHAR(255),
+    apartment_id INTEGER REFERENCES apartments(id)
+);
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS move_in DATE;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS move_out DATE;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS occupants INTEGER DEFAULT 1;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS monthly_prepayment NUMERIC(10,2) DEFAULT 0;
+ALTER TABLE tenants ADD COLUMN IF NOT EXISTS base_rent NUMERIC(10,2) DEFAULT 0;
+
+-- 4. Zahlungen
+CREATE TABLE IF NOT EXISTS payments (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER REFERENCES tenants(id),
+    amount NUMERIC(10,2) DEFAULT 0,
+    payment_date DATE DEFAULT CURRENT_DATE,
+    payment_type VARCHAR(50),
+    note TEXT
+);
+
+-- 5. Betriebskosten (tenant_id -1 = interner Marker, daher ohne Fremdschlüssel)
+CREATE TABLE IF NOT EXISTS operating_expenses (
+    id SERIAL PRIMARY KEY,
+    expense_type VARCHAR(255),
+    amount NUMERIC(12,2),
+    distribution_key VARCHAR(50), -- 'area', 'persons', 'unit', 'direct'
+    expense_year INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+ALTER TABLE operating_expenses ADD COLUMN IF NOT EXISTS tenant_id INTEGER;
+ALTER TABLE operating_expenses ADD COLUMN IF NOT EXISTS expense_date DATE DEFAULT CURRENT_DATE;
+
+-- 6. Zähler (für Strom, Wasser, Wallbox)
+CREATE TABLE IF NOT EXISTS meters (
+    id SERIAL PRIMARY KEY,
+    apartment_id INTEGER,
+    meter_type TEXT,
+    meter_number TEXT,
+    is_submeter BOOLEAN DEFAULT FALSE
+);
+ALTER TABLE meters ADD COLUMN IF NOT EXISTS parent_meter_id INTEGER; -- Hauptzähler für Wallbox-Differenz
+
+-- 7. Ablesewerte
+CREATE TABLE IF NOT EXISTS meter_readings (
+    id SERIAL PRIMARY KEY,
+    meter_id INTEGER REFERENCES meters(id) ON DELETE CASCADE,
+    reading_date DATE DEFAULT CURRENT_DATE,
+    reading_value NUMERIC(12,2)
+);
+
+-- 8. Keywords für automatische CSV-Zuweisung
+CREATE TABLE IF NOT EXISTS tenant_keywords (
+    id SERIAL PRIMARY KEY,
+    tenant_id INTEGER REFERENCES tenants(id) ON DELETE CASCADE,
+    keyword VARCHAR(255) UNIQUE NOT NULL
+);
@@ -0,0 +1,17 @@
+-- 0002: Indizes für die häufigsten Abfragen (Kontoauszug, Abrechnung, Zähler, Dashboard)
+
+-- Zahlungen je Mieter und Zeitraum (Kontoauszug, Zahlungsverlauf)
+CREATE INDEX IF NOT EXISTS idx_payments_tenant_date ON payments (tenant_id, payment_date);
+-- Zahlungseingänge im Zeitraum / letzte Zahlungen (Dashboard)
+CREATE INDEX IF NOT EXISTS idx_payments_date ON payments (payment_date);
+
+-- Betriebskosten eines Jahres (allgemein oder direkt einem Mieter zugeordnet)
+CREATE INDEX IF NOT EXISTS idx_operating_expenses_year_tenant ON operating_expenses (expense_year, tenant_id);
+
+-- Ablesewerte je Zähler rund um die Stichtage
+CREATE INDEX IF NOT EXISTS idx_meter_readings_meter_date ON meter_readings (meter_id, reading_date);
+
+-- Mieter nach Auszug (Historie) und Teilindizes für aktive Mietverhältnisse
+CREATE INDEX IF NOT EXISTS idx_tenants_move_out ON tenants (move_out);
+CREATE INDEX IF NOT EXISTS idx_tenants_active_apartment ON tenants (apartment_id) WHERE move_out IS NULL;
+CREATE INDEX IF NOT EXISTS idx_tenants_active_last_name ON tenants (last_name) WHERE move_out IS NULL;
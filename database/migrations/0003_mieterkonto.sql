@@ -0,0 +1,118 @@
+-- 0003: Monatliches Mieterkonto (Soll, Ist, laufender Saldo je Mieter und Monat)
+-- Wird per Trigger bei Änderungen an payments und tenants für die betroffenen
+-- Mieter neu berechnet. Kontoauszug, Dashboard und Rückstandslisten lesen nur
+-- noch diese vorberechneten Zeilen.
+
+CREATE TABLE IF NOT EXISTS tenant_ledger_monthly (
+    tenant_id INTEGER NOT NULL REFERENCES tenants(id) ON DELETE CASCADE,
+    month DATE NOT NULL,                        -- Monatserster
+    active BOOLEAN NOT NULL DEFAULT FALSE,      -- Mietverhältnis in diesem Monat aktiv
+    soll NUMERIC(12,2) NOT NULL DEFAULT 0,      -- Kaltmiete + NK-Vorauszahlung
+    ist NUMERIC(12,2) NOT NULL DEFAULT 0,       -- Zahlungseingänge im Monat
+    balance NUMERIC(12,2) NOT NULL DEFAULT 0,   -- laufender Saldo (Ist - Soll) seit Beginn
+    PRIMARY KEY (tenant_id, month)
+);
+CREATE INDEX IF NOT EXISTS idx_tenant_ledger_month ON tenant_ledger_monthly (month);
+
+-- Berechnet das Konto der angegebenen Mieter neu (NULL = alle Mieter).
+-- Zeitraum: vom Einzug (bzw. der ersten Zahlung) bis zum Auszug bzw. zum
+-- laufenden Monat, mindestens bis zur letzten Zahlung.
+-- Aktiv-Regel wie im Kontoauszug: Einzug bis zum 28. des Monats, Auszug nicht vor dem Monatsersten.
+CREATE OR REPLACE FUNCTION refresh_tenant_ledger(p_tenant_ids INTEGER[]) RETURNS VOID AS $$
+BEGIN
+    DELETE FROM tenant_ledger_monthly
+    WHERE p_tenant_ids IS NULL OR tenant_id = ANY(p_tenant_ids);
+
+    INSERT INTO tenant_ledger_monthly (tenant_id, month, active, soll, ist, balance)
+    WITH t AS (
+        SELECT id, move_in, move_out,
+               COALESCE(base_rent, 0) + COALESCE(monthly_prepayment, 0) AS soll_monat
+        FROM tenants
+        WHERE p_tenant_ids IS NULL OR id = ANY(p_tenant_ids)
+    ),
+    pay AS (
+        SELECT p.tenant_id, date_trunc('month', p.payment_date)::date AS month, SUM(p.amount) AS ist
+        FROM payments p
+        JOIN t ON t.id = p.tenant_id
+        GROUP BY 1, 2
+    ),
+    span AS (
+        SELECT t.*,
+               LEAST(date_trunc('month', COALESCE(t.move_in, CURRENT_DATE)),
+                     COALESCE((SELECT min(month) FROM pay WHERE pay.tenant_id = t.id), 'infinity'))::date AS first_month,
+               GREATEST(date_trunc('month', COALESCE(t.move_out, CURRENT_DATE)),
+                        COALESCE((SELECT max(month) FROM pay WHERE pay.tenant_id = t.id), '-infinity'))::date AS last_month
+        FROM t
+    ),
+    months AS (
+        SELECT s.id AS tenant_id, m::date AS month, s.soll_monat,
+               (s.move_in IS NULL OR s.move_in <= m::date + 27)
+               AND (s.move_out IS NULL OR s.move_out >= m::date) AS active
+        FROM span s
+        CROSS JOIN generate_series(s.first_month, s.last_month, INTERVAL '1 month') m
+    )
+    SELECT m.tenant_id, m.month, m.active,
+           CASE WHEN m.active THEN m.soll_monat ELSE 0 END AS soll,
+           COALESCE(p.ist, 0) AS ist,
+           SUM(COALESCE(p.ist, 0) - CASE WHEN m.active THEN m.soll_monat ELSE 0 END)
+               OVER (PARTITION BY m.tenant_id ORDER BY m.month) AS balance
+    FROM months m
+    LEFT JOIN pay p ON p.tenant_id = m.tenant_id AND p.month = m.month;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-Trigger mit Übergangstabellen: ein Neuberechnungslauf je Anweisung,
+-- auch beim Massenimport von Zahlungen
+CREATE OR REPLACE FUNCTION trg_ledger_payments() RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT tenant_id) INTO ids FROM new_rows WHERE tenant_id IS NOT NULL;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(DISTINCT x) INTO ids
+        FROM (SELECT tenant_id AS x FROM new_rows UNION SELECT tenant_id FROM old_rows) u
+        WHERE x IS NOT NULL;
+    ELSE
+        SELECT array_agg(DISTINCT tenant_id) INTO ids FROM old_rows WHERE tenant_id IS NOT NULL;
+    END IF;
+    IF ids IS NOT NULL THEN
+        PERFORM refresh_tenant_ledger(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Einzug, Auszug oder Miethöhe geändert -> Soll neu berechnen
+-- (gelöschte Mieter verschwinden per ON DELETE CASCADE)
+CREATE OR REPLACE FUNCTION trg_ledger_tenants() RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+BEGIN
+    SELECT array_agg(id) INTO ids FROM new_rows;
+    IF ids IS NOT NULL THEN
+        PERFORM refresh_tenant_ledger(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ledger_payments_ins ON payments;
+DROP TRIGGER IF EXISTS ledger_payments_upd ON payments;
+DROP TRIGGER IF EXISTS ledger_payments_del ON payments;
+CREATE TRIGGER ledger_payments_ins AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_ledger_payments();
+CREATE TRIGGER ledger_payments_upd AFTER UPDATE ON payments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_ledger_payments();
+CREATE TRIGGER ledger_payments_del AFTER DELETE ON payments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_ledger_payments();
+
+DROP TRIGGER IF EXISTS ledger_tenants_ins ON tenants;
+DROP TRIGGER IF EXISTS ledger_tenants_upd ON tenants;
+CREATE TRIGGER ledger_tenants_ins AFTER INSERT ON tenants
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_ledger_tenants();
+CREATE TRIGGER ledger_tenants_upd AFTER UPDATE ON tenants
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_ledger_tenants();
+
+-- Erstbefüllung
+SELECT refresh_tenant_ledger(NULL);
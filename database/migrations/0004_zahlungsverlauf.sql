@@ -0,0 +1,9 @@
+-- 0004: Indizes für den seitenweise geladenen Zahlungsverlauf (Keyset-Paginierung)
+-- Sortierung überall: payment_date DESC, id DESC. Die neuen Indizes enthalten die
+-- alten aus 0002 als Präfix und ersetzen sie.
+
+CREATE INDEX IF NOT EXISTS idx_payments_date_id ON payments (payment_date, id);
+CREATE INDEX IF NOT EXISTS idx_payments_tenant_date_id ON payments (tenant_id, payment_date, id);
+
+DROP INDEX IF EXISTS idx_payments_date;
+DROP INDEX IF EXISTS idx_payments_tenant_date;
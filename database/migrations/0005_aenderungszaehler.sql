@@ -0,0 +1,35 @@
+-- 0005: Änderungszähler je Tabelle
+-- Jede schreibende Anweisung auf den überwachten Tabellen erhöht per Trigger
+-- die Version der Tabelle. Caches (z.B. Dashboard-Kennzahlen) vergleichen nur
+-- diese Versionen und rechnen erst neu, wenn sich wirklich etwas geändert hat.
+
+CREATE TABLE IF NOT EXISTS table_change_counters (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION trg_bump_change_counter() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_change_counters (table_name, version, changed_at)
+    VALUES (TG_TABLE_NAME, 1, NOW())
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = table_change_counters.version + 1, changed_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['apartments', 'tenants', 'payments', 'operating_expenses',
+                             'meters', 'meter_readings', 'landlord_settings'] LOOP
+        INSERT INTO table_change_counters (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS change_counter ON %I', t);
+        -- Ein Trigger je Anweisung (nicht je Zeile), damit Massenimporte billig bleiben
+        EXECUTE format('CREATE TRIGGER change_counter AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_change_counter()', t);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,134 @@
+-- 0006: Objekte (properties) mit per Trigger gepflegten Summen
+-- Gesamtfläche, Anzahl Wohneinheiten und Personen der aktiven Mieter je Objekt
+-- werden bei jeder Änderung an apartments und tenants um die Differenz
+-- fortgeschrieben. Die Umlage liest die Nenner aus property_totals statt der
+-- von Hand gepflegten Werte in landlord_settings (bleiben nur noch als Altdaten).
+-- Die Einheiten des Entwurfs in init_schema.sql sind hier die Wohnungen (apartments).
+
+CREATE TABLE IF NOT EXISTS properties (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    address TEXT
+);
+
+-- Bestehende Installationen verwalten ein Haus: Objekt 1 aus den Vermieter-Stammdaten
+INSERT INTO properties (id, name, address)
+SELECT 1, COALESCE(NULLIF(l.street, ''), 'Haus'), NULLIF(concat_ws(', ', NULLIF(l.street, ''), NULLIF(l.city, '')), '')
+FROM (SELECT 1) x LEFT JOIN landlord_settings l ON l.id = 1
+ON CONFLICT (id) DO NOTHING;
+SELECT setval(pg_get_serial_sequence('properties', 'id'), (SELECT COALESCE(MAX(id), 1) FROM properties));
+
+ALTER TABLE apartments ADD COLUMN IF NOT EXISTS property_id INTEGER NOT NULL DEFAULT 1 REFERENCES properties(id);
+CREATE INDEX IF NOT EXISTS idx_apartments_property ON apartments (property_id);
+CREATE INDEX IF NOT EXISTS idx_tenants_apartment_active ON tenants (apartment_id) WHERE move_out IS NULL;
+
+CREATE TABLE IF NOT EXISTS property_totals (
+    property_id INTEGER PRIMARY KEY REFERENCES properties(id) ON DELETE CASCADE,
+    total_area NUMERIC(12,2) NOT NULL DEFAULT 0,     -- Summe apartments.area
+    total_units INTEGER NOT NULL DEFAULT 0,          -- Anzahl Wohnungen
+    total_occupants INTEGER NOT NULL DEFAULT 0,      -- Personen der Mieter ohne Auszug
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Addiert Änderungen (je Eintrag: Objekt, Fläche, Wohnungen, Personen) auf die Summen
+CREATE OR REPLACE FUNCTION add_property_totals(p_ids INTEGER[], p_area NUMERIC[], p_units INTEGER[],
+                                               p_occupants INTEGER[]) RETURNS VOID AS $$
+    INSERT INTO property_totals AS pt (property_id, total_area, total_units, total_occupants)
+    SELECT id, SUM(area), SUM(units), SUM(occupants)
+    FROM unnest(p_ids, p_area, p_units, p_occupants) AS d(id, area, units, occupants)
+    WHERE id IS NOT NULL
+    GROUP BY id
+    ON CONFLICT (property_id) DO UPDATE SET
+        total_area = pt.total_area + EXCLUDED.total_area,
+        total_units = pt.total_units + EXCLUDED.total_units,
+        total_occupants = pt.total_occupants + EXCLUDED.total_occupants,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- Vollständige Neuberechnung (Erstbefüllung, Reparatur)
+CREATE OR REPLACE FUNCTION refresh_property_totals() RETURNS VOID AS $$
+    DELETE FROM property_totals;
+    INSERT INTO property_totals (property_id, total_area, total_units, total_occupants)
+    SELECT p.id,
+           COALESCE((SELECT SUM(a.area) FROM apartments a WHERE a.property_id = p.id), 0),
+           (SELECT COUNT(*) FROM apartments a WHERE a.property_id = p.id),
+           COALESCE((SELECT SUM(t.occupants) FROM tenants t JOIN apartments a ON a.id = t.apartment_id
+                     WHERE a.property_id = p.id AND t.move_out IS NULL), 0)
+    FROM properties p;
+$$ LANGUAGE sql;
+
+-- Wohnungen: Fläche und Anzahl; beim Wechsel des Objekts ziehen die Personen
+-- der aktiven Mieter mit um. Statement-Trigger wie beim Mieterkonto (0003).
+CREATE OR REPLACE FUNCTION trg_property_totals_apartments() RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+    flaeche NUMERIC[];
+    einheiten INTEGER[];
+    personen INTEGER[];
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT array_agg(n.property_id), array_agg(COALESCE(n.area, 0)), array_agg(1),
+               array_agg((SELECT COALESCE(SUM(t.occupants), 0) FROM tenants t
+                          WHERE t.apartment_id = n.id AND t.move_out IS NULL)::INTEGER)
+        INTO ids, flaeche, einheiten, personen FROM new_rows n;
+        PERFORM add_property_totals(ids, flaeche, einheiten, personen);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT array_agg(o.property_id), array_agg(-COALESCE(o.area, 0)), array_agg(-1),
+               array_agg(-(SELECT COALESCE(SUM(t.occupants), 0) FROM tenants t
+                           WHERE t.apartment_id = o.id AND t.move_out IS NULL)::INTEGER)
+        INTO ids, flaeche, einheiten, personen FROM old_rows o;
+        PERFORM add_property_totals(ids, flaeche, einheiten, personen);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Mieter: Personen zählen, solange kein Auszug eingetragen ist
+CREATE OR REPLACE FUNCTION trg_property_totals_tenants() RETURNS TRIGGER AS $$
+DECLARE
+    ids INTEGER[];
+    flaeche NUMERIC[];
+    einheiten INTEGER[];
+    personen INTEGER[];
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT array_agg(a.property_id), array_agg(0::NUMERIC), array_agg(0), array_agg(COALESCE(n.occupants, 0))
+        INTO ids, flaeche, einheiten, personen
+        FROM new_rows n JOIN apartments a ON a.id = n.apartment_id
+        WHERE n.move_out IS NULL;
+        PERFORM add_property_totals(ids, flaeche, einheiten, personen);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT array_agg(a.property_id), array_agg(0::NUMERIC), array_agg(0), array_agg(-COALESCE(o.occupants, 0))
+        INTO ids, flaeche, einheiten, personen
+        FROM old_rows o JOIN apartments a ON a.id = o.apartment_id
+        WHERE o.move_out IS NULL;
+        PERFORM add_property_totals(ids, flaeche, einheiten, personen);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS property_totals_apartments_ins ON apartments;
+DROP TRIGGER IF EXISTS property_totals_apartments_upd ON apartments;
+DROP TRIGGER IF EXISTS property_totals_apartments_del ON apartments;
+CREATE TRIGGER property_totals_apartments_ins AFTER INSERT ON apartments
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_apartments();
+CREATE TRIGGER property_totals_apartments_upd AFTER UPDATE ON apartments
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_apartments();
+CREATE TRIGGER property_totals_apartments_del AFTER DELETE ON apartments
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_apartments();
+
+DROP TRIGGER IF EXISTS property_totals_tenants_ins ON tenants;
+DROP TRIGGER IF EXISTS property_totals_tenants_upd ON tenants;
+DROP TRIGGER IF EXISTS property_totals_tenants_del ON tenants;
+CREATE TRIGGER property_totals_tenants_ins AFTER INSERT ON tenants
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_tenants();
+CREATE TRIGGER property_totals_tenants_upd AFTER UPDATE ON tenants
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_tenants();
+CREATE TRIGGER property_totals_tenants_del AFTER DELETE ON tenants
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION trg_property_totals_tenants();
+
+-- Erstbefüllung
+SELECT refresh_property_totals();
@@ -0,0 +1,9 @@
+-- 0007: Fingerabdruck je importierter Bankbuchung (Datum, Betrag, Zweck)
+-- Wird eine Bank-CSV mit überlappendem Zeitraum erneut hochgeladen, verwirft
+-- der eindeutige Index die schon bekannten Buchungen (INSERT ... ON CONFLICT
+-- DO NOTHING in bank_import.commit_payments). Von Hand erfasste Zahlungen und
+-- Altdaten haben keinen Fingerabdruck (NULL) und bleiben außen vor.
+
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS import_fingerprint TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_import_fingerprint
+    ON payments (import_fingerprint) WHERE import_fingerprint IS NOT NULL;
@@ -0,0 +1,20 @@
+-- 0008: Änderungszähler auf mehrere Zeilen je Tabelle verteilen
+-- Bisher hat jede schreibende Anweisung dieselbe Zählerzeile ihrer Tabelle
+-- hochgezählt; gleichzeitige Schreiber (Mieterkonto-Trigger, Bank-Import,
+-- Editor) warteten so aufeinander bis zum COMMIT des ersten. Jetzt schreibt
+-- jede Sitzung in einen von 16 Slots (nach Backend-PID); die Version einer
+-- Tabelle ist die Summe ihrer Slots und steigt weiterhin mit jedem COMMIT.
+
+ALTER TABLE table_change_counters ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE table_change_counters DROP CONSTRAINT IF EXISTS table_change_counters_pkey;
+ALTER TABLE table_change_counters ADD PRIMARY KEY (table_name, slot);
+
+CREATE OR REPLACE FUNCTION trg_bump_change_counter() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_change_counters (table_name, slot, version, changed_at)
+    VALUES (TG_TABLE_NAME, pg_backend_pid() % 16, 1, NOW())
+    ON CONFLICT (table_name, slot) DO UPDATE
+        SET version = table_change_counters.version + 1, changed_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
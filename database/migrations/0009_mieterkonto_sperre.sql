@@ -0,0 +1,68 @@
+-- 0009: Neuberechnung des Mieterkontos je Mieter serialisieren
+-- refresh_tenant_ledger löscht die Zeilen eines Mieters und fügt sie neu ein.
+-- Laufen zwei Neuberechnungen desselben Mieters gleichzeitig (ensure_current
+-- aus App, Mieter-Akte und API, dazu die Trigger auf payments und tenants),
+-- fügen beide dieselben (tenant_id, month) ein und eine scheitert am
+-- Primärschlüssel - samt der Zahlung bzw. dem Seitenaufruf, der sie auslöste.
+-- Jetzt wartet der zweite Lauf per Advisory-Lock auf den ersten:
+--   (4211978, <tenant_id>)  exklusiv je Mieter
+--   (4211978, 0)            geteilt für einzelne Mieter, exklusiv für alle (NULL)
+-- Der zweite Lauf sieht danach (READ COMMITTED) die Zeilen des ersten und
+-- ersetzt sie.
+
+CREATE OR REPLACE FUNCTION refresh_tenant_ledger(p_tenant_ids INTEGER[]) RETURNS VOID AS $$
+DECLARE
+    t_id INTEGER;
+BEGIN
+    -- Bis zum Ende der Transaktion sperren (Schlüssel 4211978, Migration 0009).
+    -- Einzelne Mieter in fester Reihenfolge, damit sich zwei Läufe nicht
+    -- gegenseitig blockieren.
+    IF p_tenant_ids IS NULL THEN
+        PERFORM pg_advisory_xact_lock(4211978, 0);
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(4211978, 0);
+        FOR t_id IN SELECT DISTINCT x FROM unnest(p_tenant_ids) x WHERE x IS NOT NULL ORDER BY x LOOP
+            PERFORM pg_advisory_xact_lock(4211978, t_id);
+        END LOOP;
+    END IF;
+
+    DELETE FROM tenant_ledger_monthly
+    WHERE p_tenant_ids IS NULL OR tenant_id = ANY(p_tenant_ids);
+
+    INSERT INTO tenant_ledger_monthly (tenant_id, month, active, soll, ist, balance)
+    WITH t AS (
+        SELECT id, move_in, move_out,
+               COALESCE(base_rent, 0) + COALESCE(monthly_prepayment, 0) AS soll_monat
+        FROM tenants
+        WHERE p_tenant_ids IS NULL OR id = ANY(p_tenant_ids)
+    ),
+    pay AS (
+        SELECT p.tenant_id, date_trunc('month', p.payment_date)::date AS month, SUM(p.amount) AS ist
+        FROM payments p
+        JOIN t ON t.id = p.tenant_id
+        GROUP BY 1, 2
+    ),
+    span AS (
+        SELECT t.*,
+               LEAST(date_trunc('month', COALESCE(t.move_in, CURRENT_DATE)),
+                     COALESCE((SELECT min(month) FROM pay WHERE pay.tenant_id = t.id), 'infinity'))::date AS first_month,
+               GREATEST(date_trunc('month', COALESCE(t.move_out, CURRENT_DATE)),
+                        COALESCE((SELECT max(month) FROM pay WHERE pay.tenant_id = t.id), '-infinity'))::date AS last_month
+        FROM t
+    ),
+    months AS (
+        SELECT s.id AS tenant_id, m::date AS month, s.soll_monat,
+               (s.move_in IS NULL OR s.move_in <= m::date + 27)
+               AND (s.move_out IS NULL OR s.move_out >= m::date) AS active
+        FROM span s
+        CROSS JOIN generate_series(s.first_month, s.last_month, INTERVAL '1 month') m
+    )
+    SELECT m.tenant_id, m.month, m.active,
+           CASE WHEN m.active THEN m.soll_monat ELSE 0 END AS soll,
+           COALESCE(p.ist, 0) AS ist,
+           SUM(COALESCE(p.ist, 0) - CASE WHEN m.active THEN m.soll_monat ELSE 0 END)
+               OVER (PARTITION BY m.tenant_id ORDER BY m.month) AS balance
+    FROM months m
+    LEFT JOIN pay p ON p.tenant_id = m.tenant_id AND p.month = m.month;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,22 +1,8 @@
-import psycopg2
+import sys
 
-def update_database():
-    try:
-        conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-        cur = conn.cursor()
-        
-        # Fügt die Spalte für Nebenkosten-Vorauszahlung hinzu, falls sie fehlt
-        cur.execute("""
-            ALTER TABLE apartments 
-            ADD COLUMN IF NOT EXISTS service_charge_propayment DECIMAL(10,2) DEFAULT 0.00;
-        """)
-        
-        conn.commit()
-        print("✅ Datenbank erfolgreich aktualisiert: Spalte 'service_charge_propayment' ist bereit.")
-        cur.close()
-        conn.close()
-    except Exception as e:
-        print(f"❌ Fehler beim Update: {e}")
+from migrate import main
 
+# Altes Update-Skript: das Schema wird jetzt über die nummerierten
+# Migrationen in database/migrations gepflegt (siehe migrate.py).
 if __name__ == "__main__":
-    update_database()
+    sys.exit(main())
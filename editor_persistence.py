@@ -0,0 +1,129 @@
+import numbers
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+# Speichert nur die tatsächlich geänderten Zeilen eines st.data_editor.
+#
+# Der Editor legt seinen Zustand unter st.session_state[key] ab:
+#   {"edited_rows": {zeile: {spalte: wert}}, "added_rows": [{spalte: wert}], "deleted_rows": [zeile]}
+# Daraus wird ein Changeset gebaut und je Operationstyp (UPDATE/INSERT/DELETE)
+# als eine einzige Anweisung in einer Transaktion ausgeführt.
+
+
+def _py(value):
+    # numpy-/pandas-Werte in Python-Typen umwandeln, die psycopg2 versteht
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if not isinstance(value, (str, bytes)) and pd.isna(value):
+        return None
+    if isinstance(value, numbers.Number) and hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def shown_frame(session_state, key, df):
+    """Das DataFrame, auf das sich die Zeilennummern im Editor-Zustand beziehen.
+
+    edited_rows/deleted_rows zählen Zeilen der angezeigten Tabelle. Wird beim
+    Speichern neu geladen und hat inzwischen eine andere Sitzung eine Zeile
+    eingefügt, verschieben sich alle Nummern. Solange Änderungen offen sind,
+    liefert diese Funktion daher die zuerst angezeigten Daten (samt IDs) aus
+    session_state; ohne offene Änderungen werden die neuen Daten übernommen.
+    Das Ergebnis sowohl dem Editor als auch save_editor_changes übergeben.
+    """
+    ablage = f"{key}__angezeigt"
+    state = session_state.get(key) or {}
+    offen = any(state.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+    if not offen or ablage not in session_state:
+        session_state[ablage] = df
+    return session_state[ablage]
+
+
+def compute_changes(df, state, key_column, columns, converters=None):
+    """Changeset aus dem Editor-Zustand.
+
+    df:          die Daten, die dem Editor übergeben wurden (siehe shown_frame)
+    state:       st.session_state[<editor-key>]
+    key_column:  Spalte mit dem Primärschlüssel (im DataFrame)
+    columns:     DataFrame-Spalte -> (DB-Spalte, SQL-Typ) der speicherbaren Spalten
+    converters:  optionale DataFrame-Spalte -> Funktion (z.B. Anzeigename -> ID)
+    Liefert (updates, inserts, deletes).
+    """
+    state = state or {}
+    converters = converters or {}
+    cols = list(columns)
+
+    def wert(col, value):
+        value = _py(value)
+        if col in converters and value is not None:
+            value = converters[col](value)
+        return value
+
+    deleted = {int(i) for i in state.get("deleted_rows", [])}
+    deletes = [_py(df.iloc[i][key_column]) for i in sorted(deleted)]
+
+    updates = []
+    for pos, changes in state.get("edited_rows", {}).items():
+        pos = int(pos)
+        if pos in deleted or not any(c in columns for c in changes):
+            continue
+        row = df.iloc[pos]
+        merged = [wert(c, changes[c] if c in changes else row[c]) for c in cols]
+        updates.append(tuple([_py(row[key_column])] + merged))
+
+    inserts = []
+    for added in state.get("added_rows", []):
+        if not any(_py(added.get(c)) is not None for c in cols):
+            continue  # leere neue Zeile
+        inserts.append(tuple(wert(c, added.get(c)) for c in cols))
+
+    return updates, inserts, deletes
+
+
+def save_editor_changes(conn, table, df, state, key_column, columns, db_key="id", converters=None):
+    """Wendet das Changeset in einer Transaktion an; liefert die Anzahl betroffener Zeilen."""
+    updates, inserts, deletes = compute_changes(df, state, key_column, columns, converters)
+    db_cols = [columns[c][0] for c in columns]
+    types = [columns[c][1] for c in columns]
+    result = {"updated": 0, "inserted": 0, "deleted": 0}
+
+    cur = conn.cursor()
+    try:
+        if updates:
+            set_clause = ", ".join(f"{c} = v.{c}" for c in db_cols)
+            template = "(" + ", ".join(["%s::integer"] + [f"%s::{t}" for t in types]) + ")"
+            execute_values(cur, f"""
+                UPDATE {table} AS t SET {set_clause}
+                FROM (VALUES %s) AS v({db_key}, {", ".join(db_cols)})
+                WHERE t.{db_key} = v.{db_key}
+            """, updates, template=template, page_size=len(updates))
+            result["updated"] = cur.rowcount
+        if inserts:
+            template = "(" + ", ".join(f"%s::{t}" for t in types) + ")"
+            execute_values(cur, f"INSERT INTO {table} ({', '.join(db_cols)}) VALUES %s",
+                           inserts, template=template, page_size=len(inserts))
+            result["inserted"] = cur.rowcount
+        if deletes:
+            cur.execute(f"DELETE FROM {table} WHERE {db_key} = ANY(%s)", (deletes,))
+            result["deleted"] = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return result
+
+
+def describe_result(result):
+    teile = []
+    if result["updated"]:
+        teile.append(f"{result['updated']} geändert")
+    if result["inserted"]:
+        teile.append(f"{result['inserted']} neu")
+    if result["deleted"]:
+        teile.append(f"{result['deleted']} gelöscht")
+    return ", ".join(teile) if teile else "keine Änderungen"
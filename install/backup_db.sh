@@ -1,17 +1,11 @@
 #!/bin/bash
 
-# Konfiguration
-BACKUP_DIR="/opt/hausverwaltung/backups"
-TIMESTAMP=$(date +%Y-%m-%d_%H-%M-%S)
-BACKUP_FILE="$BACKUP_DIR/hausverwaltung_backup_$TIMESTAMP.sql"
+# Tägliche Sicherung (z.B. per Cron): komprimiertes pg_dump im Custom-Format
+# mit Prüfsumme, Sicherungen älter als 7 Tage werden gelöscht.
+# Weitere Optionen: cli.py backup --help (z.B. --format directory -j 4)
 
-# Verzeichnis erstellen falls nicht vorhanden
-mkdir -p $BACKUP_DIR
+APP_DIR="/opt/hausverwaltung"
+export BACKUP_DIR="$APP_DIR/backups"
 
-# Backup erstellen (pg_dump)
-su - postgres -c "pg_dump hausverwaltung" > $BACKUP_FILE
-
-# Alte Backups löschen (behält nur die letzten 7 Tage)
-find $BACKUP_DIR -type f -name "*.sql" -mtime +7 -delete
-
-echo "Backup erfolgreich erstellt: $BACKUP_FILE"
\ No newline at end of file
+cd $APP_DIR
+./venv/bin/python cli.py backup --behalten 7 "$@"
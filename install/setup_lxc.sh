@@ -39,7 +39,7 @@ sleep 20
 
 # 3. System-Pakete installieren
 pct exec $CTID -- apt update
-pct exec $CTID -- apt install -y postgresql git python3 python3-pip python3-venv libpq-dev locales
+pct exec $CTID -- apt install -y postgresql git python3 python3-pip python3-venv libpq-dev locales cron
 pct exec $CTID -- bash -c "echo 'de_DE.UTF-8 UTF-8' > /etc/locale.gen && locale-gen"
 pct exec $CTID -- bash -c "update-locale LANG=de_DE.UTF-8"
 
@@ -48,10 +48,6 @@ echo "--- Klone Repository ---"
 pct exec $CTID -- rm -rf /opt/hausverwaltung
 pct exec $CTID -- git clone https://github.com/lanke-01/hausverwaltung-app.git /opt/hausverwaltung
 
-# --- DER FIX: SQL-Datei aus dem install-Ordner für Postgres bereitstellen ---
-pct exec $CTID -- cp /opt/hausverwaltung/install/init_db.sql /tmp/init_db.sql
-pct exec $CTID -- chmod 644 /tmp/init_db.sql
-
 # 5. Datenbank-Konfiguration (Berechtigungen)
 echo "--- Datenbank-Rechte setzen ---"
 pct exec $CTID -- bash -c "
@@ -61,13 +57,9 @@ systemctl restart postgresql
 "
 sleep 3
 
-# 6. Datenbank & Tabellen initialisieren
-echo "--- Datenbank-Schema erstellen ---"
+# 6. Datenbank anlegen (Tabellen folgen nach dem Python-Setup über migrate.py)
+echo "--- Datenbank erstellen ---"
 pct exec $CTID -- bash -c "su - postgres -c 'psql -c \"CREATE DATABASE hausverwaltung;\"'"
-pct exec $CTID -- bash -c "su - postgres -c \"psql -d hausverwaltung -f /tmp/init_db.sql\""
-
-# Aufräumen der temporären SQL-Datei
-pct exec $CTID -- rm /tmp/init_db.sql
 
 # 7. Code-Fixes & Ordner-Rechte (Dein Original)
 echo "--- System-Konfiguration ---"
@@ -82,7 +74,11 @@ chmod 777 /var/run/postgresql
 # 8. Python Venv & Pakete
 echo "--- Python Umgebung einrichten ---"
 pct exec $CTID -- bash -c "python3 -m venv /opt/hausverwaltung/venv"
-pct exec $CTID -- bash -c "/opt/hausverwaltung/venv/bin/pip install streamlit pandas psycopg2-binary fpdf python-dotenv"
+pct exec $CTID -- bash -c "/opt/hausverwaltung/venv/bin/pip install -r /opt/hausverwaltung/requirements.txt"
+
+# Datenbank-Schema über die nummerierten Migrationen erstellen
+echo "--- Datenbank-Schema erstellen ---"
+pct exec $CTID -- bash -c "cd /opt/hausverwaltung && ./venv/bin/python migrate.py"
 
 # 9. Autostart Service einrichten
 pct exec $CTID -- bash -c "cat <<EOF > /etc/systemd/system/hausverwaltung.service
@@ -94,7 +90,8 @@ After=network.target postgresql.service
 Type=simple
 User=root
 WorkingDirectory=/opt/hausverwaltung
-ExecStart=/opt/hausverwaltung/venv/bin/streamlit run main.py --server.port 8501 --server.address 0.0.0.0
+ExecStartPre=/opt/hausverwaltung/venv/bin/python migrate.py
+ExecStart=/opt/hausverwaltung/venv/bin/python serve.py --server.port 8501 --server.address 0.0.0.0
 Restart=always
 
 [Install]
@@ -105,6 +102,36 @@ pct exec $CTID -- systemctl daemon-reload
 pct exec $CTID -- systemctl enable hausverwaltung.service
 pct exec $CTID -- systemctl start hausverwaltung.service
 
+# JSON-API (nur lesend, ETags) neben der App; lauscht nur lokal, für Zugriff
+# von außen API_HOST=0.0.0.0 und API_TOKEN setzen
+pct exec $CTID -- bash -c "cat <<EOF > /etc/systemd/system/hausverwaltung-api.service
+[Unit]
+Description=Hausverwaltung JSON-API
+After=network.target postgresql.service hausverwaltung.service
+
+[Service]
+Type=simple
+User=root
+WorkingDirectory=/opt/hausverwaltung
+Environment=API_HOST=127.0.0.1 API_PORT=8502
+ExecStart=/opt/hausverwaltung/venv/bin/python api.py
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+EOF"
+
+pct exec $CTID -- systemctl daemon-reload
+pct exec $CTID -- systemctl enable hausverwaltung-api.service
+pct exec $CTID -- systemctl start hausverwaltung-api.service
+
+# 10. Nächtliche Jobs (cli.py, ohne Streamlit)
+pct exec $CTID -- bash -c "cat <<EOF > /etc/cron.d/hausverwaltung
+# Mieterkonto fortschreiben, Datenbank sichern
+15 2 * * * root cd /opt/hausverwaltung && ./venv/bin/python cli.py mieterkonto >> /var/log/hausverwaltung-jobs.log 2>&1
+30 2 * * * root /opt/hausverwaltung/install/backup_db.sh >> /var/log/hausverwaltung-jobs.log 2>&1
+EOF"
+
 # IP Adresse für den Abschluss ermitteln
 IP_ADDR=$(pct exec $CTID -- hostname -I | awk '{print $1}')
 
@@ -0,0 +1,111 @@
+import threading
+from collections import deque, namedtuple
+
+# Ergebnis je Verwendungszweck:
+#   tenant_id  - zugeordneter Mieter (None, wenn nichts oder nicht eindeutig)
+#   keyword    - der entscheidende Suchbegriff
+#   candidates - alle Mieter, deren Suchbegriffe im Text vorkommen
+#   ambiguous  - True, wenn Suchbegriffe verschiedener Mieter gefunden wurden
+MatchResult = namedtuple("MatchResult", ["tenant_id", "keyword", "candidates", "ambiguous"])
+NO_MATCH = MatchResult(None, None, (), False)
+
+
+class KeywordMatcher:
+    """Aho-Corasick-Automat über alle Suchbegriffe (ein Durchlauf je Text).
+
+    Regel bei mehreren Treffern: der längste Suchbegriff gewinnt. Sind die
+    längsten Treffer verschiedenen Mietern zugeordnet, wird nicht zugeordnet
+    und der Treffer als mehrdeutig markiert.
+    """
+
+    def __init__(self, keywords):
+        # keywords: Suchbegriff -> tenant_id (Groß-/Kleinschreibung egal)
+        self.keywords = []
+        self.tenant_ids = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for kw, tenant_id in sorted(keywords.items()):
+            kw = kw.lower()
+            if not kw:
+                continue
+            state = 0
+            for ch in kw:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = (len(self.keywords),)
+            self.keywords.append(kw)
+            self.tenant_ids.append(tenant_id)
+
+        # Fehlerlinks per Breitensuche; Ausgaben der Suffixe übernehmen
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find_all(self, text):
+        """Alle Treffer als (Endposition, Index des Suchbegriffs)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text.lower()):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for idx in out[state]:
+                    yield pos, idx
+
+    def match(self, text):
+        matches = list(self.find_all(text))
+        if not matches:
+            return NO_MATCH
+
+        kws, tids = self.keywords, self.tenant_ids
+        # Treffer innerhalb eines längeren Treffers (z.B. "og" in "miete og") zählen nicht
+        # als Konkurrenz - auch nicht in einem weiteren Vorkommen des gewählten Begriffs
+        matches = [(e, i) for e, i in matches
+                   if not any(len(kws[j]) > len(kws[i]) and f >= e and f - len(kws[j]) <= e - len(kws[i])
+                              for f, j in matches)]
+        # Längster Begriff zuerst, bei Gleichstand der früheste im Text
+        end, idx = min(matches, key=lambda m: (-len(kws[m[1]]), m[0] - len(kws[m[1]]), kws[m[1]]))
+        others = [(e, i) for e, i in matches if (e, i) != (end, idx)]
+        candidates = {tids[idx]} | {tids[i] for _, i in others}
+        tenant_id = tids[idx]
+        ambiguous = len(candidates) > 1
+        if ambiguous:
+            # Gleich lange Treffer anderer Mieter -> keine automatische Zuordnung
+            length = len(kws[idx])
+            if any(len(kws[i]) == length and tids[i] != tenant_id for _, i in others):
+                tenant_id = None
+        return MatchResult(tenant_id, kws[idx], tuple(sorted(candidates, key=str)), ambiguous)
+
+
+# --- PROZESSWEITER CACHE ---
+# Der Automat wird nur neu gebaut, wenn sich die Suchbegriffe geändert haben.
+_cache_lock = threading.Lock()
+_cache = {"key": None, "matcher": None}
+
+
+def get_matcher(keywords):
+    key = frozenset(keywords.items())
+    with _cache_lock:
+        if _cache["key"] != key:
+            _cache["matcher"] = KeywordMatcher(keywords)
+            _cache["key"] = key
+        return _cache["matcher"]
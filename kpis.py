@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from change_cache import cached
+from meter_consumption import hinweise, year_consumption
+from query_batch import run_parallel
+
+# Kennzahlen und Listen der Startseite (main.py). Werden prozessweit im
+# Speicher gehalten und nur neu berechnet, wenn sich eine der Tabellen ändert
+# (Änderungszähler, Migration 0005) oder der Monat wechselt.
+
+# Tabellen, von denen die Kennzahlen abhängen (siehe change_cache.py)
+KPI_TABLES = ("apartments", "tenants", "payments")
+CONSUMPTION_TABLES = ("meters", "meter_readings", "apartments")
+
+
+def _fetchone(conn, sql, params=None):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def load_kpis(conn, this_month_start):
+    # Halboffener Datumsbereich [Monatserster, Folgemonat) - nutzt idx_payments_date_id
+    next_month_start = (this_month_start + timedelta(days=32)).replace(day=1)
+    # Alle Abfragen sind unabhängig voneinander und laufen gleichzeitig (query_batch.py)
+    res = run_parallel(conn, {
+        # 1. Wohnungen & Fläche
+        "apts": lambda c: _fetchone(c, "SELECT SUM(area), COUNT(*) FROM apartments"),
+        # 2. Aktive Mieter
+        "active": lambda c: _fetchone(c, "SELECT COUNT(*) FROM tenants WHERE move_out IS NULL"),
+        # 3. Monatliche Soll-Miete
+        "target": lambda c: _fetchone(c, """
+            SELECT SUM(a.base_rent + t.monthly_prepayment) 
+            FROM tenants t 
+            JOIN apartments a ON t.apartment_id = a.id 
+            WHERE t.move_out IS NULL
+        """),
+        # 4. Tatsächliche Zahlungen
+        "actual": lambda c: _fetchone(c, "SELECT SUM(amount) FROM payments WHERE payment_date >= %s AND payment_date < %s",
+                                      (this_month_start, next_month_start)),
+        "df_occ": lambda c: pd.read_sql("""
+            SELECT a.unit_name as Einheit, t.last_name as Mieter, t.move_in as Einzug
+            FROM apartments a
+            LEFT JOIN tenants t ON a.id = t.apartment_id AND t.move_out IS NULL
+            ORDER BY a.unit_name
+        """, c),
+        "df_pay": lambda c: pd.read_sql("""
+            SELECT p.payment_date as Datum, t.last_name as Mieter, p.amount as Betrag
+            FROM payments p
+            JOIN tenants t ON p.tenant_id = t.id
+            ORDER BY p.payment_date DESC LIMIT 5
+        """, c),
+    })
+
+    apt_data = res["apts"]
+    total_area = apt_data[0] if apt_data and apt_data[0] else 0.0
+    total_apts = apt_data[1] if apt_data and apt_data[1] else 0
+    active_tenants = res["active"][0] if res["active"] else 0
+    target_rent = res["target"][0] if res["target"] and res["target"][0] else 0.0
+    actual_rent = res["actual"][0] if res["actual"] and res["actual"][0] else 0.0
+
+    return {
+        "total_area": total_area, "total_apts": total_apts, "active_tenants": active_tenants,
+        "target_rent": target_rent, "actual_rent": actual_rent, "df_occ": res["df_occ"], "df_pay": res["df_pay"],
+    }
+
+
+def load_consumption(conn, jahr):
+    # Jahresverbrauch je Zähler aus der Verbrauchsberechnung (meter_consumption.py)
+    cur = conn.cursor()
+    cur.execute("SELECT id, unit_name FROM apartments")
+    einheiten = dict(cur.fetchall())
+    cur.close()
+    return pd.DataFrame([{
+        "Zähler": f"{r['meter_type']} ({r['meter_number'] or ''})",
+        "Einheit": einheiten.get(r["apartment_id"], "Haus / Allgemein"),
+        "Verbrauch": r["verbrauch"],
+        "Hinweis": "; ".join(hinweise(r)),
+    } for r in year_consumption(conn, jahr).values()])
+
+
+def get_consumption(conn, jahr):
+    # Ändert sich nur mit neuen Ablesungen oder Zählern
+    return cached(conn, ("main_verbrauch", jahr), CONSUMPTION_TABLES, lambda c: load_consumption(c, jahr))
+
+
+def get_kpis(conn):
+    this_month_start = date.today().replace(day=1)
+    return cached(conn, ("main_kpis", this_month_start), KPI_TABLES,
+                  lambda c: load_kpis(c, this_month_start))
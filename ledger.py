@@ -0,0 +1,94 @@
+from datetime import date
+
+# Lesezugriffe auf das vorberechnete Mieterkonto (tenant_ledger_monthly).
+# Die Tabelle wird per Trigger gepflegt (Migration 0003); hier wird nur gelesen
+# bzw. beim Monatswechsel der neue Monat für laufende Mietverhältnisse ergänzt.
+
+MONATE_DE = ["Januar", "Februar", "März", "April", "Mai", "Juni",
+             "Juli", "August", "September", "Oktober", "November", "Dezember"]
+
+
+def ensure_current(conn):
+    """Ergänzt nach einem Monatswechsel die fehlenden Monate laufender Mietverhältnisse."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT array_agg(t.id) FROM tenants t
+        WHERE (t.move_out IS NULL OR t.move_out >= date_trunc('month', CURRENT_DATE))
+          AND NOT EXISTS (
+              SELECT 1 FROM tenant_ledger_monthly l
+              WHERE l.tenant_id = t.id AND l.month = date_trunc('month', CURRENT_DATE)::date
+          )
+    """)
+    ids = cur.fetchone()[0]
+    if ids:
+        cur.execute("SELECT refresh_tenant_ledger(%s)", (ids,))
+        conn.commit()
+    cur.close()
+    return len(ids or [])
+
+
+def refresh(conn, tenant_ids=None):
+    """Berechnet das Konto komplett (oder für einzelne Mieter) neu."""
+    cur = conn.cursor()
+    cur.execute("SELECT refresh_tenant_ledger(%s)", (list(tenant_ids) if tenant_ids else None,))
+    conn.commit()
+    cur.close()
+
+
+def statement_history(conn, tenant_id, jahr):
+    """Kontoauszug eines Jahres im Format der Seite/PDF (Saldo ab Jahresbeginn)."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT month, active, soll, ist, balance FROM tenant_ledger_monthly
+        WHERE tenant_id = %s AND month >= %s AND month < %s
+        ORDER BY month
+    """, (tenant_id, date(jahr - 1, 12, 1), date(jahr + 1, 1, 1)))
+    rows = {r[0]: r[1:] for r in cur.fetchall()}
+    cur.close()
+
+    # Saldo-Vortrag aus dem Vorjahr herausrechnen, damit jedes Jahr bei 0 beginnt
+    vortrag = float(rows[date(jahr - 1, 12, 1)][3]) if date(jahr - 1, 12, 1) in rows else 0.0
+    history = []
+    saldo = 0.0
+    for i, m_name in enumerate(MONATE_DE):
+        row = rows.get(date(jahr, i + 1, 1))
+        aktiv, soll, ist = (row[0], float(row[1]), float(row[2])) if row else (False, 0.0, 0.0)
+        if row:
+            saldo = float(row[3]) - vortrag
+        status = "✅ Bezahlt" if saldo >= -0.01 else "❌ Rückstand"
+        if not aktiv: status = "💤 Inaktiv"
+
+        history.append({
+            "Monat": m_name,
+            "Soll (€)": f"{soll:.2f}",
+            "Ist (€)": f"{ist:.2f}",
+            "Saldo (€)": f"{saldo:.2f}",
+            "Status": status
+        })
+    return history
+
+
+def open_items(conn, month=None):
+    """Mieter, deren Zahlungen im Monat unter dem Soll liegen (inkl. Gesamtsaldo)."""
+    month = (month or date.today()).replace(day=1)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT t.first_name, t.last_name, a.unit_name, l.soll, l.ist, l.soll - l.ist, l.balance
+        FROM tenant_ledger_monthly l
+        JOIN tenants t ON t.id = l.tenant_id
+        LEFT JOIN apartments a ON a.id = t.apartment_id
+        WHERE l.month = %s AND l.active AND l.ist < l.soll
+        ORDER BY l.soll - l.ist DESC
+    """, (month,))
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+def month_income(conn, month=None):
+    month = (month or date.today()).replace(day=1)
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(SUM(ist), 0) FROM tenant_ledger_monthly WHERE month = %s", (month,))
+    total = cur.fetchone()[0]
+    cur.close()
+    return float(total)
@@ -0,0 +1,119 @@
+from datetime import date
+
+# Verbrauch aller Zähler in einem Zeitraum – eine Abfrage für alle Zähler.
+#
+# Zählerstände an den Periodengrenzen werden linear zwischen der letzten
+# Ablesung davor und der ersten danach interpoliert (taggenau). Liegt nur auf
+# einer Seite eine Ablesung vor, wird diese verwendet und der Wert als
+# "nicht exakt" markiert. Der Verbrauch ist die Summe der Zuwächse zwischen
+# aufeinanderfolgenden Ständen (Grenzwerte + Ablesungen dazwischen). Ein
+# Rücksprung (Zählerwechsel oder -reset) zählt nicht als Verbrauch, sondern
+# wird markiert, damit er geprüft werden kann.
+
+CONSUMPTION_SQL = """
+    WITH m AS (
+        SELECT id, meter_type, meter_number, is_submeter, apartment_id
+        FROM meters
+        WHERE %(ids)s::integer[] IS NULL OR id = ANY(%(ids)s::integer[])
+    ),
+    grenzen AS (
+        SELECT m.id AS meter_id, g.art, g.stichtag,
+               vor.reading_date AS d0, vor.reading_value AS v0,
+               nach.reading_date AS d1, nach.reading_value AS v1
+        FROM m
+        CROSS JOIN (VALUES ('start', %(start)s::date), ('ende', %(ende)s::date)) AS g(art, stichtag)
+        LEFT JOIN LATERAL (
+            SELECT reading_date, reading_value FROM meter_readings r
+            WHERE r.meter_id = m.id AND r.reading_date <= g.stichtag
+            ORDER BY reading_date DESC LIMIT 1
+        ) vor ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT reading_date, reading_value FROM meter_readings r
+            WHERE r.meter_id = m.id AND r.reading_date >= g.stichtag
+            ORDER BY reading_date ASC LIMIT 1
+        ) nach ON TRUE
+    ),
+    interp AS (
+        SELECT meter_id, art, stichtag,
+               CASE WHEN d0 = stichtag THEN v0
+                    WHEN d0 IS NOT NULL AND d1 IS NOT NULL
+                        THEN v0 + (v1 - v0) * (stichtag - d0)::numeric / (d1 - d0)
+                    ELSE COALESCE(v0, v1)
+               END AS wert,
+               d0 IS NOT NULL AND (d0 = stichtag OR d1 IS NOT NULL) AS exakt,
+               COALESCE(v1 < v0, FALSE) AS ruecksprung
+        FROM grenzen
+    ),
+    punkte AS (
+        SELECT meter_id, stichtag AS datum, wert, FALSE AS ablesung FROM interp WHERE wert IS NOT NULL
+        UNION ALL
+        SELECT r.meter_id, r.reading_date, r.reading_value, TRUE
+        FROM meter_readings r
+        JOIN m ON m.id = r.meter_id
+        WHERE r.reading_date > %(start)s AND r.reading_date < %(ende)s
+    ),
+    schritte AS (
+        SELECT meter_id, datum, ablesung,
+               wert - LAG(wert) OVER (PARTITION BY meter_id ORDER BY datum) AS delta
+        FROM punkte
+    ),
+    verbrauch AS (
+        SELECT meter_id,
+               COALESCE(SUM(delta) FILTER (WHERE delta > 0), 0) AS verbrauch,
+               MIN(datum) FILTER (WHERE delta < 0) AS erster_ruecksprung,
+               COUNT(*) FILTER (WHERE ablesung) AS ablesungen
+        FROM schritte
+        GROUP BY meter_id
+    )
+    SELECT m.id, m.meter_type, m.meter_number, m.is_submeter, m.apartment_id,
+           MAX(i.wert) FILTER (WHERE i.art = 'start'), MAX(i.wert) FILTER (WHERE i.art = 'ende'),
+           BOOL_AND(i.exakt), COALESCE(v.verbrauch, 0),
+           v.erster_ruecksprung IS NOT NULL OR BOOL_OR(i.ruecksprung),
+           v.erster_ruecksprung, COALESCE(v.ablesungen, 0)
+    FROM m
+    JOIN interp i ON i.meter_id = m.id
+    LEFT JOIN verbrauch v ON v.meter_id = m.id
+    GROUP BY m.id, m.meter_type, m.meter_number, m.is_submeter, m.apartment_id,
+             v.verbrauch, v.erster_ruecksprung, v.ablesungen
+    ORDER BY m.meter_type, m.meter_number
+"""
+
+COLUMNS = ["meter_id", "meter_type", "meter_number", "is_submeter", "apartment_id",
+           "start_wert", "ende_wert", "exakt", "verbrauch", "ruecksprung", "erster_ruecksprung", "ablesungen"]
+
+
+def consumption(conn, start, ende, meter_ids=None):
+    """Verbrauch je Zähler im Zeitraum [start, ende); liefert meter_id -> Dict (COLUMNS)."""
+    cur = conn.cursor()
+    cur.execute(CONSUMPTION_SQL, {
+        "start": start, "ende": ende,
+        "ids": list(meter_ids) if meter_ids is not None else None,
+    })
+    result = {}
+    for r in cur.fetchall():
+        row = dict(zip(COLUMNS, r))
+        for k in ("start_wert", "ende_wert", "verbrauch"):
+            row[k] = float(row[k]) if row[k] is not None else None
+        row["exakt"] = bool(row["exakt"])
+        row["ruecksprung"] = bool(row["ruecksprung"])
+        result[row["meter_id"]] = row
+    cur.close()
+    return result
+
+
+def year_consumption(conn, jahr, meter_ids=None):
+    # Stichtage 01.01. des Jahres und 01.01. des Folgejahres
+    return consumption(conn, date(jahr, 1, 1), date(jahr + 1, 1, 1), meter_ids)
+
+
+def hinweise(row):
+    """Prüfhinweise zu einem Ergebnis (fehlende Stände, Rücksprünge)."""
+    texte = []
+    if row["start_wert"] is None or row["ende_wert"] is None:
+        texte.append("keine Ablesungen")
+    elif not row["exakt"]:
+        texte.append("Stichtag nicht eingeschlossen (nächste Ablesung verwendet)")
+    if row["ruecksprung"]:
+        seit = f" ab {row['erster_ruecksprung'].strftime('%d.%m.%Y')}" if row["erster_ruecksprung"] else ""
+        texte.append(f"Zählerwechsel/Rücksprung{seit} – bitte prüfen")
+    return texte
@@ -0,0 +1,203 @@
+import csv
+import io
+import math
+from datetime import datetime
+
+from bank_import import DATUMSFORMATE
+
+# Import von Zählerständen aus der CSV eines Ablesedienstes.
+#
+# Die Datei wird zeilenweise gelesen (kein DataFrame), die Zählernummern über
+# eine einzige Abfrage auf meters.id abgebildet und alle gültigen Zeilen per
+# COPY in eine temporäre Tabelle geladen. Die Plausibilitätsprüfung gegen die
+# vorhandenen Ablesungen (Stand darf nicht kleiner als der vorherige sein)
+# läuft als eine SQL-Anweisung über alle Zeilen; danach werden die gültigen
+# Stände mit einem INSERT ... SELECT übernommen. Alles in einer Transaktion.
+
+# Erkannte Spaltenköpfe (klein geschrieben)
+SPALTEN = {
+    "zaehler": ["zählernummer", "zaehlernummer", "zähler", "zaehler", "meter_number", "zählernr", "zaehlernr"],
+    "datum": ["ablesedatum", "datum", "reading_date", "stichtag"],
+    "stand": ["zählerstand", "zaehlerstand", "stand", "reading_value", "wert"],
+}
+
+
+class _Semikolon(csv.excel):
+    delimiter = ";"
+
+
+def _zahl(text):
+    # "12.345,6" / "12345.6" / "12 345,6" -> 12345.6
+    s = text.strip().replace(" ", "").replace(" ", "")
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    wert = float(s)
+    # float() nimmt auch "nan"/"inf" an; die gehören nicht in eine NUMERIC-Spalte
+    if not math.isfinite(wert):
+        raise ValueError(f"kein gültiger Zählerstand '{text.strip()}'")
+    return wert
+
+
+def _datum(text):
+    for fmt in DATUMSFORMATE:
+        try:
+            return datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unbekanntes Datumsformat '{text}'")
+
+
+def _spalten(header):
+    kopf = [h.strip().lower() for h in header]
+    index = {}
+    for feld, namen in SPALTEN.items():
+        treffer = [i for i, h in enumerate(kopf) if h in namen]
+        if not treffer:
+            raise ValueError(f"Spalte für '{feld}' nicht gefunden (Kopfzeile: {', '.join(header)})")
+        index[feld] = treffer[0]
+    return index
+
+
+def read_rows(text_stream):
+    """Liest die CSV zeilenweise; liefert (zeile, zählernummer, datum, stand, fehler)."""
+    probe = text_stream.read(4096)
+    text_stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(probe, delimiters=";,\t")
+    except csv.Error:
+        dialect = _Semikolon
+    reader = csv.reader(text_stream, dialect)
+    kopf = next(reader, None)
+    if kopf is None:
+        raise ValueError("Datei ist leer")
+    index = _spalten(kopf)
+
+    for zeile, rec in enumerate(reader, start=2):
+        if not any(f.strip() for f in rec):
+            continue
+        try:
+            nummer = rec[index["zaehler"]].strip()
+            datum = _datum(rec[index["datum"]])
+            stand = _zahl(rec[index["stand"]])
+        except (IndexError, ValueError) as e:
+            yield zeile, (rec[index["zaehler"]].strip() if len(rec) > index["zaehler"] else ""), None, None, f"unlesbar: {e}"
+            continue
+        yield zeile, nummer, datum, stand, None
+
+
+def _text_stream(fileobj, encoding):
+    fileobj.seek(0)
+    return io.TextIOWrapper(fileobj, encoding=encoding, newline="")
+
+
+def import_readings(conn, fileobj, dry_run=False):
+    """Importiert die Stände aus einer Binär-Datei (z.B. Streamlit-Upload).
+
+    dry_run=True prüft nur und verwirft alles per ROLLBACK.
+    Liefert {"total", "inserted", "rejected"}; rejected ist eine Liste von
+    (zeile, zählernummer, datum, stand, grund).
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT meter_number, id FROM meters WHERE meter_number IS NOT NULL")
+    meter_map = {str(nr).strip(): m_id for nr, m_id in cur.fetchall()}
+
+    # UTF-8 (auch mit BOM), sonst Windows-Export des Ablesedienstes
+    for encoding in ("utf-8-sig", "cp1252"):
+        stream = _text_stream(fileobj, encoding)
+        rejected, total = [], 0
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        try:
+            for zeile, nummer, datum, stand, fehler in read_rows(stream):
+                total += 1
+                if fehler:
+                    rejected.append((zeile, nummer, None, None, fehler))
+                elif nummer not in meter_map:
+                    rejected.append((zeile, nummer, datum, stand, "Zähler unbekannt"))
+                else:
+                    writer.writerow([zeile, meter_map[nummer], datum.isoformat(), f"{stand:.2f}"])
+            break
+        except UnicodeDecodeError:
+            continue
+        except ValueError:
+            # Leere Datei oder Kopfzeile ohne die nötigen Spalten
+            cur.close()
+            raise
+        finally:
+            stream.detach()
+    else:
+        cur.close()
+        raise ValueError("Zeichensatz der Datei nicht erkannt (erwartet UTF-8 oder Windows-1252).")
+    buf.seek(0)
+
+    try:
+        cur.execute("""
+            CREATE TEMP TABLE import_readings (
+                zeile INTEGER, meter_id INTEGER, reading_date DATE, reading_value NUMERIC(12,2), fehler TEXT
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("COPY import_readings (zeile, meter_id, reading_date, reading_value) FROM STDIN WITH (FORMAT csv)", buf)
+
+        # Plausibilität in einem Durchgang: vorheriger Stand aus DB oder Datei,
+        # späterer Stand aus der DB, doppelte Stichtage
+        cur.execute("""
+            WITH pruefung AS (
+                SELECT s.zeile,
+                       vor.reading_date AS db_vor_datum, vor.reading_value AS db_vor,
+                       nach.reading_value AS db_nach,
+                       LAG(s.reading_value) OVER w AS datei_vor,
+                       LAG(s.reading_date) OVER w AS datei_vor_datum
+                FROM import_readings s
+                LEFT JOIN LATERAL (
+                    SELECT reading_date, reading_value FROM meter_readings r
+                    WHERE r.meter_id = s.meter_id AND r.reading_date <= s.reading_date
+                    ORDER BY reading_date DESC LIMIT 1
+                ) vor ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT reading_value FROM meter_readings r
+                    WHERE r.meter_id = s.meter_id AND r.reading_date > s.reading_date
+                    ORDER BY reading_date ASC LIMIT 1
+                ) nach ON TRUE
+                WINDOW w AS (PARTITION BY s.meter_id ORDER BY s.reading_date, s.zeile)
+            ),
+            vorher AS (
+                -- Der zeitlich nähere Vorgänger zählt: aus der Datei oder aus der DB
+                SELECT *, CASE WHEN datei_vor_datum IS NOT NULL
+                                    AND (db_vor_datum IS NULL OR datei_vor_datum > db_vor_datum)
+                               THEN datei_vor ELSE db_vor END AS vor
+                FROM pruefung
+            )
+            UPDATE import_readings i SET fehler = CASE
+                    WHEN p.db_vor_datum = i.reading_date THEN 'Stand für dieses Datum bereits erfasst'
+                    WHEN p.datei_vor_datum = i.reading_date THEN 'Zähler mehrfach mit gleichem Datum in der Datei'
+                    WHEN i.reading_value < p.vor THEN 'kleiner als vorheriger Stand ' || p.vor
+                    WHEN i.reading_value > p.db_nach THEN 'größer als späterer Stand ' || p.db_nach
+                END
+            FROM vorher p
+            WHERE p.zeile = i.zeile
+        """)
+        cur.execute("""
+            INSERT INTO meter_readings (meter_id, reading_date, reading_value)
+            SELECT meter_id, reading_date, reading_value FROM import_readings
+            WHERE fehler IS NULL
+            ORDER BY meter_id, reading_date
+        """)
+        inserted = cur.rowcount
+        cur.execute("""
+            SELECT i.zeile, m.meter_number, i.reading_date, i.reading_value, i.fehler
+            FROM import_readings i JOIN meters m ON m.id = i.meter_id
+            WHERE i.fehler IS NOT NULL
+        """)
+        rejected += [(z, nr, d, float(v), f) for z, nr, d, v, f in cur.fetchall()]
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    rejected.sort(key=lambda r: r[0])
+    return {"total": total, "inserted": inserted, "rejected": rejected}
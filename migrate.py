@@ -0,0 +1,100 @@
+import argparse
+import os
+import re
+import sys
+
+from database import get_conn
+
+# Nummerierte Migrationen: database/migrations/0001_name.sql, 0002_name.sql, ...
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database", "migrations")
+MIGRATION_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# Schlüssel für pg_advisory_lock, damit nie zwei Prozesse gleichzeitig migrieren
+LOCK_KEY = 4211977
+
+
+def list_migrations():
+    migrations = []
+    for f in sorted(os.listdir(MIGRATIONS_DIR)):
+        m = MIGRATION_PATTERN.match(f)
+        if m:
+            migrations.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, f)))
+    return migrations
+
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_version")
+    return {r[0] for r in cur.fetchall()}
+
+
+def migrate(conn, log=print):
+    """Spielt alle noch fehlenden Migrationen ein und liefert deren Versionen."""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+    try:
+        done = applied_versions(cur)
+        conn.commit()
+        applied = []
+        for version, name, path in list_migrations():
+            if version in done:
+                continue
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+            # Jede Migration läuft in einer eigenen Transaktion
+            try:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            log(f"✅ Migration {version:04d} ({name}) eingespielt.")
+            applied.append(version)
+        return applied
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        conn.commit()
+        cur.close()
+
+
+def status(conn):
+    cur = conn.cursor()
+    done = applied_versions(cur)
+    conn.commit()
+    cur.close()
+    return [(version, name, version in done) for version, name, _ in list_migrations()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Datenbank-Schema der Hausverwaltung aktualisieren")
+    parser.add_argument("--status", action="store_true", help="Nur anzeigen, welche Migrationen eingespielt sind")
+    args = parser.parse_args(argv)
+
+    conn = get_conn()
+    if not conn:
+        print("❌ Keine Datenbankverbindung möglich.")
+        return 1
+    try:
+        if args.status:
+            for version, name, done in status(conn):
+                print(f"{'✅' if done else '⏳'} {version:04d} {name}")
+        else:
+            applied = migrate(conn)
+            if not applied:
+                print("✅ Datenbank ist auf dem neuesten Stand.")
+        return 0
+    except Exception as e:
+        print(f"❌ Fehler bei der Migration: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
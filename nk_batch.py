@@ -0,0 +1,184 @@
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from settlement import allocate, load_expenses, load_landlord, load_tenants_for_year, pdf_stats
+
+# Sammellauf: Nebenkostenabrechnungen aller Mieter für ein oder mehrere Jahre.
+# Ablauf: Daten laden (ein Query je Jahr) -> Abrechnungen berechnen ->
+# PDFs parallel in einem Prozess-Pool erzeugen -> alles in ein ZIP packen
+# (inkl. Zusammenfassung.csv mit den Salden).
+#
+# Aufruf:  python nk_batch.py 2025            (mehrere Jahre: 2024 2025)
+#          python nk_batch.py --alle -o /tmp/nk.zip
+
+SUMMARY_COLUMNS = ["Jahr", "Mieter-ID", "Mieter", "Wohnung", "Zeitraum", "Tage",
+                   "Kostenanteil", "Vorauszahlungen", "Saldo", "Ergebnis", "Datei"]
+
+
+def years_in_scope(conn):
+    # Jahre, für die Kosten erfasst sind
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT expense_year FROM operating_expenses ORDER BY expense_year")
+    jahre = [r[0] for r in cur.fetchall()]
+    cur.close()
+    return jahre
+
+
+def _dateiname(s):
+    name = re.sub(r"[^\w\-]+", "_", s["mieter"]).strip("_")
+    return f"{s['jahr']}/Abrechnung_{s['jahr']}_{name}_{s['tenant_id']}.pdf"
+
+
+def _euro(value):
+    return f"{value:.2f}".replace(".", ",")
+
+
+def _render(s, m_stats, h_stats):
+    # Läuft im Worker-Prozess: nur Daten rein, PDF-Bytes raus (die Vorlage
+    # wird je Prozess einmal gezeichnet). fpdf erst hier laden, nicht schon
+    # beim Import durch die Mieter-Akte
+    from pdf_utils import generate_nebenkosten_pdf
+    return generate_nebenkosten_pdf(
+        s["mieter"], s["wohnung"], s["zeitraum_anzeige"], s["tage"], s["rows"],
+        s["summe"], s["voraus"], s["saldo"], m_stats, h_stats
+    )
+
+
+def summary_csv(settlements):
+    # Semikolon und Dezimalkomma, damit Excel die Datei direkt öffnet
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(SUMMARY_COLUMNS)
+    for s in settlements:
+        writer.writerow([
+            s["jahr"], s["tenant_id"], s["mieter"], s["wohnung"], s["zeitraum"], s["tage"],
+            _euro(s["summe"]), _euro(s["voraus"]), _euro(s["saldo"]),
+            "Nachzahlung" if s["saldo"] > 0 else "Guthaben", s["datei"],
+        ])
+    return buf.getvalue()
+
+
+def run_batch(conn, jahre, ziel, workers=None, progress=None):
+    """Erzeugt alle Abrechnungen der angegebenen Jahre als ZIP.
+
+    ziel: Dateipfad oder binäres Dateiobjekt (z.B. io.BytesIO für einen Download)
+    progress(stufe, erledigt, gesamt) wird während des Laufs aufgerufen.
+    Liefert {"count", "errors", "timings"}; timings in Sekunden je Stufe.
+    """
+    progress = progress or (lambda stufe, erledigt, gesamt: None)
+    timings = {}
+
+    # --- 1. DATEN LADEN ---
+    t0 = time.perf_counter()
+    cur = conn.cursor()
+    if not load_landlord(cur):
+        cur.close()
+        raise ValueError("Keine Vermieter-Stammdaten (landlord_settings) vorhanden.")
+    # Stammdaten je Jahr: der Personen-Schlüssel hängt von den Mietern des Jahres ab
+    daten = [(jahr, load_landlord(cur, jahr=jahr), load_tenants_for_year(cur, jahr), load_expenses(cur, jahr))
+             for jahr in jahre]
+    cur.close()
+    timings["Laden"] = time.perf_counter() - t0
+
+    # --- 2. BERECHNEN ---
+    t0 = time.perf_counter()
+    jobs, errors = [], []
+    gesamt = sum(len(m) for _, _, m, _ in daten)
+    for jahr, haus, mieter_liste, expenses in daten:
+        # Ein vektorisierter Durchgang je Jahr (settlement.allocate)
+        try:
+            abrechnungen = allocate(mieter_liste, haus, expenses, jahr)
+        except Exception as e:
+            errors.append((jahr, "alle Mieter", str(e)))
+            continue
+        for mieter, s in zip(mieter_liste, abrechnungen):
+            s["datei"] = _dateiname(s)
+            jobs.append((s, *pdf_stats(mieter, haus)))
+        progress("Berechnen", len(jobs), gesamt)
+    timings["Berechnen"] = time.perf_counter() - t0
+
+    # --- 3. PDFs IM PROZESS-POOL ---
+    t0 = time.perf_counter()
+    fertig = []
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        # spawn statt fork: der Streamlit-Prozess hat bereits eigene Threads
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as ex:
+            futures = {ex.submit(_render, s, m_stats, h_stats): s for s, m_stats, h_stats in jobs}
+            for fut in as_completed(futures):
+                s = futures[fut]
+                try:
+                    fertig.append((s, fut.result()))
+                except Exception as e:
+                    errors.append((s["jahr"], s["mieter"], f"PDF: {e}"))
+                progress("PDFs", len(fertig), len(jobs))
+    timings["PDFs"] = time.perf_counter() - t0
+
+    # --- 4. ZIP ---
+    t0 = time.perf_counter()
+    fertig.sort(key=lambda x: x[0]["datei"])
+    with zipfile.ZipFile(ziel, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, (s, pdf_bytes) in enumerate(fertig, 1):
+            zf.writestr(s["datei"], pdf_bytes)
+            progress("ZIP", i, len(fertig))
+        zf.writestr("Zusammenfassung.csv", summary_csv([s for s, _ in fertig]))
+    timings["ZIP"] = time.perf_counter() - t0
+
+    return {"count": len(fertig), "errors": errors, "timings": timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nebenkostenabrechnungen aller Mieter als ZIP erzeugen")
+    parser.add_argument("jahre", nargs="*", type=int, help="Abrechnungsjahre (z.B. 2024 2025)")
+    parser.add_argument("--alle", action="store_true", help="Alle Jahre mit erfassten Kosten")
+    parser.add_argument("-o", "--output", help="Ziel-ZIP (Standard: Nebenkosten_<Jahre>.zip)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    args = parser.parse_args(argv)
+
+    from database import get_conn
+    conn = get_conn()
+    if not conn:
+        print("❌ Keine Datenbankverbindung möglich.")
+        return 1
+    try:
+        jahre = sorted(set(args.jahre) | set(years_in_scope(conn) if args.alle else []))
+        if not jahre:
+            parser.error("Bitte Jahr(e) angeben oder --alle verwenden.")
+        zip_path = args.output or f"Nebenkosten_{jahre[0]}" + (f"-{jahre[-1]}" if len(jahre) > 1 else "") + ".zip"
+
+        letzte = {}
+
+        def progress(stufe, erledigt, gesamt):
+            # Höchstens alle 10 % eine Zeile je Stufe ausgeben
+            schritt = max(gesamt // 10, 1)
+            if erledigt == gesamt or erledigt - letzte.get(stufe, 0) >= schritt:
+                letzte[stufe] = erledigt
+                print(f"   {stufe}: {erledigt}/{gesamt}")
+
+        print(f"📦 Sammelabrechnung für {', '.join(map(str, jahre))} ...")
+        result = run_batch(conn, jahre, zip_path, workers=args.workers, progress=progress)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+    for stufe, sekunden in result["timings"].items():
+        print(f"⏱️  {stufe}: {sekunden:.2f} s")
+    for jahr, mieter, fehler in result["errors"]:
+        print(f"⚠️  {jahr} {mieter}: {fehler}")
+    print(f"✅ {result['count']} Abrechnungen in {zip_path}")
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
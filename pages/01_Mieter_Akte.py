@@ -1,182 +1,135 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
-import psycopg2
-import os
-# Import beider PDF-Funktionen aus deiner pdf_utils.py
-from pdf_utils import generate_nebenkosten_pdf, generate_payment_history_pdf
-
-def get_direct_conn():
-    try:
-        conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-        conn.set_client_encoding('UTF8')
-        return conn
-    except:
-        return None
+from database import db_conn
+from query_batch import run_parallel, with_cursor
+from ledger import ensure_current, statement_history
+from settlement import DEFAULT_PROPERTY, compute_settlement, load_expenses, load_landlord, load_tenant, pdf_stats
+from nk_batch import run_batch, years_in_scope
+import io
+import time
 
 st.set_page_config(page_title="Mieter-Akte & Abrechnung", layout="wide")
 st.title("🔍 Mieter-Akte & Abrechnung")
 
-DEUTSCHE_SCHLUESSEL = {
-    "area": "m² Wohnfläche",
-    "persons": "Anzahl Personen",
-    "unit": "Wohneinheiten (1/6)",
-    "direct": "Direktzuordnung"
-}
-
-MONATE_DE = ["Januar", "Februar", "März", "April", "Mai", "Juni", 
-             "Juli", "August", "September", "Oktober", "November", "Dezember"]
-
-conn = get_direct_conn()
-
-if not conn:
-    st.error("❌ Keine Datenbankverbindung.")
-else:
-    cur = conn.cursor()
-    try:
-        # Mieterliste laden
-        cur.execute("SELECT id, first_name, last_name FROM tenants ORDER BY last_name")
-        tenants_data = cur.fetchall()
-        
-        if tenants_data:
-            t_opts = {f"{t[1]} {t[2]}": t[0] for t in tenants_data}
-            sel_name = st.sidebar.selectbox("Mieter wählen", list(t_opts.keys()))
-            t_id = t_opts[sel_name]
-            jahr = st.sidebar.number_input("Jahr", value=2025)
-            
-            tab1, tab2 = st.tabs(["📋 Zahlungsfluss (Kontoauszug)", "🧮 Nebenkostenabrechnung"])
+with db_conn() as conn:
 
-            # Gemeinsame Daten für beide Tabs laden
-            cur.execute("SELECT name, street, city, iban, bank_name, total_area, total_occupants, total_units FROM landlord_settings LIMIT 1")
-            h_row = cur.fetchone()
+    if not conn:
+        st.error("❌ Keine Datenbankverbindung.")
+    else:
+        cur = conn.cursor()
+        try:
+            # Mieterliste laden
+            cur.execute("SELECT id, first_name, last_name FROM tenants ORDER BY last_name")
+            tenants_data = cur.fetchall()
+        
+            if tenants_data:
+                t_opts = {f"{t[1]} {t[2]}": t[0] for t in tenants_data}
+                sel_name = st.sidebar.selectbox("Mieter wählen", list(t_opts.keys()))
+                t_id = t_opts[sel_name]
+                jahr = st.sidebar.number_input("Jahr", value=2025)
             
-            cur.execute("""
-                SELECT t.first_name, t.last_name, t.move_in, t.move_out, t.monthly_prepayment, 
-                       a.unit_name, a.area, t.occupants, t.base_rent 
-                FROM tenants t 
-                JOIN apartments a ON t.apartment_id = a.id 
-                WHERE t.id = %s
-            """, (t_id,))
-            m_row = cur.fetchone()
-
-            if m_row and h_row:
-                # --- TAB 1: ZAHLUNGSFLUSS ---
-                with tab1:
-                    
-                    # Zeitraum-Variablen definieren
-                    ein = m_row[2].strftime('%d.%m.%Y') if m_row[2] else "unbekannt"
-                    aus = m_row[3].strftime('%d.%m.%Y') if m_row[3] else "laufend"
-
-                    # Anzeige mit Mietername (m_row[0] ist Vorname, m_row[1] ist Nachname)
-                    st.info(f"👤 **Mieter:** {m_row[0]} {m_row[1]} | 🏠 **Mietverhältnis:** von {ein} bis {aus}")
-
-
-
-
-
-                    cur.execute("SELECT payment_date, amount FROM payments WHERE tenant_id = %s AND EXTRACT(YEAR FROM payment_date) = %s", (t_id, jahr))
-                    payments = cur.fetchall()
-                    
-                    history = []
-                    saldo_vortrag = 0.0
-                    soll_monat = float(m_row[4] or 0) + float(m_row[8] or 0) # Vorauszahlung + Kaltmiete
-                    
-                    for i, m_name in enumerate(MONATE_DE):
-                        m_idx = i + 1
-                        ist = sum(float(p[1]) for p in payments if p[0].month == m_idx)
-                        aktiv = True
-                        if m_row[2] and m_row[2] > date(jahr, m_idx, 28): aktiv = False
-                        if m_row[3] and m_row[3] < date(jahr, m_idx, 1): aktiv = False
-                        
-                        soll = soll_monat if aktiv else 0.0
-                        saldo = (ist + saldo_vortrag) - soll
-                        status = "✅ Bezahlt" if saldo >= -0.01 else "❌ Rückstand"
-                        if not aktiv: status = "💤 Inaktiv"
-                        
-                        history.append({
-                            "Monat": m_name, 
-                            "Soll (€)": f"{soll:.2f}", 
-                            "Ist (€)": f"{ist:.2f}", 
-                            "Saldo (€)": f"{saldo:.2f}", 
-                            "Status": status
-                        })
-                        if aktiv: saldo_vortrag = saldo
-
-                    st.table(pd.DataFrame(history))
-
-                    if st.button("🖨️ PDF Kontoauszug erstellen"):
-                        h_stats = {"name": h_row[0], "street": h_row[1], "city": h_row[2], "iban": h_row[3], "bank": h_row[4]}
-                        zeitraum_info = f"von {ein} bis {aus}"
-                        # Aufruf der Funktion in pdf_utils
-                        path = generate_payment_history_pdf(f"{m_row[0]} {m_row[1]}", jahr, history, h_stats, zeitraum_info)
-                        with open(path, "rb") as f:
-                            st.download_button("💾 Download Kontoauszug", f, file_name=os.path.basename(path))
-
-                # --- TAB 2: NEBENKOSTENABRECHNUNG ---
-                with tab2:
-                    m_start = max(m_row[2] or date(jahr,1,1), date(jahr,1,1))
-                    m_ende = min(m_row[3] or date(jahr,12,31), date(jahr,12,31))
-                    tage_mieter = (m_ende - m_start).days + 1
-                    z_raum = f"{m_start.strftime('%d.%m.%Y')} - {m_ende.strftime('%d.%m.%Y')}"
-                    st.success(f"📅 **Abrechnungszeitraum:** {z_raum} ({tage_mieter} Tage)")
-
-                    cur.execute("""
-                        SELECT expense_type, amount, distribution_key, tenant_id 
-                        FROM operating_expenses 
-                        WHERE expense_year = %s AND (tenant_id IS NULL OR tenant_id = %s)
-                    """, (jahr, t_id))
-                    expenses = cur.fetchall()
+                tab1, tab2, tab3 = st.tabs(["📋 Zahlungsfluss (Kontoauszug)", "🧮 Nebenkostenabrechnung", "📦 Sammelabrechnung"])
+
+                # Soll/Ist/Saldo kommen vorberechnet aus dem Mieterkonto (tenant_ledger_monthly);
+                # ensure_current speichert selbst, die parallelen Abfragen sehen den neuen Stand
+                ensure_current(conn)
+
+                # Daten aller Tabs gleichzeitig laden (query_batch.py)
+                daten = run_parallel(conn, {
+                    "haus": with_cursor(load_landlord, DEFAULT_PROPERTY, jahr),
+                    "mieter": with_cursor(load_tenant, t_id),
+                    "kosten": with_cursor(load_expenses, jahr, t_id),
+                    "history": lambda c: statement_history(c, t_id, jahr),
+                    "jahre": years_in_scope,
+                })
+                haus, mieter, history = daten["haus"], daten["mieter"], daten["history"]
+
+                if mieter and haus:
+                    # --- TAB 1: ZAHLUNGSFLUSS ---
+                    with tab1:
                     
-                    pdf_rows, display_rows, summe_mieter = [], [], 0.0
-                    zeit_faktor = tage_mieter / (366 if jahr % 4 == 0 else 365)
-
-                    for exp in expenses:
-                        name, gesamt_h, key, tid = exp[0], float(exp[1]), exp[2], exp[3]
-                        anteil = 0.0
-                        d_key = DEUTSCHE_SCHLUESSEL.get(key, key)
-                        if tid:
-                            anteil = gesamt_h * (tage_mieter / 365)
-                            d_key = "Direkt"
+                        # Zeitraum-Variablen definieren
+                        ein = mieter["move_in"].strftime('%d.%m.%Y') if mieter["move_in"] else "unbekannt"
+                        aus = mieter["move_out"].strftime('%d.%m.%Y') if mieter["move_out"] else "laufend"
+
+                        # Anzeige mit Mietername
+                        st.info(f"👤 **Mieter:** {mieter['first_name']} {mieter['last_name']} | 🏠 **Mietverhältnis:** von {ein} bis {aus}")
+
+                        st.table(pd.DataFrame(history))
+
+                        if st.button("🖨️ PDF Kontoauszug erstellen"):
+                            # fpdf erst laden, wenn wirklich ein PDF gebraucht wird
+                            from pdf_utils import generate_payment_history_pdf
+                            h_stats = {k: haus[k] for k in ("name", "street", "city", "iban", "bank")}
+                            zeitraum_info = f"von {ein} bis {aus}"
+                            # Aufruf der Funktion in pdf_utils
+                            pdf_bytes = generate_payment_history_pdf(f"{mieter['first_name']} {mieter['last_name']}", jahr, history, h_stats, zeitraum_info)
+                            st.download_button("💾 Download Kontoauszug", pdf_bytes,
+                                               file_name=f"Kontoauszug_{jahr}_{mieter['last_name']}.pdf", mime="application/pdf")
+
+                    # --- TAB 2: NEBENKOSTENABRECHNUNG ---
+                    with tab2:
+                        # Berechnung gemeinsam mit dem Sammellauf (settlement.py)
+                        # Verteilfehler nur hier anzeigen, der Sammellauf (Tab 3) bleibt nutzbar
+                        try:
+                            nk = compute_settlement(mieter, haus, daten["kosten"], jahr)
+                        except ValueError as e:
+                            st.error(f"Abrechnung nicht möglich: {e}")
                         else:
-                            if key == "area": anteil = (gesamt_h / float(h_row[5])) * float(m_row[6]) * zeit_faktor
-                            elif key == "persons": anteil = (gesamt_h / float(h_row[6])) * float(m_row[7]) * zeit_faktor
-                            elif key == "unit": anteil = (gesamt_h / (float(h_row[7]) or 6.0)) * zeit_faktor
-                        
-                        summe_mieter += anteil
-                        pdf_rows.append({"Kostenart": name, "Gesamtkosten": f"{gesamt_h:.2f}", "Schlüssel": d_key, "Ihr Anteil": f"{anteil:.2f}"})
-
-                    st.table(pd.DataFrame(pdf_rows))
-                    
-                    voraus_gesamt = float(m_row[4]) * (tage_mieter / 30.4375)
-                    saldo_nk = summe_mieter - voraus_gesamt
-                    
-                    c1, c2, c3 = st.columns(3)
-                    c1.metric("Kostenanteil", f"{summe_mieter:.2f} €")
-                    c2.metric("Vorauszahlungen", f"{voraus_gesamt:.2f} €")
-                    c3.metric("Saldo", f"{saldo_nk:.2f} €", delta_color="inverse")
-
-                    if st.button("🖨️ PDF Abrechnung erstellen"):
+                            st.success(f"📅 **Abrechnungszeitraum:** {nk['zeitraum']} ({nk['tage']} Tage)")
+
+                            st.table(pd.DataFrame(nk["rows"]))
+
+                            c1, c2, c3 = st.columns(3)
+                            c1.metric("Kostenanteil", f"{nk['summe']:.2f} €")
+                            c2.metric("Vorauszahlungen", f"{nk['voraus']:.2f} €")
+                            c3.metric("Saldo", f"{nk['saldo']:.2f} €", delta_color="inverse")
+
+                            if st.button("🖨️ PDF Abrechnung erstellen"):
+                                from pdf_utils import generate_nebenkosten_pdf
+                                try:
+                                    m_stats, h_stats = pdf_stats(mieter, haus)
+                                    # Wichtig: zeitraum_anzeige für den Header mitschicken
+                                    pdf_bytes = generate_nebenkosten_pdf(
+                                        nk["mieter"], nk["wohnung"], nk["zeitraum_anzeige"],
+                                        nk["tage"], nk["rows"], nk["summe"], nk["voraus"], nk["saldo"], m_stats, h_stats
+                                    )
+                                    st.download_button("📩 Download Abrechnung", pdf_bytes,
+                                                       file_name=f"Abrechnung_{jahr}_{mieter['last_name']}.pdf", mime="application/pdf")
+                                except Exception as e:
+                                    st.error(f"Fehler beim Erstellen der PDF: {e}")
+
+                # --- TAB 3: SAMMELABRECHNUNG (ALLE MIETER) ---
+                with tab3:
+                    st.write("Erzeugt die Nebenkostenabrechnungen aller Mieter der gewählten Jahre als ZIP (inkl. Zusammenfassung.csv).")
+                    alle_jahre = daten["jahre"] or [jahr]
+                    sel_jahre = st.multiselect("Abrechnungsjahre", alle_jahre, default=[j for j in alle_jahre if j == jahr] or alle_jahre[-1:])
+
+                    if st.button("📦 Alle Abrechnungen erstellen", disabled=not sel_jahre):
+                        balken = st.progress(0.0, text="Starte ...")
+
+                        def fortschritt(stufe, erledigt, gesamt):
+                            balken.progress(erledigt / gesamt if gesamt else 1.0, text=f"{stufe}: {erledigt}/{gesamt}")
+
+                        # ZIP im Speicher je Sitzung, keine gemeinsame Datei im Temp-Verzeichnis
+                        zip_buf = io.BytesIO()
+                        start = time.perf_counter()
                         try:
-                            m_stats = {"area": float(m_row[6]), "occupants": int(m_row[7])}
-                            h_stats = {
-                                "name": h_row[0], "street": h_row[1], "city": h_row[2], 
-                                "iban": h_row[3], "bank": h_row[4], 
-                                "total_area": float(h_row[5]), "total_occupants": int(h_row[6])
-                            }
-                            # Wichtig: zeitraum_anzeige für den Header mitschicken
-                            zeitraum_anzeige = f"von {m_row[2].strftime('%d.%m.%Y')} bis {m_row[3].strftime('%d.%m.%Y') if m_row[3] else 'laufend'}"
-                            
-                            path = generate_nebenkosten_pdf(
-                                f"{m_row[0]} {m_row[1]}", str(m_row[5]), zeitraum_anzeige, 
-                                tage_mieter, pdf_rows, summe_mieter, voraus_gesamt, saldo_nk, m_stats, h_stats
-                            )
-                            with open(path, "rb") as f:
-                                st.download_button("📩 Download Abrechnung", f, file_name=f"Abrechnung_{jahr}_{m_row[1]}.pdf")
+                            result = run_batch(conn, sorted(sel_jahre), zip_buf, progress=fortschritt)
                         except Exception as e:
-                            st.error(f"Fehler beim Erstellen der PDF: {e}")
-
-    except Exception as e:
-        st.error(f"Datenbankfehler: {e}")
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+                            st.error(f"Fehler beim Sammellauf: {e}")
+                        else:
+                            balken.progress(1.0, text="Fertig")
+                            st.success(f"✅ {result['count']} Abrechnungen in {time.perf_counter() - start:.1f} s erstellt.")
+                            st.table(pd.DataFrame(
+                                [{"Schritt": k, "Dauer (s)": f"{v:.2f}"} for k, v in result["timings"].items()]
+                            ))
+                            for f_jahr, f_mieter, fehler in result["errors"]:
+                                st.warning(f"{f_jahr} {f_mieter}: {fehler}")
+                            st.download_button("💾 Download ZIP", zip_buf.getvalue(), mime="application/zip",
+                                               file_name=f"Nebenkosten_{'_'.join(map(str, sorted(sel_jahre)))}.zip")
+
+        except Exception as e:
+            st.error(f"Datenbankfehler: {e}")
+        finally:
+            cur.close()
\ No newline at end of file
@@ -1,108 +1,130 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-
-# --- VERBINDUNGSFUNKTION ---
-def get_direct_conn():
-    try:
-        conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-        conn.set_client_encoding('UTF8')
-        return conn
-    except:
-        return None
+from database import db_conn
+from editor_persistence import save_editor_changes, describe_result, shown_frame
+from payment_history import PAGE_SIZE, fetch_page
 
 st.set_page_config(page_title="Korrektur-Modus", layout="wide")
 st.title("🛠️ Korrektur & Stammdaten-Pflege")
 st.info("Klicken Sie direkt in die Tabellen, um Werte zu ändern. Danach unten auf 'Speichern' klicken.")
+if "korrektur_msg" in st.session_state:
+    st.success(st.session_state.pop("korrektur_msg"))
 
-conn = get_direct_conn()
+with db_conn() as conn:
 
-if not conn:
-    st.error("❌ Keine Datenbankverbindung möglich.")
-else:
-    cur = conn.cursor()
+    if not conn:
+        st.error("❌ Keine Datenbankverbindung möglich.")
+    else:
+        cur = conn.cursor()
 
-    tab1, tab2 = st.tabs(["💰 Mietzahlungen bearbeiten", "🏢 Wohnungen & Stammdaten"])
+        tab1, tab2 = st.tabs(["💰 Mietzahlungen bearbeiten", "🏢 Wohnungen & Stammdaten"])
 
-    # --- TAB 1: MIETZAHLUNGEN BEARBEITEN ---
-    with tab1:
-        st.subheader("Zahlungshistorie")
+        # --- TAB 1: MIETZAHLUNGEN BEARBEITEN ---
+        with tab1:
+            st.subheader("Zahlungshistorie")
         
-        # Wichtig: Wir laden die Spaltennamen exakt so, wie sie in der DB heißen
-        query_pay = """
-            SELECT p.id, t.last_name, p.amount, p.payment_date, p.payment_type, p.note
-            FROM payments p
-            JOIN tenants t ON p.tenant_id = t.id
-            ORDER BY p.payment_date DESC
-        """
-        df_pay = pd.read_sql(query_pay, conn)
+            cur.execute("SELECT id, first_name, last_name FROM tenants ORDER BY last_name")
+            t_opts = {f"{t[1]} {t[2]}": t[0] for t in cur.fetchall()}
+            fc1, fc2 = st.columns(2)
+            f_tenant = fc1.selectbox("Mieter", ["Alle"] + list(t_opts.keys()), key="korrektur_mieter")
+            f_dates = fc2.date_input("Zeitraum", value=(), format="DD.MM.YYYY", key="korrektur_zeitraum")
+            filters = {
+                "tenant_id": t_opts.get(f_tenant),
+                "date_from": f_dates[0] if len(f_dates) > 0 else None,
+                "date_to": f_dates[1] if len(f_dates) > 1 else None,
+            }
+            if st.session_state.get("korrektur_filter") != filters:
+                st.session_state["korrektur_filter"] = filters
+                st.session_state["korrektur_seiten"] = [None]
+                st.session_state.pop("editor_payments", None)
+            seiten = st.session_state["korrektur_seiten"]
 
-        if not df_pay.empty:
-            edited_pay = st.data_editor(
-                df_pay,
-                column_config={
-                    "id": st.column_config.NumberColumn("ID", disabled=True),
-                    "last_name": st.column_config.TextColumn("Mieter", disabled=True),
-                    "amount": st.column_config.NumberColumn("Betrag (€)", format="%.2f"),
-                    "payment_date": st.column_config.DateColumn("Zahlungsdatum"),
-                    "payment_type": st.column_config.SelectboxColumn("Typ", options=["Überweisung", "Bar", "Dauerauftrag"]),
-                    "note": st.column_config.TextColumn("Notiz")
-                },
-                use_container_width=True,
-                hide_index=True,
-                key="editor_payments"
+            # Nur die aktuelle Seite laden (Keyset-Paginierung, neueste zuerst)
+            rows, next_after = fetch_page(conn, filters, seiten[-1])
+            df_pay = pd.DataFrame(
+                [(r[0], r[4], float(r[5]), r[1], r[6], r[7]) for r in rows],
+                columns=["id", "last_name", "amount", "payment_date", "payment_type", "note"],
             )
+            # Bei offenen Änderungen die zuerst angezeigten Zeilen behalten (Zeilennummern des Editors)
+            df_pay = shown_frame(st.session_state, "editor_payments", df_pay)
+
+            if not df_pay.empty:
+                st.data_editor(
+                    df_pay,
+                    column_config={
+                        "id": st.column_config.NumberColumn("ID", disabled=True),
+                        "last_name": st.column_config.TextColumn("Mieter", disabled=True),
+                        "amount": st.column_config.NumberColumn("Betrag (€)", format="%.2f"),
+                        "payment_date": st.column_config.DateColumn("Zahlungsdatum"),
+                        "payment_type": st.column_config.SelectboxColumn("Typ", options=["Überweisung", "Bar", "Dauerauftrag"]),
+                        "note": st.column_config.TextColumn("Notiz")
+                    },
+                    use_container_width=True,
+                    hide_index=True,
+                    key="editor_payments"
+                )
+
+                if st.button("💾 Änderungen Zahlungen speichern"):
+                    try:
+                        # Nur geänderte Zeilen, als ein UPDATE in einer Transaktion
+                        result = save_editor_changes(conn, "payments", df_pay, st.session_state.get("editor_payments"), "id", {
+                            "amount": ("amount", "numeric"),
+                            "payment_date": ("payment_date", "date"),
+                            "payment_type": ("payment_type", "varchar"),
+                            "note": ("note", "text"),
+                        })
+                        st.session_state["korrektur_msg"] = f"✅ Zahlungen: {describe_result(result)}"
+                        del st.session_state["editor_payments"]
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Fehler beim Speichern: {e}")
 
-            if st.button("💾 Änderungen Zahlungen speichern"):
-                try:
-                    for index, row in edited_pay.iterrows():
-                        cur.execute("""
-                            UPDATE payments 
-                            SET amount = %s, payment_date = %s, payment_type = %s, note = %s
-                            WHERE id = %s
-                        """, (row['amount'], row['payment_date'], row['payment_type'], row['note'], row['id']))
-                    conn.commit()
-                    st.success("✅ Zahlungen wurden aktualisiert!")
+                n1, n2, n3 = st.columns([1, 2, 1])
+                if n1.button("⬅️ Zurück", disabled=len(seiten) == 1, key="korrektur_zurueck"):
+                    seiten.pop()
+                    st.session_state.pop("editor_payments", None)
+                    st.rerun()
+                n2.caption(f"Seite {len(seiten)} · {PAGE_SIZE} Zahlungen je Seite")
+                if n3.button("Weiter ➡️", disabled=next_after is None, key="korrektur_weiter"):
+                    seiten.append(next_after)
+                    st.session_state.pop("editor_payments", None)
                     st.rerun()
-                except Exception as e:
-                    st.error(f"Fehler beim Speichern: {e}")
             
-    # --- TAB 2: WOHNUNGEN BEARBEITEN ---
-    with tab2:
-        st.subheader("Wohnungsdaten anpassen")
-        # Hier nutzen wir die echten DB-Spaltennamen: unit_name, area, base_rent
-        df_ap = pd.read_sql("SELECT id, unit_name, area, base_rent FROM apartments ORDER BY unit_name", conn)
+        # --- TAB 2: WOHNUNGEN BEARBEITEN ---
+        with tab2:
+            st.subheader("Wohnungsdaten anpassen")
+            # Hier nutzen wir die echten DB-Spaltennamen: unit_name, area, base_rent
+            df_ap = pd.read_sql("SELECT id, unit_name, area, base_rent FROM apartments ORDER BY unit_name", conn)
+            df_ap = shown_frame(st.session_state, "editor_apartments", df_ap)
         
-        if not df_ap.empty:
-            edited_ap = st.data_editor(
-                df_ap,
-                column_config={
-                    "id": st.column_config.NumberColumn("ID", disabled=True),
-                    "unit_name": st.column_config.TextColumn("Einheit (Name)"),
-                    "area": st.column_config.NumberColumn("m² Fläche", format="%.2f"),
-                    "base_rent": st.column_config.NumberColumn("Kaltmiete (€)", format="%.2f")
-                },
-                use_container_width=True,
-                hide_index=True,
-                key="editor_apartments"
-            )
+            if not df_ap.empty:
+                st.data_editor(
+                    df_ap,
+                    column_config={
+                        "id": st.column_config.NumberColumn("ID", disabled=True),
+                        "unit_name": st.column_config.TextColumn("Einheit (Name)"),
+                        "area": st.column_config.NumberColumn("m² Fläche", format="%.2f"),
+                        "base_rent": st.column_config.NumberColumn("Kaltmiete (€)", format="%.2f")
+                    },
+                    use_container_width=True,
+                    hide_index=True,
+                    key="editor_apartments"
+                )
 
-            if st.button("💾 Änderungen Wohnungen speichern"):
-                try:
-                    for index, row in edited_ap.iterrows():
-                        # Wir greifen auf 'unit_name' zu, nicht auf 'Einheit'
-                        cur.execute("""
-                            UPDATE apartments 
-                            SET unit_name = %s, area = %s, base_rent = %s
-                            WHERE id = %s
-                        """, (row['unit_name'], row['area'], row['base_rent'], row['id']))
-                    conn.commit()
-                    st.success("✅ Wohnungsdaten aktualisiert!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Fehler beim Speichern: {e}")
-        else:
-            st.info("Keine Wohnungen gefunden.")
+                if st.button("💾 Änderungen Wohnungen speichern"):
+                    try:
+                        # Wir speichern unter den DB-Spalten 'unit_name', 'area', 'base_rent'
+                        result = save_editor_changes(conn, "apartments", df_ap, st.session_state.get("editor_apartments"), "id", {
+                            "unit_name": ("unit_name", "varchar"),
+                            "area": ("area", "numeric"),
+                            "base_rent": ("base_rent", "numeric"),
+                        })
+                        st.session_state["korrektur_msg"] = f"✅ Wohnungen: {describe_result(result)}"
+                        del st.session_state["editor_apartments"]
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Fehler beim Speichern: {e}")
+            else:
+                st.info("Keine Wohnungen gefunden.")
 
-    cur.close()
-    conn.close()
\ No newline at end of file
+        cur.close()
\ No newline at end of file
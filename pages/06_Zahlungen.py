@@ -1,119 +1,126 @@
 import streamlit as st
-import psycopg2
+from database import db_conn
+from payment_history import PAGE_SIZE, PAYMENT_TYPES, fetch_page, totals
 import pandas as pd
 from datetime import datetime
 
-def get_direct_conn():
-    try:
-        conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-        conn.set_client_encoding('UTF8')
-        return conn
-    except:
-        return None
-
 st.set_page_config(page_title="Zahlungen", layout="wide")
 st.title("💰 Miet- & Nebenkostenzahlungen")
 
-conn = get_direct_conn()
+with db_conn() as conn:
 
-if not conn:
-    st.error("❌ Keine Datenbankverbindung möglich.")
-else:
-    cur = conn.cursor()
-    
-    # 1. Alle Mieter laden
-    cur.execute("""
-        SELECT t.id, t.first_name, t.last_name, a.unit_name 
-        FROM tenants t
-        LEFT JOIN apartments a ON t.apartment_id = a.id
-        ORDER BY t.last_name
-    """)
-    tenants = cur.fetchall()
-    tenant_options = {f"{t[1]} {t[2]} (Wohnung: {t[3] or 'N/A'})": t[0] for t in tenants}
-
-    # --- EINGABE-BEREICH ---
-    st.subheader("➕ Neue Zahlung verbuchen")
-    if not tenants:
-        st.warning("⚠️ Keine Mieter gefunden.")
+    if not conn:
+        st.error("❌ Keine Datenbankverbindung möglich.")
     else:
-        sel_tenant = st.selectbox("Mieter auswählen", list(tenant_options.keys()), key="input_tenant")
-        
-        col1, col2, col3 = st.columns(3)
-        amount = col1.number_input("Betrag (€)", min_value=0.0, step=10.0)
-        pay_date = col2.date_input("Zahlungsdatum", value=datetime.now())
-        pay_type = col3.selectbox("Typ", ["Miete", "Nebenkosten-Nachzahlung", "Sonstiges"])
-        
-        note = st.text_input("Notiz (optional)")
-
-        if st.button("💾 Zahlung jetzt speichern", use_container_width=True):
-            try:
-                cur.execute("""
-                    INSERT INTO payments (tenant_id, amount, payment_date, payment_type, note)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (tenant_options[sel_tenant], amount, pay_date, pay_type, note))
-                conn.commit()
-                st.success(f"✅ Zahlung für {sel_tenant} verbucht!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"Fehler: {e}")
-
-    st.divider()
-
-    # --- FILTER- & HISTORIE-BEREICH ---
-    st.subheader("🔍 Zahlungsverlauf & Korrektur")
+        cur = conn.cursor()
     
-    filter_tenant = st.selectbox("Nach Mieter filtern", ["Alle anzeigen"] + list(tenant_options.keys()))
-    
-    try:
-        query = """
-            SELECT p.id, p.payment_date, t.first_name, t.last_name, p.amount, p.payment_type, p.note
-            FROM payments p
-            JOIN tenants t ON p.tenant_id = t.id
-        """
-        params = []
-        if filter_tenant != "Alle anzeigen":
-            query += " WHERE p.tenant_id = %s"
-            params.append(tenant_options[filter_tenant])
-        
-        query += " ORDER BY p.id DESC" # Neueste (höchste ID) zuerst
+        # 1. Alle Mieter laden
+        cur.execute("""
+            SELECT t.id, t.first_name, t.last_name, a.unit_name 
+            FROM tenants t
+            LEFT JOIN apartments a ON t.apartment_id = a.id
+            ORDER BY t.last_name
+        """)
+        tenants = cur.fetchall()
+        tenant_options = {f"{t[1]} {t[2]} (Wohnung: {t[3] or 'N/A'})": t[0] for t in tenants}
+
+        # --- EINGABE-BEREICH ---
+        st.subheader("➕ Neue Zahlung verbuchen")
+        if not tenants:
+            st.warning("⚠️ Keine Mieter gefunden.")
+        else:
+            sel_tenant = st.selectbox("Mieter auswählen", list(tenant_options.keys()), key="input_tenant")
         
-        cur.execute(query, params)
-        rows = cur.fetchall()
+            col1, col2, col3 = st.columns(3)
+            amount = col1.number_input("Betrag (€)", min_value=0.0, step=10.0)
+            pay_date = col2.date_input("Zahlungsdatum", value=datetime.now())
+            pay_type = col3.selectbox("Typ", ["Miete", "Nebenkosten-Nachzahlung", "Sonstiges"])
         
-        if rows:
-            # Tabelle anzeigen
-            df_data = []
-            for r in rows:
-                df_data.append({
-                    "ID": r[0],
-                    "Datum": r[1].strftime("%d.%m.%Y"),
-                    "Mieter": f"{r[2]} {r[3]}",
-                    "Betrag": f"{r[4]:.2f} €",
-                    "Typ": r[5],
-                    "Notiz": r[6] or ""
-                })
-            
-            st.dataframe(df_data, use_container_width=True, hide_index=True)
-
-            # --- LÖSCH-BEREICH FÜR DUBLETTEN ---
-            with st.expander("🗑️ Dubletten löschen / Einträge entfernen"):
-                st.write("Wähle die ID des Eintrags, den du löschen möchtest:")
-                delete_id = st.number_input("ID eingeben", min_value=0, step=1)
-                if st.button("❌ Eintrag mit dieser ID unwiderruflich löschen"):
-                    cur.execute("DELETE FROM payments WHERE id = %s", (delete_id,))
+            note = st.text_input("Notiz (optional)")
+
+            if st.button("💾 Zahlung jetzt speichern", use_container_width=True):
+                try:
+                    cur.execute("""
+                        INSERT INTO payments (tenant_id, amount, payment_date, payment_type, note)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, (tenant_options[sel_tenant], amount, pay_date, pay_type, note))
                     conn.commit()
-                    st.warning(f"Eintrag #{delete_id} wurde gelöscht.")
+                    st.success(f"✅ Zahlung für {sel_tenant} verbucht!")
                     st.rerun()
+                except Exception as e:
+                    st.error(f"Fehler: {e}")
 
-            # Statistik
-            total_sum = sum(r[4] for r in rows)
-            st.metric(f"Summe ({filter_tenant})", f"{total_sum:.2f} €")
-            
-        else:
-            st.info("Keine Zahlungen gefunden.")
-            
-    except Exception as e:
-        st.error(f"Fehler beim Laden der Historie: {e}")
+        st.divider()
+
+        # --- FILTER- & HISTORIE-BEREICH ---
+        st.subheader("🔍 Zahlungsverlauf & Korrektur")
+    
+        fc1, fc2, fc3 = st.columns(3)
+        filter_tenant = fc1.selectbox("Nach Mieter filtern", ["Alle anzeigen"] + list(tenant_options.keys()))
+        filter_type = fc2.selectbox("Typ", ["Alle"] + PAYMENT_TYPES)
+        filter_dates = fc3.date_input("Zeitraum", value=(), format="DD.MM.YYYY")
+        fa1, fa2 = st.columns(2)
+        amount_min = fa1.number_input("Betrag von (€)", value=None, step=10.0)
+        amount_max = fa2.number_input("Betrag bis (€)", value=None, step=10.0)
+
+        filters = {
+            "tenant_id": tenant_options.get(filter_tenant),
+            "payment_type": filter_type if filter_type != "Alle" else None,
+            "date_from": filter_dates[0] if len(filter_dates) > 0 else None,
+            "date_to": filter_dates[1] if len(filter_dates) > 1 else None,
+            "amount_min": amount_min,
+            "amount_max": amount_max,
+        }
+        # Neue Filter -> wieder auf Seite 1 (Stapel der Seitenanfänge)
+        if st.session_state.get("zahlungen_filter") != filters:
+            st.session_state["zahlungen_filter"] = filters
+            st.session_state["zahlungen_seiten"] = [None]
+        seiten = st.session_state["zahlungen_seiten"]
+
+        try:
+            # Nur die sichtbare Seite laden; Summe und Anzahl rechnet die Datenbank
+            rows, next_after = fetch_page(conn, filters, seiten[-1])
+            anzahl, total_sum = totals(conn, filters)
+
+            if rows:
+                # Tabelle anzeigen
+                df_data = pd.DataFrame({
+                    "ID": [r[0] for r in rows],
+                    "Datum": [r[1].strftime("%d.%m.%Y") for r in rows],
+                    "Mieter": [f"{r[3]} {r[4]}" for r in rows],
+                    "Betrag": [f"{r[5]:.2f} €" for r in rows],
+                    "Typ": [r[6] for r in rows],
+                    "Notiz": [r[7] or "" for r in rows],
+                })
+
+                st.dataframe(df_data, use_container_width=True, hide_index=True)
+
+                n1, n2, n3 = st.columns([1, 2, 1])
+                if n1.button("⬅️ Zurück", disabled=len(seiten) == 1):
+                    seiten.pop()
+                    st.rerun()
+                n2.caption(f"Seite {len(seiten)} von {max((anzahl + PAGE_SIZE - 1) // PAGE_SIZE, 1)} · {anzahl} Zahlungen")
+                if n3.button("Weiter ➡️", disabled=next_after is None):
+                    seiten.append(next_after)
+                    st.rerun()
+
+                # --- LÖSCH-BEREICH FÜR DUBLETTEN ---
+                with st.expander("🗑️ Dubletten löschen / Einträge entfernen"):
+                    st.write("Wähle die ID des Eintrags, den du löschen möchtest:")
+                    delete_id = st.number_input("ID eingeben", min_value=0, step=1)
+                    if st.button("❌ Eintrag mit dieser ID unwiderruflich löschen"):
+                        cur.execute("DELETE FROM payments WHERE id = %s", (delete_id,))
+                        conn.commit()
+                        st.warning(f"Eintrag #{delete_id} wurde gelöscht.")
+                        st.rerun()
+
+                # Statistik (über alle Seiten des Filters)
+                st.metric(f"Summe ({filter_tenant})", f"{total_sum:.2f} €")
+
+            else:
+                st.info("Keine Zahlungen gefunden.")
+
+        except Exception as e:
+            st.error(f"Fehler beim Laden der Historie: {e}")
 
-    cur.close()
-    conn.close()
\ No newline at end of file
+        cur.close()
\ No newline at end of file
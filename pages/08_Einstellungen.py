@@ -1,150 +1,211 @@
 import streamlit as st
-import psycopg2
+import pandas as pd
+from database import db_conn, close_idle_connections, pool_stats
+from backup import JOBS, create_backup, delete_backup, list_backups, restore_backup, save_upload
+from change_cache import cache_stats, invalidate
+import query_log
 import subprocess
 import os
-import re
-
-# --- VERBINDUNG ---
-def get_direct_conn():
-    try:
-        conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-        conn.set_client_encoding('UTF8')
-        return conn
-    except:
-        return None
+from datetime import datetime
 
 st.set_page_config(page_title="Einstellungen & System", layout="wide")
 st.title("⚙️ Einstellungen & System")
 
-BACKUP_DIR = "/opt/hausverwaltung/backups"
-
 if "restore_mode" not in st.session_state:
     st.session_state.restore_mode = False
 
-conn = get_direct_conn()
-if not conn:
-    st.error("❌ Datenbankverbindung fehlgeschlagen.")
-else:
-    cur = conn.cursor()
+with db_conn() as conn:
+    if not conn:
+        st.error("❌ Datenbankverbindung fehlgeschlagen.")
+    else:
+        cur = conn.cursor()
     
-    # Basistabelle sicherstellen
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS landlord_settings (
-            id SERIAL PRIMARY KEY, name VARCHAR(255), street VARCHAR(255), city VARCHAR(255),
-            iban VARCHAR(50), bank_name VARCHAR(255), 
-            total_area NUMERIC(10,2) DEFAULT 0, total_occupants INTEGER DEFAULT 0
-        )
-    """)
-    cur.execute("INSERT INTO landlord_settings (id) VALUES (1) ON CONFLICT (id) DO NOTHING")
-    conn.commit()
-
-    tab1, tab2, tab3 = st.tabs(["🏠 Stammdaten", "🛠️ System & Wartung", "🗄️ Datenbank-Sicherung"])
-
-    with tab1:
-        cur.execute("SELECT name, street, city, iban, bank_name, total_area, total_occupants FROM landlord_settings WHERE id = 1")
-        data = cur.fetchone()
-        with st.form("settings_form"):
-            st.subheader("Vermieter-Details")
-            c1, c2 = st.columns(2)
-            v_name = c1.text_input("Vermieter Name", value=data[0] or "")
-            v_street = c1.text_input("Straße", value=data[1] or "")
-            v_city = c1.text_input("PLZ / Ort", value=data[2] or "")
-            v_iban = c2.text_input("IBAN", value=data[3] or "")
-            v_bank = c2.text_input("Bankname", value=data[4] or "")
-            v_area = st.number_input("Gesamtfläche Haus (m²)", value=float(data[5] or 0.0))
-            v_pers = st.number_input("Gesamtpersonen Haus", value=int(data[6] or 0))
-            if st.form_submit_button("💾 Speichern"):
-                cur.execute("UPDATE landlord_settings SET name=%s, street=%s, city=%s, iban=%s, bank_name=%s, total_area=%s, total_occupants=%s WHERE id = 1",
-                            (v_name, v_street, v_city, v_iban, v_bank, v_area, v_pers))
-                conn.commit()
-                st.success("Gespeichert!")
-                st.rerun()
+        tab1, tab2, tab3, tab4 = st.tabs(["🏠 Stammdaten", "🛠️ System & Wartung", "🗄️ Datenbank-Sicherung", "🩺 Diagnose"])
 
-    with tab2:
-        st.subheader("🔄 Software-Update")
-        if st.button("📥 Update von GitHub erzwingen"):
-            try:
-                subprocess.run(['git', '-C', '/opt/hausverwaltung', 'fetch', '--all'], check=True)
-                subprocess.run(['git', '-C', '/opt/hausverwaltung', 'reset', '--hard', 'origin/main'], check=True)
-                st.success("Update erfolgreich! Dienst wird neu gestartet...")
-                subprocess.run(['systemctl', 'restart', 'hausverwaltung.service'])
-            except Exception as e:
-                st.error(f"Fehler: {e}")
-
-    with tab3:
-        st.subheader("🗄️ Datenbank-Verwaltung")
-        col_back, col_rest = st.columns(2)
-        
-        with col_back:
-            st.markdown("### 1. Sicherung")
-            if st.button("🚀 Neues Backup erzeugen"):
-                res = subprocess.run(['/bin/bash', '/opt/hausverwaltung/install/backup_db.sh'], capture_output=True, text=True)
-                if res.returncode == 0:
-                    st.success("Backup erfolgreich!")
+        with tab1:
+            cur.execute("SELECT name, street, city, iban, bank_name FROM landlord_settings WHERE id = 1")
+            data = cur.fetchone()
+            with st.form("settings_form"):
+                st.subheader("Vermieter-Details")
+                c1, c2 = st.columns(2)
+                v_name = c1.text_input("Vermieter Name", value=data[0] or "")
+                v_street = c1.text_input("Straße", value=data[1] or "")
+                v_city = c1.text_input("PLZ / Ort", value=data[2] or "")
+                v_iban = c2.text_input("IBAN", value=data[3] or "")
+                v_bank = c2.text_input("Bankname", value=data[4] or "")
+                if st.form_submit_button("💾 Speichern"):
+                    cur.execute("UPDATE landlord_settings SET name=%s, street=%s, city=%s, iban=%s, bank_name=%s WHERE id = 1",
+                                (v_name, v_street, v_city, v_iban, v_bank))
+                    conn.commit()
+                    st.success("Gespeichert!")
                     st.rerun()
 
-        with col_rest:
-            st.markdown("### 2. Wiederherstellung")
-            if not st.session_state.restore_mode:
-                uploaded_file = st.file_uploader("SQL-Datei hochladen", type=["sql"])
-                if uploaded_file is not None:
-                    if st.button("📂 Datei für Restore vorbereiten"):
-                        if not os.path.exists(BACKUP_DIR): os.makedirs(BACKUP_DIR)
-                        save_path = os.path.join(BACKUP_DIR, "restore_temp.sql")
-                        
-                        # REINIGUNGS-LOGIK: Entfernt \restrict und \unrestrict Zeilen
-                        content = uploaded_file.read().decode("utf-8", errors="ignore")
-                        clean_content = re.sub(r'\\restrict.*', '', content)
-                        clean_content = re.sub(r'\\unrestrict.*', '', clean_content)
-                        
-                        with open(save_path, "w", encoding="utf-8") as f:
-                            f.write(clean_content)
-                        
-                        st.session_state.restore_mode = save_path
-                        st.rerun()
-            else:
-                st.warning("⚠️ Datei bereit. Alle aktuellen Daten werden überschrieben!")
-                if st.button("🚀 JETZT RESTORE STARTEN"):
+            # Verteilungsschlüssel der Umlage - aus Wohnungen und Mietern berechnet (Migration 0006)
+            st.subheader("Objekte")
+            cur.execute("""
+                SELECT p.name, COALESCE(pt.total_area, 0), COALESCE(pt.total_units, 0), COALESCE(pt.total_occupants, 0)
+                FROM properties p LEFT JOIN property_totals pt ON pt.property_id = p.id
+                ORDER BY p.id
+            """)
+            for o_name, o_area, o_units, o_pers in cur.fetchall():
+                st.markdown(f"**{o_name}**")
+                o1, o2, o3 = st.columns(3)
+                o1.metric("Gesamtfläche", f"{float(o_area):,.2f} m²")
+                o2.metric("Wohneinheiten", o_units)
+                o3.metric("Personen (aktive Mieter)", o_pers)
+            st.caption("Werden automatisch aus Wohnungen und Mietern fortgeschrieben. Die Personen-Umlage "
+                       "einer Abrechnung rechnet mit den Personentagen aller Mieter des Abrechnungsjahres, "
+                       "nicht mit der heutigen Personenzahl.")
+
+        with tab2:
+            st.subheader("🔄 Software-Update")
+            if st.button("📥 Update von GitHub erzwingen"):
+                try:
+                    subprocess.run(['git', '-C', '/opt/hausverwaltung', 'fetch', '--all'], check=True)
+                    subprocess.run(['git', '-C', '/opt/hausverwaltung', 'reset', '--hard', 'origin/main'], check=True)
+                    # Neue Migrationen vor dem Neustart einspielen
+                    subprocess.run(['/opt/hausverwaltung/venv/bin/python', '/opt/hausverwaltung/migrate.py'], check=True)
+                    st.success("Update erfolgreich! Dienst wird neu gestartet...")
+                    subprocess.run(['systemctl', 'restart', 'hausverwaltung.service'])
+                except Exception as e:
+                    st.error(f"Fehler: {e}")
+
+        with tab3:
+            st.subheader("🗄️ Datenbank-Verwaltung")
+            col_back, col_rest = st.columns(2)
+        
+            with col_back:
+                st.markdown("### 1. Sicherung")
+                b_format = st.radio("Format", ["custom", "directory"], horizontal=True,
+                                    format_func={"custom": "Eine Datei (komprimiert)", "directory": "Verzeichnis (parallel)"}.get)
+                b_jobs = st.number_input("Parallele Jobs", min_value=1, max_value=16, value=JOBS, key="backup_jobs",
+                                         disabled=b_format != "directory")
+                if st.button("🚀 Neues Backup erzeugen"):
+                    balken = st.progress(0.0, text="Starte pg_dump ...")
+
+                    def fortschritt(stufe, erledigt, gesamt):
+                        balken.progress(erledigt / gesamt if gesamt else 0.0, text=f"{stufe}: {erledigt}/{gesamt}")
+
                     try:
-                        cur.close()
-                        conn.close()
-                        env = os.environ.copy()
-                        env["PGPASSWORD"] = ""
-                        # Wir löschen die DB und legen sie neu an für einen sauberen Import
-                        subprocess.run(['psql', '-U', 'postgres', '-d', 'postgres', '-c', 'DROP DATABASE hausverwaltung;'], env=env)
-                        subprocess.run(['psql', '-U', 'postgres', '-d', 'postgres', '-c', 'CREATE DATABASE hausverwaltung;'], env=env)
-                        
-                        res = subprocess.run([
-                            'psql', '-U', 'postgres', '-d', 'hausverwaltung', '-f', st.session_state.restore_mode
-                        ], capture_output=True, text=True, env=env)
-                        
-                        if res.returncode == 0:
-                            st.success("✅ Restore erfolgreich!")
+                        result = create_backup(b_format, int(b_jobs), progress=fortschritt)
+                    except Exception as e:
+                        st.error(f"Fehler beim Backup: {e}")
+                    else:
+                        balken.progress(1.0, text="Fertig")
+                        st.success(f"Backup erfolgreich! {os.path.basename(result['path'])} "
+                                   f"({result['size'] / 1024 / 1024:.1f} MB in {result['seconds']:.1f} s)")
+
+            with col_rest:
+                st.markdown("### 2. Wiederherstellung")
+                if not st.session_state.restore_mode:
+                    uploaded_file = st.file_uploader("Sicherung hochladen (.dump oder .sql)", type=["dump", "sql"])
+                    if uploaded_file is not None:
+                        erwartet = st.text_input("Erwartete SHA-256-Prüfsumme (optional)")
+                        if st.button("📂 Datei für Restore vorbereiten"):
+                            try:
+                                info = save_upload(uploaded_file)
+                            except ValueError as e:
+                                st.error(f"Datei nicht verwendbar: {e}")
+                            else:
+                                if erwartet.strip() and erwartet.split()[0].lower() != info["sha256"]:
+                                    delete_backup(info["path"])
+                                    st.error(f"Prüfsumme stimmt nicht: hochgeladen {info['sha256']}")
+                                else:
+                                    st.session_state.restore_mode = info["path"]
+                                    st.session_state.restore_info = info
+                                    st.rerun()
+                else:
+                    st.warning(f"⚠️ {os.path.basename(st.session_state.restore_mode)} bereit. Alle aktuellen Daten werden überschrieben!")
+                    info = st.session_state.get("restore_info")
+                    if info and info["path"] == st.session_state.restore_mode:
+                        st.caption(f"Hochgeladen: {info['size'] / 1024 / 1024:.1f} MB · SHA-256 {info['sha256']}"
+                                   + (f" · {info['removed']} `\\restrict`-Zeilen entfernt" if info["removed"] else ""))
+                    r_jobs = st.number_input("Parallele Jobs (pg_restore)", min_value=1, max_value=16, value=JOBS, key="restore_jobs")
+                    if st.button("🚀 JETZT RESTORE STARTEN"):
+                        balken = st.progress(0.0, text="Prüfe Sicherung ...")
+
+                        def fortschritt(stufe, erledigt, gesamt):
+                            balken.progress(erledigt / gesamt if gesamt else 0.0, text=f"{stufe}: {erledigt}/{gesamt}")
+
+                        try:
+                            cur.close()
+                            conn.close()
+                            close_idle_connections()
+                            result = restore_backup(st.session_state.restore_mode, int(r_jobs), progress=fortschritt)
+                        except ValueError as e:
+                            # Prüfung vor dem Löschen fehlgeschlagen – Datenbank unverändert
+                            st.error(f"Sicherung nicht verwendbar: {e}")
+                        except Exception as e:
+                            st.error(f"Fehler: {e}")
+                        else:
+                            invalidate()
+                            balken.progress(1.0, text="Fertig")
+                            st.success(f"✅ Restore erfolgreich! ({result['seconds']:.1f} s)")
+                            if result["warnings"]:
+                                st.warning(result["warnings"])
                             st.balloons()
                             st.session_state.restore_mode = False
-                        else:
-                            st.error(f"Fehler: {res.stderr}")
-                    except Exception as e:
-                        st.error(f"Fehler: {e}")
                 
-                if st.button("❌ Abbrechen"):
-                    st.session_state.restore_mode = False
-                    st.rerun()
+                    if st.button("❌ Abbrechen"):
+                        st.session_state.restore_mode = False
+                        st.rerun()
 
-        st.divider()
-        st.subheader("Backup-Dateien auf dem Server")
-        if os.path.exists(BACKUP_DIR):
-            files = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.sql')], reverse=True)
-            for f in files:
-                full_path = os.path.join(BACKUP_DIR, f)
-                c_file, c_dl, c_del = st.columns([3, 1, 1])
-                c_file.write(f"📄 {f}")
-                with open(full_path, "rb") as file_content:
-                    c_dl.download_button("⬇️", file_content, file_name=f, key=f"dl_{f}")
-                if c_del.button("🗑️", key=f"del_{f}"):
-                    os.remove(full_path)
+            st.divider()
+            st.subheader("Backup-Dateien auf dem Server")
+            for b in list_backups():
+                c_file, c_dl, c_res, c_del = st.columns([3, 1, 1, 1])
+                icon = "📁" if b["format"] == "directory" else "📄"
+                pruef = " · 🔒 Prüfsumme" if b["checksum"] else ""
+                c_file.write(f"{icon} {b['name']} ({b['size'] / 1024 / 1024:.1f} MB{pruef})")
+                if b["format"] != "directory":
+                    with open(b["path"], "rb") as file_content:
+                        c_dl.download_button("⬇️", file_content, file_name=b["name"], key=f"dl_{b['name']}")
+                if c_res.button("♻️", key=f"res_{b['name']}", help="Für Restore auswählen"):
+                    st.session_state.restore_mode = b["path"]
+                    st.rerun()
+                if c_del.button("🗑️", key=f"del_{b['name']}"):
+                    delete_backup(b["path"])
                     st.rerun()
 
-    if conn:
-        cur.close()
-        conn.close()
\ No newline at end of file
+        with tab4:
+            st.subheader("🩺 Abfragezeiten")
+            st.caption(f"Letzte {query_log.RING_SIZE} Anweisungen dieses Prozesses. Anweisungen ab "
+                       f"{query_log.SLOW_MS:.0f} ms werden zusätzlich in {query_log.SLOW_LOG} protokolliert.")
+            p_stats, c_stats = pool_stats(), cache_stats()
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("Verbindungen offen / max", f"{p_stats['open']} / {p_stats['max_size']}")
+            k2.metric("Ausleihen", p_stats["checkouts"])
+            k3.metric("Wartezeiten / Fehler", f"{p_stats['waits']} / {p_stats['errors']}")
+            k4.metric("Cache-Einträge", c_stats["entries"])
+
+            top_n = st.slider("Anzahl Anweisungen", min_value=5, max_value=50, value=10, step=5)
+            spalten = {"sql": "SQL", "count": "Anzahl", "avg_ms": "Ø ms", "max_ms": "Max ms",
+                       "total_ms": "Summe ms", "rows": "Zeilen", "errors": "Fehler", "pages": "Seiten"}
+
+            st.markdown("#### 🐢 Langsamste Anweisungen")
+            df_slow = pd.DataFrame(query_log.top_statements(top_n, "max"), columns=list(spalten)).rename(columns=spalten)
+            st.dataframe(df_slow.round(1), use_container_width=True, hide_index=True)
+
+            st.markdown("#### 🔁 Häufigste Anweisungen")
+            df_oft = pd.DataFrame(query_log.top_statements(top_n, "count"), columns=list(spalten)).rename(columns=spalten)
+            st.dataframe(df_oft.round(1), use_container_width=True, hide_index=True)
+
+            st.markdown("#### 📄 DB-Zeit je Seitenaufruf")
+            c_seite, c_letzte = st.columns(2)
+            df_seiten = pd.DataFrame(query_log.page_summary(),
+                                     columns=["page", "renders", "avg_queries", "avg_db_ms", "max_db_ms"])
+            c_seite.dataframe(df_seiten.rename(columns={"page": "Seite", "renders": "Aufrufe", "avg_queries": "Ø Anweisungen",
+                                                        "avg_db_ms": "Ø DB ms", "max_db_ms": "Max DB ms"}).round(1),
+                              use_container_width=True, hide_index=True)
+            df_letzte = pd.DataFrame(query_log.recent_renders(), columns=["zeit", "page", "queries", "db_ms", "dauer_ms"])
+            df_letzte["zeit"] = df_letzte["zeit"].map(lambda t: datetime.fromtimestamp(t).strftime("%H:%M:%S"))
+            c_letzte.dataframe(df_letzte.rename(columns={"zeit": "Zeit", "page": "Seite", "queries": "Anweisungen",
+                                                         "db_ms": "DB ms", "dauer_ms": "Gesamt ms"}).round(1),
+                               use_container_width=True, hide_index=True)
+
+            if st.button("🧹 Puffer leeren"):
+                query_log.clear()
+                st.rerun()
+
+        if conn:
+            cur.close()
\ No newline at end of file
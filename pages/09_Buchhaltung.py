@@ -1,45 +1,32 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-from datetime import datetime
-import re
-
-# --- DATENBANK VERBINDUNG ---
-def get_conn():
-    conn = psycopg2.connect(dbname="hausverwaltung", user="postgres")
-    conn.set_client_encoding('UTF8')
-    return conn
+from database import db_conn
+from bank_import import UNBEKANNT, parse_transactions, commit_payments, count_known
+from keyword_matcher import get_matcher
 
 st.set_page_config(page_title="Intelligente Buchhaltung", layout="wide")
 st.title("🏦 Automatisierte Mietzuordnung")
 
 # --- DATABASE LOGIC ---
+tenants, id_to_name, keywords_map = {}, {}, {}
 try:
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Tabelle für Keywords sicherstellen
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS tenant_keywords (
-            id SERIAL PRIMARY KEY, 
-            tenant_id INTEGER REFERENCES tenants(id) ON DELETE CASCADE, 
-            keyword VARCHAR(255) UNIQUE NOT NULL
-        )
-    """)
-    conn.commit()
+    with db_conn() as conn:
+        if not conn:
+            st.error("❌ Keine Datenbankverbindung möglich.")
+        else:
+            cur = conn.cursor()
 
-    # Mieter laden
-    cur.execute("SELECT id, first_name, last_name FROM tenants")
-    tenants_res = cur.fetchall()
-    tenants = {f"{r[1]} {r[2]}".strip(): r[0] for r in tenants_res}
-    id_to_name = {r[0]: f"{r[1]} {r[2]}".strip() for r in tenants_res}
+            # Mieter laden
+            cur.execute("SELECT id, first_name, last_name FROM tenants")
+            tenants_res = cur.fetchall()
+            tenants = {f"{r[1]} {r[2]}".strip(): r[0] for r in tenants_res}
+            id_to_name = {r[0]: f"{r[1]} {r[2]}".strip() for r in tenants_res}
 
-    # Keywords laden
-    cur.execute("SELECT keyword, tenant_id FROM tenant_keywords")
-    keywords_map = {row[0].lower(): row[1] for row in cur.fetchall()}
+            # Keywords laden
+            cur.execute("SELECT keyword, tenant_id FROM tenant_keywords")
+            keywords_map = {row[0].lower(): row[1] for row in cur.fetchall()}
     
-    cur.close()
-    conn.close()
+            cur.close()
 except Exception as e:
     st.error(f"Datenbankfehler: {e}")
 
@@ -62,33 +49,32 @@ with tab_import:
             col_date = st.selectbox("Spalte für Datum", df.columns)
             col_amount = st.selectbox("Spalte für Betrag", df.columns)
             col_text = st.selectbox("Spalte für Verwendungszweck / Name", df.columns)
+            # Konto des Zahlers nur zur Anzeige in der Vorschau (nicht Teil des Fingerabdrucks)
+            col_account = st.selectbox("Spalte für Konto / IBAN des Zahlers (optional)", [None, *df.columns],
+                                       format_func=lambda c: "– keine –" if c is None else c)
 
             if st.button("Zuordnung starten"):
+                # Datum und Betrag vektorisiert über die ganze Datei parsen
+                tx = parse_transactions(df, col_date, col_amount, col_text, col_account)
+                # Ein Durchlauf je Verwendungszweck über alle Suchbegriffe (Aho-Corasick, gecacht)
+                matcher = get_matcher(keywords_map)
                 results = []
-                for _, row in df.iterrows():
-                    purpose = str(row[col_text]).lower()
-                    amount = str(row[col_amount]).replace(',', '.')
-                    try:
-                        amount_float = float(re.sub(r'[^\d.-]', '', amount))
-                    except:
-                        amount_float = 0.0
-                    
-                    # Logik: Nur Haben-Buchungen (Eingänge) beachten
-                    if amount_float <= 0:
-                        continue
-                    
-                    found_tenant = "Unbekannt"
-                    # Suche nach Keywords im Verwendungszweck
-                    for kw, t_id in keywords_map.items():
-                        if kw in purpose:
-                            found_tenant = id_to_name.get(t_id, "Unbekannt")
-                            break
+                for datum, betrag, zweck, konto in zip(tx["Datum"], tx["Betrag"], tx["Zweck"], tx["Konto"]):
+                    treffer = matcher.match(zweck)
+                    found_tenant = id_to_name.get(treffer.tenant_id, UNBEKANNT)
+                    hinweis = ""
+                    if treffer.ambiguous:
+                        namen = ", ".join(id_to_name.get(t, str(t)) for t in treffer.candidates)
+                        hinweis = f"⚠️ Mehrdeutig: {namen}"
                     
                     results.append({
-                        "Datum": row[col_date],
-                        "Betrag": amount_float,
-                        "Zweck": row[col_text],
-                        "Mieter": found_tenant
+                        "Datum": datum,
+                        "Betrag": betrag,
+                        "Zweck": zweck,
+                        "Konto": konto,
+                        "Mieter": found_tenant,
+                        "Suchbegriff": treffer.keyword or "",
+                        "Hinweis": hinweis
                     })
                 
                 st.session_state['import_results'] = results
@@ -97,42 +83,32 @@ with tab_import:
             if 'import_results' in st.session_state:
                 res_df = pd.DataFrame(st.session_state['import_results'])
                 st.subheader("Vorschlag zur Verbuchung")
+
+                # Schon importierte Buchungen vor dem Speichern anzeigen (wie der Probelauf in cli.py)
+                with db_conn() as conn:
+                    bekannt = count_known(conn, st.session_state['import_results']) if conn else 0
+                gesamt = len(st.session_state['import_results'])
+                st.info(f"Neu: {gesamt - bekannt} | Bereits importiert (werden nicht erneut verbucht): {bekannt}")
                 
                 # Filter für unbekannte
                 show_only_unknown = st.checkbox("Nur unbekannte Zahlungen anzeigen")
                 if show_only_unknown:
-                    res_df = res_df[res_df['Mieter'] == "Unbekannt"]
+                    res_df = res_df[res_df['Mieter'] == UNBEKANNT]
                 
                 st.data_editor(res_df, key="editor", use_container_width=True)
 
                 if st.button("✅ Alle erkannten Zahlungen speichern"):
                     try:
-                        conn = get_conn()
-                        cur = conn.cursor()
-                        count = 0
-                        for row in st.session_state['import_results']:
-                            if row['Mieter'] != "Unbekannt":
-                                # Datumsformatierung
-                                try:
-                                    d_str = str(row['Datum'])
-                                    clean_date = datetime.now().date() # Fallback
-                                    if "." in d_str:
-                                        parts = d_str.split(".")
-                                        if len(parts[2]) == 2: # DD.MM.YY
-                                            clean_date = datetime.strptime(d_str, '%d.%m.%y').date()
-                                        else: # DD.MM.YYYY
-                                            clean_date = datetime.strptime(d_str, '%d.%m.%Y').date()
-                                except: pass
-                                
-                                cur.execute("""
-                                    INSERT INTO payments (tenant_id, amount, payment_date, note)
-                                    VALUES (%s, %s, %s, %s)
-                                """, (tenants[row['Mieter']], row['Betrag'], clean_date, f"Auto-Import: {row['Zweck'][:50]}"))
-                                count += 1
-                        conn.commit()
-                        cur.close()
-                        conn.close()
-                        st.success(f"{count} Zahlungen verbucht!")
+                        # Ein COPY in eine Staging-Tabelle + ein INSERT ... SELECT in einer Transaktion;
+                        # schon importierte Buchungen verwirft die Datenbank (Fingerabdruck)
+                        with db_conn() as conn:
+                            summary = commit_payments(conn, st.session_state['import_results'], tenants)
+                        st.success(f"{summary['inserted']} Zahlungen verbucht!")
+                        if summary['duplicates']:
+                            st.info(f"Bereits importiert (nicht erneut verbucht): {summary['duplicates']}")
+                        if summary['skipped'] or summary['failed']:
+                            st.info(f"Übersprungen (kein Mieter): {summary['skipped']} | "
+                                    f"Fehlerhaft (Datum/Betrag unlesbar): {summary['failed']}")
                         st.balloons()
                     except Exception as e:
                         st.error(f"Fehler: {e}")
@@ -152,13 +128,12 @@ with tab_settings:
         if st.form_submit_button("Speichern"):
             if new_word:
                 try:
-                    conn = get_conn()
-                    cur = conn.cursor()
-                    cur.execute("INSERT INTO tenant_keywords (tenant_id, keyword) VALUES (%s, %s) ON CONFLICT (keyword) DO NOTHING", 
-                                (tenants[target_tenant], new_word))
-                    conn.commit()
-                    cur.close()
-                    conn.close()
+                    with db_conn() as conn:
+                        cur = conn.cursor()
+                        cur.execute("INSERT INTO tenant_keywords (tenant_id, keyword) VALUES (%s, %s) ON CONFLICT (keyword) DO NOTHING", 
+                                    (tenants[target_tenant], new_word))
+                        conn.commit()
+                        cur.close()
                     st.success(f"'{new_word}' gespeichert.")
                     st.rerun()
                 except Exception as e:
@@ -169,14 +144,13 @@ with tab_settings:
     # --- LISTE DER BEGRIFFE ANZEIGEN & LÖSCHEN ---
     st.subheader("Aktive Suchbegriffe")
     try:
-        conn = get_conn()
-        df_kw = pd.read_sql_query("""
-            SELECT tk.id, tk.keyword as "Begriff", t.first_name || ' ' || t.last_name as "Mieter"
-            FROM tenant_keywords tk
-            JOIN tenants t ON tk.tenant_id = t.id
-            ORDER BY t.last_name, tk.keyword
-        """, conn)
-        conn.close()
+        with db_conn() as conn:
+            df_kw = pd.read_sql_query("""
+                SELECT tk.id, tk.keyword as "Begriff", t.first_name || ' ' || t.last_name as "Mieter"
+                FROM tenant_keywords tk
+                JOIN tenants t ON tk.tenant_id = t.id
+                ORDER BY t.last_name, tk.keyword
+            """, conn)
 
         if not df_kw.empty:
             # Tabelle anzeigen
@@ -186,12 +160,11 @@ with tab_settings:
             with st.expander("🗑️ Begriff löschen"):
                 del_word = st.selectbox("Welchen Begriff möchtest du entfernen?", df_kw["Begriff"].tolist())
                 if st.button("Ausgewählten Begriff löschen"):
-                    conn = get_conn()
-                    cur = conn.cursor()
-                    cur.execute("DELETE FROM tenant_keywords WHERE keyword = %s", (del_word,))
-                    conn.commit()
-                    cur.close()
-                    conn.close()
+                    with db_conn() as conn:
+                        cur = conn.cursor()
+                        cur.execute("DELETE FROM tenant_keywords WHERE keyword = %s", (del_word,))
+                        conn.commit()
+                        cur.close()
                     st.success(f"'{del_word}' wurde entfernt.")
                     st.rerun()
         else:
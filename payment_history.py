@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+# Zahlungsverlauf seitenweise aus der Datenbank (Keyset-Paginierung).
+# Sortierung: neueste Zahlung zuerst (payment_date DESC, id DESC). Eine Seite
+# wird über den Schlüssel der letzten Zeile der Vorseite adressiert, daher
+# bleibt jede Seite gleich schnell – egal wie lang die Historie ist.
+# Filter und Summen laufen komplett in SQL.
+
+PAGE_SIZE = 50
+# Typen aus der Erfassung (06) und der Korrektur (04)
+PAYMENT_TYPES = ["Miete", "Nebenkosten-Nachzahlung", "Sonstiges", "Überweisung", "Bar", "Dauerauftrag"]
+
+SELECT_COLUMNS = """
+    SELECT p.id, p.payment_date, p.tenant_id, t.first_name, t.last_name, p.amount, p.payment_type, p.note
+    FROM payments p
+    JOIN tenants t ON p.tenant_id = t.id
+"""
+
+
+def _where(filters):
+    # filters: tenant_id, date_from, date_to (inklusive), payment_type, amount_min, amount_max
+    filters = filters or {}
+    clauses, params = [], []
+    if filters.get("tenant_id") is not None:
+        clauses.append("p.tenant_id = %s")
+        params.append(filters["tenant_id"])
+    if filters.get("date_from"):
+        clauses.append("p.payment_date >= %s")
+        params.append(filters["date_from"])
+    if filters.get("date_to"):
+        clauses.append("p.payment_date < %s")
+        params.append(filters["date_to"] + timedelta(days=1))
+    if filters.get("payment_type"):
+        clauses.append("p.payment_type = %s")
+        params.append(filters["payment_type"])
+    if filters.get("amount_min") is not None:
+        clauses.append("p.amount >= %s")
+        params.append(filters["amount_min"])
+    if filters.get("amount_max") is not None:
+        clauses.append("p.amount <= %s")
+        params.append(filters["amount_max"])
+    return clauses, params
+
+
+def fetch_page(conn, filters=None, after=None, limit=PAGE_SIZE):
+    """Eine Seite Zahlungen.
+
+    after: (payment_date, id) der letzten Zeile der vorherigen Seite oder None.
+    Liefert (rows, next_after); next_after ist None auf der letzten Seite.
+    """
+    clauses, params = _where(filters)
+    if after is not None:
+        clauses.append("(p.payment_date, p.id) < (%s, %s)")
+        params.extend(after)
+    sql = SELECT_COLUMNS
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY p.payment_date DESC, p.id DESC LIMIT %s"
+    params.append(limit + 1)
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    cur.close()
+
+    # Eine Zeile mehr holen, um zu wissen, ob es eine nächste Seite gibt
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1][1], rows[-1][0])
+    return rows, None
+
+
+def totals(conn, filters=None):
+    """Anzahl und Summe aller Zahlungen zum Filter (nicht nur der sichtbaren Seite)."""
+    clauses, params = _where(filters)
+    sql = "SELECT COUNT(*), COALESCE(SUM(p.amount), 0) FROM payments p JOIN tenants t ON p.tenant_id = t.id"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    count, total = cur.fetchone()
+    cur.close()
+    return count, float(total)
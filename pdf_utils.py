@@ -1,62 +1,190 @@
-from fpdf import FPDF
+import threading
 from datetime import datetime
 
+import fpdf
+from fpdf import FPDF
+
+# PDF-Erzeugung im Speicher: die Funktionen liefern die fertige Datei als
+# bytes (kein fester Pfad unter /tmp, keine Kollision zwischen Sitzungen).
+#
+# Statische Teile (Absenderzeile, Überschriften, Beschriftungen der Angaben-
+# Tabelle, Tabellenkopf) werden je Vermieter einmal als Vorlage gezeichnet und
+# als fertige Seiteninhalte (PDF-Operatoren) aufbewahrt. Ein neues Dokument
+# übernimmt diese Inhalte und schreibt nur noch die veränderlichen Werte an
+# die in der Vorlage gemerkten Positionen.
+#
+# Das Übernehmen der Seiteninhalte greift auf Interna von fpdf 1.7.2 zurück
+# (pages, fonts, font_family); requirements.txt legt die Version fest. Mit
+# einer anderen Version wird der Kopf wie früher in jedes Dokument gezeichnet.
+VORLAGEN_CACHE = getattr(fpdf, "FPDF_VERSION", "") == "1.7.2"
+
+
 class NK_PDF(FPDF):
     def clean_text(self, text):
         if text is None: return ""
         text = str(text).replace('€', 'EUR').replace('²', '2')
         return text.encode('latin-1', 'replace').decode('latin-1')
 
+
+class Vorlage:
+    """Aufgezeichneter statischer Seitenkopf mit Platzhalter-Positionen."""
+
+    def __init__(self, zeichnen):
+        pdf = NK_PDF()
+        pdf.add_page()
+        start = len(pdf.pages[pdf.page])
+        self.slots = {}
+        zeichnen(pdf, self.slots)
+        self.inhalt = pdf.pages[pdf.page][start:]
+        # Schriften in der Reihenfolge ihrer Nummer (/F1, /F2, ...) im Inhalt
+        self.fonts = sorted(pdf.fonts, key=lambda key: pdf.fonts[key]["i"])
+        self.font = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        self.y = pdf.y
+
+    def neues_dokument(self):
+        pdf = NK_PDF()
+        for key in self.fonts:
+            family = key.rstrip("BI") if key not in ("symbol", "zapfdingbats") else key
+            pdf.set_font(family, key[len(family):].upper(), 10)
+        pdf.add_page()
+        pdf.pages[pdf.page] += self.inhalt
+        # Schriftzustand wie am Ende der Vorlage (erzwingt den Tf-Operator)
+        pdf.font_family = ""
+        pdf.set_font(*self.font)
+        pdf.set_y(self.y)
+        return pdf
+
+    def text(self, pdf, slot, txt, font, w=0, h=6, border=0, align=""):
+        pdf.set_font(*font)
+        pdf.set_xy(*self.slots[slot])
+        pdf.cell(w, h, pdf.clean_text(txt), border, 0, align)
+
+
+class DirekteVorlage(Vorlage):
+    """Ohne Aufzeichnung: zeichnet den Kopf in jedes neue Dokument (nur öffentliche fpdf-API)."""
+
+    def __init__(self, zeichnen):
+        self.zeichnen = zeichnen
+        self.slots = {}
+
+    def neues_dokument(self):
+        pdf = NK_PDF()
+        pdf.add_page()
+        self.slots = {}
+        self.zeichnen(pdf, self.slots)
+        self.y = pdf.y
+        return pdf
+
+
+_vorlagen = {}
+_vorlagen_lock = threading.Lock()
+
+
+def vorlage(art, schluessel, zeichnen):
+    """Vorlage aus dem Cache (einmal je Art und Vermieter gezeichnet)."""
+    if not VORLAGEN_CACHE:
+        return DirekteVorlage(zeichnen)
+    key = (art, schluessel)
+    v = _vorlagen.get(key)
+    if v is None:
+        v = Vorlage(zeichnen)
+        with _vorlagen_lock:
+            _vorlagen[key] = v
+    return v
+
+
+def clear_templates():
+    # Alle Vorlagen verwerfen; sie werden beim nächsten Dokument neu gezeichnet
+    with _vorlagen_lock:
+        _vorlagen.clear()
+
+
+def _pdf_bytes(pdf):
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+def _slot(pdf, slots, name, w, h, ln=False):
+    # Platz für einen veränderlichen Wert freihalten und die Position merken
+    slots[name] = (pdf.x, pdf.y)
+    if ln:
+        pdf.ln(h)
+    else:
+        pdf.set_x(pdf.x + w)
+
+
+# --- NEBENKOSTENABRECHNUNG ---
+NK_COL = 48
+NK_WIDTHS = [45, 30, 25, 40, 25, 30]
+NK_HEADERS = ["Kostenart", "Gesamtkosten Haus", "Anteil Tage", "Verteilungsschlüssel", "Anteil Whg.", "Ihre Kosten"]
+
+
+def _nk_kopf(h_stats):
+    def zeichnen(pdf, slots):
+        # Header: Absender
+        pdf.set_font("Helvetica", '', 9)
+        pdf.cell(0, 5, pdf.clean_text(f"{h_stats.get('name', 'Murat Sayilik')}, {h_stats.get('street', 'Eintrachtstr. 160')}, {h_stats.get('city', '42277 Wuppertal')}"), ln=True)
+        pdf.ln(10)
+
+        # Mieter Adresse
+        pdf.set_font("Helvetica", '', 11)
+        _slot(pdf, slots, "mieter", 0, 6, ln=True)
+        pdf.cell(0, 6, "Eintracht Straße 160", ln=True)
+        pdf.cell(0, 6, "42277 Wuppertal", ln=True)
+        pdf.ln(10)
+
+        # Titel Bereich
+        pdf.set_font("Helvetica", 'B', 12)
+        pdf.cell(0, 8, "Nebenkostenabrechnung", ln=True)
+        pdf.set_font("Helvetica", '', 10)
+        _slot(pdf, slots, "zeitraum", 0, 6, ln=True)
+        _slot(pdf, slots, "wohnung", 0, 6, ln=True)
+        pdf.cell(0, 6, "Eintracht Straße 160, 42277 Wuppertal", ln=True)
+        pdf.ln(5)
+
+        pdf.set_font("Helvetica", 'B', 10)
+        pdf.cell(0, 8, "Allgemeine Angaben zur Wohnung und zu den Verteilungsschlüsseln", ln=True)
+        pdf.set_font("Helvetica", '', 9)
+        _slot(pdf, slots, "datum", 0, 6, ln=True)
+
+        # Tabelle: Allgemeine Angaben (Exakt wie Beispiel)
+        col = NK_COL
+        pdf.cell(col, 7, "Ihr Nutzungszeitraum:", 1); _slot(pdf, slots, "monate", col, 7)
+        pdf.cell(col, 7, "Abrechnungszeitraum:", 1); _slot(pdf, slots, "zeitraum_kurz", col, 7, ln=True)
+        pdf.cell(col, 7, "Ihre Nutzungstage:", 1); _slot(pdf, slots, "tage", col, 7)
+        pdf.cell(col, 7, "Abrechnungstage:", 1); pdf.cell(col, 7, "365 Tage", 1, 1)
+        pdf.cell(col, 7, "Wohnung:", 1); _slot(pdf, slots, "flaeche", col, 7)
+        pdf.cell(col, 7, "Gesamtwohnfläche:", 1); pdf.cell(col, 7, f"{h_stats.get('total_area', 0):.2f} m2", 1, 1)
+        pdf.cell(col, 7, "Personen:", 1); _slot(pdf, slots, "personen", col, 7)
+        pdf.cell(col, 7, "Personen (Jahresmittel):", 1); pdf.cell(col, 7, f"{h_stats.get('total_occupants', 1):g}", 1, 1)
+        pdf.ln(8)
+
+        # Haupttabelle Kosten: Kopfzeile
+        pdf.set_font("Helvetica", 'B', 8)
+        for i, h in enumerate(NK_HEADERS):
+            pdf.cell(NK_WIDTHS[i], 8, h, 1, 0, 'C')
+        pdf.ln()
+    return zeichnen
+
+
 def generate_nebenkosten_pdf(mieter_name, wohnung, zeitraum_text, tage, tabelle, gesamt, voraus, diff, m_stats, h_stats):
-    pdf = NK_PDF()
-    pdf.add_page()
-    
-    # Header: Absender
-    pdf.set_font("Helvetica", '', 9)
-    pdf.cell(0, 5, f"{h_stats.get('name', 'Murat Sayilik')}, {h_stats.get('street', 'Eintrachtstr. 160')}, {h_stats.get('city', '42277 Wuppertal')}", ln=True)
-    pdf.ln(10)
-    
-    # Mieter Adresse
-    pdf.set_font("Helvetica", '', 11)
-    pdf.cell(0, 6, pdf.clean_text(mieter_name), ln=True)
-    pdf.cell(0, 6, "Eintracht Straße 160", ln=True)
-    pdf.cell(0, 6, "42277 Wuppertal", ln=True)
-    pdf.ln(10)
-    
-    # Titel Bereich
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 8, "Nebenkostenabrechnung", ln=True)
-    pdf.set_font("Helvetica", '', 10)
-    pdf.cell(0, 6, f"für den Abrechnungszeitraum {zeitraum_text}", ln=True)
-    pdf.cell(0, 6, f"Wohnung: {wohnung}", ln=True)
-    pdf.cell(0, 6, "Eintracht Straße 160, 42277 Wuppertal", ln=True)
-    pdf.ln(5)
-    
-    pdf.set_font("Helvetica", 'B', 10)
-    pdf.cell(0, 8, "Allgemeine Angaben zur Wohnung und zu den Verteilungsschlüsseln", ln=True)
-    pdf.set_font("Helvetica", '', 9)
-    pdf.cell(0, 6, f"Erstellungsdatum: {datetime.now().strftime('%d.%m.%Y')}", ln=True)
-    
-    # Tabelle: Allgemeine Angaben (Exakt wie Beispiel)
-    col = 48
-    pdf.cell(col, 7, "Ihr Nutzungszeitraum:", 1); pdf.cell(col, 7, f"{tage/30.4:.1f} Monate", 1)
-    pdf.cell(col, 7, "Abrechnungszeitraum:", 1); pdf.cell(col, 7, zeitraum_text, 1, 1)
-    pdf.cell(col, 7, "Ihre Nutzungstage:", 1); pdf.cell(col, 7, f"{tage} Tage", 1)
-    pdf.cell(col, 7, "Abrechnungstage:", 1); pdf.cell(col, 7, "365 Tage", 1, 1)
-    pdf.cell(col, 7, "Wohnung:", 1); pdf.cell(col, 7, f"{m_stats.get('area', 0):.2f} m2", 1)
-    pdf.cell(col, 7, "Gesamtwohnfläche:", 1); pdf.cell(col, 7, f"{h_stats.get('total_area', 0):.2f} m2", 1, 1)
-    pdf.cell(col, 7, "Personen:", 1); pdf.cell(col, 7, f"{m_stats.get('occupants', 1)}", 1)
-    pdf.cell(col, 7, "Gesamtzahl Personen:", 1); pdf.cell(col, 7, f"{h_stats.get('total_occupants', 1)}", 1, 1)
-    pdf.ln(8)
-
-    # Haupttabelle Kosten
-    pdf.set_font("Helvetica", 'B', 8)
-    widths = [45, 30, 25, 40, 25, 30]
-    headers = ["Kostenart", "Gesamtkosten Haus", "Anteil Tage", "Verteilungsschlüssel", "Anteil Whg.", "Ihre Kosten"]
-    for i, h in enumerate(headers):
-        pdf.cell(widths[i], 8, h, 1, 0, 'C')
-    pdf.ln()
+    schluessel = tuple(h_stats.get(k) for k in ("name", "street", "city", "total_area", "total_occupants"))
+    v = vorlage("nebenkosten", schluessel, _nk_kopf(h_stats))
+    pdf = v.neues_dokument()
+
+    normal = ("Helvetica", '', 9)
+    v.text(pdf, "mieter", mieter_name, ("Helvetica", '', 11))
+    v.text(pdf, "zeitraum", f"für den Abrechnungszeitraum {zeitraum_text}", ("Helvetica", '', 10))
+    v.text(pdf, "wohnung", f"Wohnung: {wohnung}", ("Helvetica", '', 10))
+    v.text(pdf, "datum", f"Erstellungsdatum: {datetime.now().strftime('%d.%m.%Y')}", normal)
+    v.text(pdf, "monate", f"{tage/30.4:.1f} Monate", normal, NK_COL, 7, 1)
+    v.text(pdf, "zeitraum_kurz", zeitraum_text, normal, NK_COL, 7, 1)
+    v.text(pdf, "tage", f"{tage} Tage", normal, NK_COL, 7, 1)
+    v.text(pdf, "flaeche", f"{m_stats.get('area', 0):.2f} m2", normal, NK_COL, 7, 1)
+    v.text(pdf, "personen", f"{m_stats.get('occupants', 1)}", normal, NK_COL, 7, 1)
+    pdf.set_xy(pdf.l_margin, v.y)
 
+    widths = NK_WIDTHS
     pdf.set_font("Helvetica", '', 8)
     for row in tabelle:
         pdf.cell(widths[0], 7, pdf.clean_text(row['Kostenart']), 1)
@@ -79,43 +207,55 @@ def generate_nebenkosten_pdf(mieter_name, wohnung, zeitraum_text, tage, tabelle,
     pdf.cell(165, 10, label, 0, 0, 'R')
     pdf.cell(30, 10, f"{abs(diff):.2f} EUR", 0, 1, 'R')
 
-    path = f"/tmp/NK_{mieter_name.replace(' ', '_')}.pdf"
-    pdf.output(path)
-    return path
+    return _pdf_bytes(pdf)
+
+
+# --- ZAHLUNGSVERLAUF / KONTOAUSZUG ---
+KA_WIDTHS = [40, 35, 35, 35, 45]
+KA_HEADERS = ["Monat", "Soll", "Ist", "Saldo", "Status"]
+
+
+def _ka_kopf(h_stats):
+    def zeichnen(pdf, slots):
+        # Header wie oben
+        pdf.set_font("Helvetica", '', 9)
+        pdf.cell(0, 5, pdf.clean_text(f"{h_stats.get('name', '')}, {h_stats.get('street', '')}, {h_stats.get('city', '')}"), ln=True)
+        pdf.ln(10)
+
+        pdf.set_font("Helvetica", 'B', 14)
+        _slot(pdf, slots, "titel", 0, 10, ln=True)
+        pdf.set_font("Helvetica", '', 11)
+        _slot(pdf, slots, "mieter", 0, 8, ln=True)
+        _slot(pdf, slots, "zeitraum", 0, 8, ln=True)
+        pdf.ln(10)
+
+        # Tabelle Zahlungsverlauf: Kopfzeile
+        pdf.set_font("Helvetica", 'B', 10)
+        for i, h in enumerate(KA_HEADERS):
+            pdf.cell(KA_WIDTHS[i], 10, h, 1, 0, 'C')
+        pdf.ln()
+    return zeichnen
+
 
 def generate_payment_history_pdf(mieter_name, jahr, history_data, h_stats, zeitraum_text):
-    pdf = NK_PDF()
-    pdf.add_page()
-    
-    # Header wie oben
-    pdf.set_font("Helvetica", '', 9)
-    pdf.cell(0, 5, f"{h_stats.get('name', '')}, {h_stats.get('street', '')}, {h_stats.get('city', '')}", ln=True)
-    pdf.ln(10)
-    
-    pdf.set_font("Helvetica", 'B', 14)
-    pdf.cell(0, 10, pdf.clean_text(f"Zahlungsverlauf / Kontoauszug {jahr}"), ln=True)
-    pdf.set_font("Helvetica", '', 11)
-    pdf.cell(0, 8, pdf.clean_text(f"Mieter: {mieter_name}"), ln=True)
-    pdf.cell(0, 8, f"Mietverhältnis: {zeitraum_text}", ln=True)
-    pdf.ln(10)
-
-    # Tabelle Zahlungsverlauf
-    widths = [40, 35, 35, 35, 45]
-    pdf.set_font("Helvetica", 'B', 10)
-    headers = ["Monat", "Soll", "Ist", "Saldo", "Status"]
-    for i, h in enumerate(headers):
-        pdf.cell(widths[i], 10, h, 1, 0, 'C')
-    pdf.ln()
+    schluessel = tuple(h_stats.get(k) for k in ("name", "street", "city"))
+    v = vorlage("kontoauszug", schluessel, _ka_kopf(h_stats))
+    pdf = v.neues_dokument()
+
+    v.text(pdf, "titel", f"Zahlungsverlauf / Kontoauszug {jahr}", ("Helvetica", 'B', 14), h=10)
+    v.text(pdf, "mieter", f"Mieter: {mieter_name}", ("Helvetica", '', 11), h=8)
+    v.text(pdf, "zeitraum", f"Mietverhältnis: {zeitraum_text}", ("Helvetica", '', 11), h=8)
+    pdf.set_xy(pdf.l_margin, v.y)
 
+    widths = KA_WIDTHS
     pdf.set_font("Helvetica", '', 10)
     for row in history_data:
         pdf.cell(widths[0], 8, pdf.clean_text(row['Monat']), 1)
         pdf.cell(widths[1], 8, f"{row['Soll (€)']} EUR", 1, 0, 'R')
         pdf.cell(widths[2], 8, f"{row['Ist (€)']} EUR", 1, 0, 'R')
         pdf.cell(widths[3], 8, f"{row['Saldo (€)']} EUR", 1, 0, 'R')
-        pdf.cell(widths[4], 8, pdf.clean_text(row['Status']), 1, 1, 'C')
+        # Emojis sind in latin-1 nicht darstellbar
         st_clean = row['Status'].replace("✅ ", "").replace("❌ ", "").replace("💤 ", "")
-        pdf.cell(40, 8, st_clean, 1, 1, 'C')
-    path = f"/tmp/Kontoauszug_{mieter_name.replace(' ', '_')}.pdf"
-    pdf.output(path)
-    return path
\ No newline at end of file
+        pdf.cell(widths[4], 8, pdf.clean_text(st_clean), 1, 1, 'C')
+
+    return _pdf_bytes(pdf)
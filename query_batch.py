@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from database import DB_PARAMS, POOL_MAX, spare_conn
+from query_log import TimedConnection
+
+# Gleichzeitiges Laden voneinander unabhängiger Leseabfragen einer Seite.
+#
+# Statt alle Abfragen nacheinander über eine Verbindung zu schicken, leiht
+# run_parallel zusätzliche Verbindungen aus dem Pool (ohne zu warten) und
+# arbeitet die Abfragen in Threads ab; die Seite wartet nur noch auf die
+# langsamste. Ist keine Verbindung frei, läuft alles wie bisher nacheinander
+# über die Verbindung des Aufrufers.
+#
+# Die Abfragen laufen in getrennten Transaktionen und dürfen daher weder
+# schreiben noch auf ungespeicherte Änderungen der Seite angewiesen sein.
+
+# Höchstens so viele Verbindungen je Seitenaufruf (inkl. der eigenen)
+WORKERS = max(1, min(int(os.environ.get("DB_BATCH_WORKERS", "4")), POOL_MAX))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_MAX, thread_name_prefix="query_batch")
+    return _executor
+
+
+def with_cursor(fn, *args):
+    """Macht aus einer Ladefunktion fn(cur, *args) eine Abfrage für run_parallel."""
+    def query(conn):
+        cur = conn.cursor()
+        try:
+            return fn(cur, *args)
+        finally:
+            cur.close()
+    return query
+
+
+def run_parallel(conn, queries, workers=WORKERS):
+    """Führt {name: fn(conn)} gleichzeitig aus und liefert {name: ergebnis}.
+
+    Die erste Ausnahme einer Abfrage wird erst weitergereicht, wenn alle
+    übrigen fertig und die Hilfsverbindungen zurückgegeben sind.
+    """
+    offen = list(queries.items())
+    # Hilfsverbindungen nur für dieselbe Datenbank wie die des Aufrufers
+    anzahl = min(workers, len(offen)) - 1
+    if conn.info.dbname != DB_PARAMS["dbname"]:
+        anzahl = 0
+
+    with ExitStack() as stack:
+        page = getattr(conn, "page", None)
+        verbindungen = [conn]
+        for _ in range(anzahl):
+            hilfe = stack.enter_context(spare_conn(page))
+            if hilfe is None:
+                break
+            verbindungen.append(hilfe)
+
+        if len(verbindungen) == 1:
+            return {name: fn(conn) for name, fn in offen}
+
+        lock = threading.Lock()
+        ergebnisse, fehler = {}, []
+
+        def abarbeiten(c):
+            while True:
+                with lock:
+                    if not offen or fehler:
+                        return
+                    name, fn = offen.pop(0)
+                try:
+                    wert = fn(c)
+                except Exception as e:
+                    with lock:
+                        fehler.append(e)
+                    return
+                ergebnisse[name] = wert
+
+        executor = _get_executor()
+        for f in [executor.submit(abarbeiten, c) for c in verbindungen]:
+            f.result()
+
+        if isinstance(conn, TimedConnection):
+            for hilfe in verbindungen[1:]:
+                conn.take_over(hilfe)
+    if fehler:
+        raise fehler[0]
+    return {name: ergebnisse[name] for name in queries}
@@ -0,0 +1,207 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from psycopg2 import extensions
+
+# Zeitmessung aller Datenbankabfragen.
+#
+# Die Verbindungen aus database.py benutzen TimedConnection; jeder Cursor
+# misst Dauer und Zeilenzahl je Anweisung und merkt sich die aufrufende Seite.
+# Die letzten Anweisungen liegen in einem Ringpuffer im Speicher (fester
+# Umfang), langsame Anweisungen werden zusätzlich in eine Logdatei geschrieben.
+# Gespeichert wird nur die Vorlage ohne Werte: Literale werden zu "?" und
+# VALUES-Listen (execute_values setzt die Werte schon im Client ein) auf eine
+# Zeile gekürzt, damit keine Namen, IBANs oder Beträge im Log landen. Je Ausleihe einer Pool-Verbindung (in der Regel ein
+# Seitenaufruf) wird die gesamte DB-Zeit festgehalten.
+# Auswertung: Einstellungen -> Diagnose.
+
+SLOW_MS = float(os.environ.get("DB_SLOW_MS", "200"))
+RING_SIZE = int(os.environ.get("DB_QUERY_LOG_SIZE", "2000"))
+RENDER_RING_SIZE = 200
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SLOW_LOG = os.environ.get("DB_SLOW_LOG", os.path.join(APP_DIR, "logs", "slow_queries.log"))
+
+_PAGES_DIR = os.path.join(APP_DIR, "pages") + os.sep
+_SCRIPTS = {os.path.join(APP_DIR, name) for name in ("main.py", "app.py")}
+
+_lock = threading.Lock()
+# (Zeitpunkt, Seite, SQL, Dauer ms, Zeilen, Fehler)
+_queries = deque(maxlen=RING_SIZE)
+# (Zeitpunkt, Seite, Anzahl Anweisungen, DB-Zeit ms, Dauer ms)
+_renders = deque(maxlen=RENDER_RING_SIZE)
+
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+
+def _get_slow_log():
+    global _slow_log
+    if _slow_log is None:
+        with _slow_log_lock:
+            if _slow_log is None:
+                logger = logging.getLogger("hausverwaltung.slow_queries")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                try:
+                    os.makedirs(os.path.dirname(SLOW_LOG), exist_ok=True)
+                    handler = RotatingFileHandler(SLOW_LOG, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
+                    handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))
+                    logger.addHandler(handler)
+                except OSError as e:
+                    # Ohne Schreibrecht nur im Speicher protokollieren
+                    logging.getLogger("hausverwaltung.db").warning("Slow-Query-Log nicht beschreibbar: %s", e)
+                    logger.addHandler(logging.NullHandler())
+                _slow_log = logger
+    return _slow_log
+
+
+def caller_page():
+    """Name der Seite (pages/*.py, main, app), aus der der Aufruf kommt."""
+    f = sys._getframe(1)
+    while f is not None:
+        fn = f.f_code.co_filename
+        if fn.startswith(_PAGES_DIR) or fn in _SCRIPTS:
+            return os.path.splitext(os.path.basename(fn))[0]
+        f = f.f_back
+    return os.path.splitext(os.path.basename(sys.argv[0] or "?"))[0]
+
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_VALUES_LIST = re.compile(r"(\bVALUES\s*)(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+
+
+def template(sql):
+    """SQL-Text ohne Werte: Literale -> ?, mehrzeilige VALUES-Listen -> erste Zeile + ", ..."."""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    sql = _LITERAL.sub("?", str(sql))
+    return _VALUES_LIST.sub(r"\1\2, ...", sql)
+
+
+def normalize(sql):
+    # Einheitliche Schreibweise für die Gruppierung (Leerraum, Länge)
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    return re.sub(r"\s+", " ", str(sql)).strip()[:500]
+
+
+def record(page, sql, ms, rows, fehler=False):
+    with _lock:
+        _queries.append((time.time(), page, sql, ms, rows, fehler))
+    if ms >= SLOW_MS:
+        _get_slow_log().info("%.1f ms | %s Zeilen | %s | %s%s", ms, rows, page, normalize(sql),
+                             " | FEHLER" if fehler else "")
+
+
+class TimedCursor(extensions.cursor):
+    def _timed(self, method, sql, *args):
+        t0 = time.perf_counter()
+        fehler = True
+        try:
+            result = method(sql, *args)
+            fehler = False
+            return result
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            conn = self.connection
+            conn.db_ms += ms
+            conn.queries += 1
+            text = sql.as_string(self) if hasattr(sql, "as_string") else sql
+            record(conn.page or caller_page(), template(text), ms, self.rowcount, fehler)
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+
+class TimedConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TimedCursor
+        self.page = None
+        self.db_ms = 0.0
+        self.queries = 0
+        self._start = None
+
+    def begin_render(self, page):
+        self.page = page
+        self.db_ms = 0.0
+        self.queries = 0
+        self._start = time.perf_counter()
+
+    def end_render(self):
+        if self._start is not None:
+            with _lock:
+                _renders.append((time.time(), self.page, self.queries, self.db_ms,
+                                 (time.perf_counter() - self._start) * 1000))
+        self.page = None
+        self._start = None
+
+    def take_over(self, other):
+        # Abfragen einer Hilfsverbindung (query_batch) diesem Seitenaufruf
+        # zurechnen; die Hilfsverbindung verbucht keinen eigenen Aufruf
+        self.queries += other.queries
+        self.db_ms += other.db_ms
+        other.queries, other.db_ms, other._start = 0, 0.0, None
+
+
+def _snapshot():
+    with _lock:
+        return list(_queries), list(_renders)
+
+
+def top_statements(n=10, order="max"):
+    """Anweisungen gruppiert nach SQL-Text, sortiert nach "max", "total" oder "count"."""
+    gruppen = {}
+    for _, page, sql, ms, rows, fehler in _snapshot()[0]:
+        g = gruppen.setdefault(normalize(sql), {"sql": normalize(sql), "count": 0, "total_ms": 0.0,
+                                                "max_ms": 0.0, "rows": 0, "errors": 0, "pages": set()})
+        g["count"] += 1
+        g["total_ms"] += ms
+        g["max_ms"] = max(g["max_ms"], ms)
+        g["rows"] += max(rows, 0)
+        g["errors"] += fehler
+        g["pages"].add(page)
+    for g in gruppen.values():
+        g["avg_ms"] = g["total_ms"] / g["count"]
+        g["pages"] = ", ".join(sorted(g["pages"]))
+    key = {"max": "max_ms", "total": "total_ms", "count": "count"}[order]
+    return sorted(gruppen.values(), key=lambda g: g[key], reverse=True)[:n]
+
+
+def recent_renders(n=20):
+    """Letzte Seitenaufrufe (neueste zuerst) mit Anzahl Anweisungen und DB-Zeit."""
+    return [{"zeit": ts, "page": page, "queries": q, "db_ms": db, "dauer_ms": dauer}
+            for ts, page, q, db, dauer in reversed(_snapshot()[1][-n:])]
+
+
+def page_summary():
+    """Je Seite: Aufrufe, durchschnittliche und maximale DB-Zeit je Aufruf."""
+    seiten = {}
+    for _, page, q, db, dauer in _snapshot()[1]:
+        s = seiten.setdefault(page, {"page": page, "renders": 0, "queries": 0, "db_ms": 0.0, "max_db_ms": 0.0})
+        s["renders"] += 1
+        s["queries"] += q
+        s["db_ms"] += db
+        s["max_db_ms"] = max(s["max_db_ms"], db)
+    for s in seiten.values():
+        s["avg_db_ms"] = s["db_ms"] / s["renders"]
+        s["avg_queries"] = s["queries"] / s["renders"]
+    return sorted(seiten.values(), key=lambda s: s["avg_db_ms"], reverse=True)
+
+
+def clear():
+    with _lock:
+        _queries.clear()
+        _renders.clear()
@@ -0,0 +1,28 @@
+import os
+import sys
+import threading
+
+# Startet die App wie "streamlit run main.py" und lädt dabei die schweren
+# Bibliotheken im Hintergrund vor. Streamlit führt die Seiten im selben
+# Prozess aus; nach einem Neustart (z.B. Update unter Einstellungen) muss der
+# erste Seitenaufruf so nicht mehr auf pandas, pyarrow & Co. warten.
+#
+# Aufruf:  python serve.py --server.port 8501 --server.address 0.0.0.0
+# Importzeiten je Seite:  python -m bench.import_profile
+
+VORLADEN = ["pandas", "pyarrow", "numpy", "psycopg2.extras", "fpdf"]
+
+
+def _vorladen():
+    for modul in VORLADEN:
+        try:
+            __import__(modul)
+        except ImportError:
+            pass
+
+
+if __name__ == "__main__":
+    threading.Thread(target=_vorladen, name="vorladen", daemon=True).start()
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
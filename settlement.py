@@ -0,0 +1,231 @@
+import calendar
+from datetime import date
+
+import numpy as np
+
+# Umlage der Betriebskosten (operating_expenses) auf die Mieter eines Jahres.
+# Die komplette Matrix Mieter x Kostenpositionen wird vektorisiert in einem
+# Durchgang berechnet (allocation_matrix). Mieter-Akte, Sammellauf (nk_batch.py)
+# und die Prüfung in 07_Ausgaben benutzen alle diese Funktionen.
+
+DEUTSCHE_SCHLUESSEL = {
+    "area": "m² Wohnfläche",
+    "persons": "Anzahl Personen",
+    "unit": "Wohneinheiten",
+    "direct": "Direktzuordnung"
+}
+
+TENANT_COLUMNS = ["id", "first_name", "last_name", "move_in", "move_out", "monthly_prepayment",
+                  "unit_name", "area", "occupants", "base_rent"]
+LANDLORD_COLUMNS = ["name", "street", "city", "iban", "bank", "total_area", "total_occupants", "total_units"]
+# Objekt der Betriebskosten: operating_expenses kennt noch kein Objekt, es wird
+# daher wie bisher ein Haus abgerechnet (bestehende Installationen: Objekt 1)
+DEFAULT_PROPERTY = 1
+
+
+def load_landlord(cur, property_id=DEFAULT_PROPERTY, jahr=None):
+    # Stammdaten aus landlord_settings, Summen des Objekts aus property_totals (per Trigger gepflegt, Migration 0006).
+    # total_occupants zählt nur die heutigen Mieter; mit jahr kommen die Personentage
+    # aller Mieter dieses Jahres dazu (Nenner des Schlüssels "persons")
+    cur.execute("""
+        SELECT l.name, l.street, l.city, l.iban, l.bank_name,
+               COALESCE(pt.total_area, 0), COALESCE(pt.total_occupants, 0), COALESCE(pt.total_units, 0)
+        FROM landlord_settings l
+        LEFT JOIN property_totals pt ON pt.property_id = %s
+        ORDER BY l.id LIMIT 1
+    """, (property_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    haus = dict(zip(LANDLORD_COLUMNS, row))
+    if jahr is not None:
+        haus["person_days"] = load_person_days(cur, jahr)
+        haus["avg_occupants"] = haus["person_days"] / _tage_im_jahr(jahr)
+    return haus
+
+
+def load_person_days(cur, jahr):
+    """Summe Personen x Nutzungstage aller Mieter des Jahres (wie load_tenants_for_year)."""
+    jan1, dez31 = date(jahr, 1, 1), date(jahr, 12, 31)
+    cur.execute("""
+        SELECT COALESCE(SUM(COALESCE(t.occupants, 0)
+                            * (LEAST(COALESCE(t.move_out, %(dez31)s), %(dez31)s)
+                               - GREATEST(COALESCE(t.move_in, %(jan1)s), %(jan1)s) + 1)), 0)
+        FROM tenants t
+        JOIN apartments a ON t.apartment_id = a.id
+        WHERE (t.move_in IS NULL OR t.move_in <= %(dez31)s)
+          AND (t.move_out IS NULL OR t.move_out >= %(jan1)s)
+    """, {"jan1": jan1, "dez31": dez31})
+    return int(cur.fetchone()[0])
+
+
+def load_tenant(cur, tenant_id):
+    cur.execute("""
+        SELECT t.id, t.first_name, t.last_name, t.move_in, t.move_out, t.monthly_prepayment,
+               a.unit_name, a.area, t.occupants, t.base_rent
+        FROM tenants t
+        JOIN apartments a ON t.apartment_id = a.id
+        WHERE t.id = %s
+    """, (tenant_id,))
+    row = cur.fetchone()
+    return dict(zip(TENANT_COLUMNS, row)) if row else None
+
+
+def load_tenants_for_year(cur, jahr):
+    # Alle Mieter, deren Mietverhältnis das Jahr zumindest teilweise abdeckt
+    cur.execute("""
+        SELECT t.id, t.first_name, t.last_name, t.move_in, t.move_out, t.monthly_prepayment,
+               a.unit_name, a.area, t.occupants, t.base_rent
+        FROM tenants t
+        JOIN apartments a ON t.apartment_id = a.id
+        WHERE (t.move_in IS NULL OR t.move_in <= %s)
+          AND (t.move_out IS NULL OR t.move_out >= %s)
+        ORDER BY t.last_name, t.first_name, t.id
+    """, (date(jahr, 12, 31), date(jahr, 1, 1)))
+    return [dict(zip(TENANT_COLUMNS, r)) for r in cur.fetchall()]
+
+
+def load_expenses(cur, jahr, tenant_id=None):
+    # Ohne tenant_id: alle Kosten des Jahres (Hauskosten und alle Direktkosten)
+    if tenant_id is None:
+        cur.execute("""
+            SELECT expense_type, amount, distribution_key, tenant_id
+            FROM operating_expenses WHERE expense_year = %s
+        """, (jahr,))
+    else:
+        cur.execute("""
+            SELECT expense_type, amount, distribution_key, tenant_id
+            FROM operating_expenses
+            WHERE expense_year = %s AND (tenant_id IS NULL OR tenant_id = %s)
+        """, (jahr, tenant_id))
+    return cur.fetchall()
+
+
+def _tage_im_jahr(jahr):
+    return 366 if calendar.isleap(jahr) else 365
+
+
+def allocation_matrix(tenants, haus, expenses, jahr):
+    """Anteile aller Mieter an allen Kostenpositionen eines Jahres in einem Durchgang.
+
+    tenants:  Liste von Mieter-Dicts (TENANT_COLUMNS), expenses: Zeilen aus load_expenses.
+    haus:     aus load_landlord; für den Schlüssel "persons" zählen Personentage
+              (haus["person_days"] aus load_landlord(..., jahr), sonst die der
+              übergebenen Mieter - dann müssen das alle Mieter des Jahres sein).
+    Liefert (anteile, gilt, tage): anteile und gilt sind (Mieter x Positionen)-Matrizen,
+    gilt markiert die Positionen, die in der Abrechnung des Mieters erscheinen;
+    tage sind die Nutzungstage je Mieter im Jahr.
+    """
+    n, m = len(tenants), len(expenses)
+    jan1, dez31 = date(jahr, 1, 1), date(jahr, 12, 31)
+
+    # Nutzungstage taggenau: Einzug/Auszug auf das Jahr begrenzt
+    start = np.array([t["move_in"] or jan1 for t in tenants], dtype="datetime64[D]").reshape(n)
+    ende = np.array([t["move_out"] or dez31 for t in tenants], dtype="datetime64[D]").reshape(n)
+    start = np.maximum(start, np.datetime64(jan1))
+    ende = np.minimum(ende, np.datetime64(dez31))
+    tage = np.clip((ende - start).astype(np.int64) + 1, 0, None)
+    zeit_faktor = tage / _tage_im_jahr(jahr)
+
+    ids = np.array([t["id"] for t in tenants], dtype=np.int64).reshape(n)
+    betrag = np.array([float(e[1]) for e in expenses], dtype=float).reshape(m)
+    schluessel = np.array([e[2] for e in expenses], dtype=object).reshape(m)
+    ziel = np.array([e[3] or 0 for e in expenses], dtype=np.int64).reshape(m)
+    direkt = ziel != 0
+
+    # Verteilungsbasis je Schlüssel (Anteil des Mieters am Haus), anteilig nach Nutzungstagen
+    basis = {
+        "area": ("Gesamtwohnfläche", haus["total_area"], [t["area"] for t in tenants]),
+        "unit": ("Wohneinheiten", haus["total_units"], [1] * n),
+    }
+    gewicht = np.zeros((n, m))
+    for key, (label, gesamt, werte) in basis.items():
+        spalten = (schluessel == key) & ~direkt
+        if not spalten.any():
+            continue
+        if not gesamt:
+            raise ValueError(f"{label} ist 0 (keine Wohnungen) – Schlüssel '{key}' kann nicht verteilt werden.")
+        anteil = np.array([float(w or 0) for w in werte], dtype=float).reshape(n) / float(gesamt)
+        gewicht[:, spalten] = (anteil * zeit_faktor)[:, None]
+
+    # Personen: Personentage des Mieters / Personentage aller Mieter des Jahres,
+    # damit Ein- und Auszüge im Jahr zusammen 100 % ergeben
+    spalten = (schluessel == "persons") & ~direkt
+    if spalten.any():
+        personentage = np.array([float(t["occupants"] or 0) for t in tenants], dtype=float).reshape(n) * tage
+        gesamt = haus.get("person_days")
+        if gesamt is None:
+            gesamt = personentage.sum()
+        if not gesamt:
+            raise ValueError(f"Personentage {jahr} sind 0 (keine Mieter mit Personen) – Schlüssel 'persons' kann nicht verteilt werden.")
+        gewicht[:, spalten] = (personentage / float(gesamt))[:, None]
+
+    # Direktkosten (z.B. Wallbox) nur für den zugeordneten Mieter
+    eigene = ids[:, None] == ziel[None, :]
+    gewicht[:, direkt] = (eigene * zeit_faktor[:, None])[:, direkt]
+
+    anteile = gewicht * betrag[None, :]
+    gilt = ~direkt[None, :] | eigene
+    return anteile, gilt, tage
+
+
+def allocate(tenants, haus, expenses, jahr):
+    """Abrechnungen aller übergebenen Mieter (gleiche Reihenfolge wie tenants)."""
+    anteile, gilt, tage = allocation_matrix(tenants, haus, expenses, jahr)
+    summen = np.where(gilt, anteile, 0.0).sum(axis=1)
+    voraus = np.array([float(t["monthly_prepayment"] or 0) for t in tenants]) * (tage / 30.4375)
+    jan1, dez31 = date(jahr, 1, 1), date(jahr, 12, 31)
+
+    schluessel_text = ["Direkt" if e[3] else DEUTSCHE_SCHLUESSEL.get(e[2], e[2]) for e in expenses]
+    gesamt_text = [f"{float(e[1]):.2f}" for e in expenses]
+
+    # Nur noch Formatierung: Python-Listen statt numpy-Einzelzugriffe
+    anteile_l, summen_l, voraus_l, tage_l = anteile.tolist(), summen.tolist(), voraus.tolist(), tage.tolist()
+    ergebnis = []
+    for i, mieter in enumerate(tenants):
+        zeile = anteile_l[i]
+        rows = [
+            {"Kostenart": expenses[j][0], "Gesamtkosten": gesamt_text[j],
+             "Schlüssel": schluessel_text[j], "Ihr Anteil": f"{zeile[j]:.2f}"}
+            for j in np.flatnonzero(gilt[i]).tolist()
+        ]
+        m_start = max(mieter["move_in"] or jan1, jan1)
+        m_ende = min(mieter["move_out"] or dez31, dez31)
+        ein = mieter["move_in"].strftime('%d.%m.%Y') if mieter["move_in"] else "unbekannt"
+        aus = mieter["move_out"].strftime('%d.%m.%Y') if mieter["move_out"] else "laufend"
+        summe = summen_l[i]
+        ergebnis.append({
+            "tenant_id": mieter["id"],
+            "jahr": jahr,
+            "mieter": f"{mieter['first_name']} {mieter['last_name']}",
+            "wohnung": str(mieter["unit_name"]),
+            "zeitraum": f"{m_start.strftime('%d.%m.%Y')} - {m_ende.strftime('%d.%m.%Y')}",
+            "zeitraum_anzeige": f"von {ein} bis {aus}",
+            "tage": tage_l[i],
+            "rows": rows,
+            "summe": summe,
+            "voraus": voraus_l[i],
+            "saldo": summe - voraus_l[i],
+        })
+    return ergebnis
+
+
+def compute_settlement(mieter, haus, expenses, jahr):
+    """Abrechnung eines einzelnen Mieters (Direktkosten anderer Mieter werden ignoriert).
+
+    haus muss aus load_landlord(cur, jahr=jahr) stammen (Personentage des Jahres).
+    """
+    return allocate([mieter], haus, expenses, jahr)[0]
+
+
+def pdf_stats(mieter, haus):
+    # Zusatzangaben für den Kopf der PDF-Abrechnung
+    m_stats = {"area": float(mieter["area"] or 0), "occupants": int(mieter["occupants"] or 0)}
+    h_stats = {
+        "name": haus["name"], "street": haus["street"], "city": haus["city"],
+        "iban": haus["iban"], "bank": haus["bank"],
+        "total_area": float(haus["total_area"] or 0),
+        # Nenner der Personen-Umlage: Personen im Jahresmittel (Personentage / Tage), sonst heute
+        "total_occupants": round(haus["avg_occupants"], 2) if "avg_occupants" in haus else int(haus["total_occupants"] or 0),
+    }
+    return m_stats, h_stats
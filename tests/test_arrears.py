@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+
+import pytest
+
+from arrears import BUCKETS, aging_report
+from database import get_conn
+
+FAELLIG = date(2025, 1, 1)
+
+
+@pytest.fixture
+def conn():
+    # Braucht nur einen PostgreSQL-Server: temporäre Tabellen verdecken die echten
+    # (pg_temp steht vorne im search_path) und verschwinden mit dem Rollback
+    conn = get_conn()
+    if conn is None:
+        pytest.skip("Keine Datenbankverbindung")
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE apartments (id INTEGER, unit_name TEXT) ON COMMIT DROP;
+        CREATE TEMP TABLE tenants (id INTEGER, first_name TEXT, last_name TEXT, apartment_id INTEGER,
+                                   move_in DATE, move_out DATE, base_rent NUMERIC, monthly_prepayment NUMERIC)
+            ON COMMIT DROP;
+        CREATE TEMP TABLE payments (tenant_id INTEGER, amount NUMERIC, payment_date DATE) ON COMMIT DROP;
+        INSERT INTO apartments VALUES (1, 'EG');
+        -- Genau eine Sollstellung über 100 €, fällig am 01.01.2025
+        INSERT INTO tenants VALUES (1, 'Max', 'Muster', 1, '2025-01-01', '2025-01-31', 80, 20);
+    """)
+    cur.close()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.mark.parametrize("tage, stufe", [
+    (0, 0), (30, 0),
+    (31, 1), (60, 1),
+    (61, 2), (90, 2),
+    (91, 3),
+])
+def test_stufengrenzen(conn, tage, stufe):
+    rows, totals = aging_report(conn, FAELLIG + timedelta(days=tage))
+    assert len(rows) == 1
+    assert [rows[0][b] for b in BUCKETS] == [100.0 if i == stufe else 0.0 for i in range(4)]
+    assert totals[BUCKETS[stufe]] == totals["gesamt"] == 100.0
+    assert rows[0]["aelteste"] == FAELLIG
+
+
+def test_zahlungen_bis_einschliesslich_stichtag(conn):
+    stichtag = FAELLIG + timedelta(days=45)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO payments VALUES (1, 30, %s), (1, 50, %s)", (stichtag, stichtag + timedelta(days=1)))
+    cur.close()
+    rows, totals = aging_report(conn, stichtag)
+    # Die Zahlung am Stichtag zählt, die vom Folgetag nicht
+    assert rows[0][BUCKETS[1]] == 70.0
+    assert totals["gesamt"] == 70.0
+
+
+def test_einzug_nach_stichtag_ohne_rueckstand(conn):
+    rows, totals = aging_report(conn, FAELLIG - timedelta(days=1))
+    assert rows == []
+    assert totals["gesamt"] == 0.0
@@ -0,0 +1,105 @@
+import math
+from datetime import date
+
+import pandas as pd
+
+from bank_import import commit_payments, fingerprints, parse_amounts, parse_dates
+
+
+def test_betraege_deutsch_und_englisch():
+    werte = parse_amounts(pd.Series(["1.234,56 €", "-50,00", "12.50", "1,5", "EUR 300"])).tolist()
+    assert werte == [1234.56, -50.0, 12.5, 1.5, 300.0]
+
+
+def test_betrag_mit_beiden_trennzeichen_nach_dem_letzten():
+    werte = parse_amounts(pd.Series(["1,234.56", "1.234,56", "1,234,567.89"])).tolist()
+    assert werte == [1234.56, 1234.56, 1234567.89]
+
+
+def test_unlesbare_betraege_werden_nan():
+    werte = parse_amounts(pd.Series(["abc", "1.2.3", "", None]))
+    assert all(math.isnan(w) for w in werte)
+
+
+def test_datumsformate():
+    werte = parse_dates(pd.Series(["31.12.2025", "01.02.25", "2025-03-04", "gestern", None])).tolist()
+    assert werte == [date(2025, 12, 31), date(2025, 2, 1), date(2025, 3, 4), None, None]
+
+
+def _buchungen(**spalten):
+    daten = {"Datum": ["01.03.2025", "01.03.2025", "02.03.2025"],
+             "Betrag": [500.0, 500.0, 80.0],
+             "Zweck": ["Miete  März", "Miete März", "Nebenkosten"]}
+    daten.update(spalten)
+    return pd.DataFrame(daten)
+
+
+def test_fingerabdruck_stabil_und_gleiche_buchungen_unterscheidbar():
+    fp = fingerprints(_buchungen())
+    # Leerzeichen im Zweck zählen nicht, gleiche Buchungen werden durchnummeriert
+    assert fp[0] != fp[1]
+    # Überlappende Datei (ISO-Datum, Betrag als Text) ergibt dieselben Werte
+    erneut = fingerprints(_buchungen(Datum=["2025-03-01", "2025-03-01", "2025-03-02"],
+                                     Betrag=["500", "500.00", "80"]))
+    assert fp.tolist() == erneut.tolist()
+
+
+class _Cursor:
+    def __init__(self, bekannt):
+        self.bekannt = bekannt
+        self.kopiert = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().startswith("INSERT INTO payments"):
+            self.rowcount = len(self.kopiert) - self.bekannt
+        else:
+            self.rowcount = 0
+
+    def copy_expert(self, sql, buf):
+        self.kopiert = buf.read().splitlines()
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, bekannt=0):
+        self.cur = _Cursor(bekannt)
+        self.committed = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def test_speichern_zaehlt_unbekannte_fehlerhafte_und_doppelte():
+    results = [
+        {"Datum": date(2025, 3, 1), "Betrag": 500.0, "Zweck": "Miete", "Mieter": "Muster, Max"},
+        {"Datum": date(2025, 3, 1), "Betrag": float("nan"), "Zweck": "Miete", "Mieter": "Muster, Max"},
+        {"Datum": None, "Betrag": 80.0, "Zweck": "NK", "Mieter": "Muster, Max"},
+        {"Datum": date(2025, 3, 2), "Betrag": 70.0, "Zweck": "?", "Mieter": "Unbekannt"},
+        {"Datum": date(2025, 3, 3), "Betrag": 90.0, "Zweck": "NK", "Mieter": "Muster, Max"},
+    ]
+    conn = _Conn(bekannt=1)
+    summary = commit_payments(conn, results, {"Muster, Max": 7})
+
+    assert summary == {"inserted": 1, "skipped": 1, "failed": 2, "duplicates": 1}
+    assert conn.committed
+    assert [z.split(",")[:3] for z in conn.cur.kopiert] == [["7", "500.00", "2025-03-01"], ["7", "90.00", "2025-03-03"]]
+
+
+def test_speichern_ohne_zeilen():
+    assert commit_payments(_Conn(), [], {}) == {"inserted": 0, "skipped": 0, "failed": 0, "duplicates": 0}
+
+
+def test_fingerabdruck_unabhaengig_von_der_kontospalte():
+    # Dieselbe Datei mit und ohne gewählte Konto-Spalte darf nicht doppelt verbuchen
+    ohne = fingerprints(_buchungen(Konto=["", "", ""]))
+    mit = fingerprints(_buchungen(Konto=["DE02 1203 0000 0000 2020 51", "DE89370400440532013000", ""]))
+    assert ohne.tolist() == mit.tolist() == fingerprints(_buchungen()).tolist()
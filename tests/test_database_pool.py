@@ -0,0 +1,63 @@
+import types
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+import database
+
+
+class _Verbindung:
+    # Genug von psycopg2.connection für den Pool und db_conn
+    def __init__(self, *args, **kwargs):
+        self.closed = 0
+        self.info = types.SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        database._count("connects")
+
+    def close(self):
+        self.closed = 1
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def begin_render(self, page):
+        pass
+
+    def end_render(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(psycopg2.pool.psycopg2, "connect", _Verbindung)
+    monkeypatch.setattr(database, "_pool", None)
+    monkeypatch.setattr(database, "POOL_MIN", 1)
+    yield
+    database.close_idle_connections()
+
+
+def test_zaehler_fuer_freie_und_vergebene_verbindungen(pool):
+    with database.db_conn() as a:
+        with database.db_conn() as b:
+            stats = database.pool_stats()
+            assert (stats["open"], stats["idle"], stats["in_use"]) == (2, 0, 2)
+    # Der Pool behält nur POOL_MIN freie Verbindungen und schließt den Rest
+    assert not b.closed and a.closed
+    stats = database.pool_stats()
+    assert (stats["open"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+
+
+def test_ausmustern_schliesst_freie_und_spaeter_zurueckgegebene(pool):
+    with database.db_conn() as vergeben:
+        with database.db_conn() as frei:
+            pass
+        database.close_idle_connections()
+        assert frei.closed and not vergeben.closed
+        # Neue Ausleihen kommen aus einem neuen Pool
+        with database.db_conn() as neu:
+            assert neu.owner is not vergeben.owner
+    assert vergeben.closed and not neu.closed
+    assert database.pool_stats()["idle"] == 1
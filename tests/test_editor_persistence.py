@@ -0,0 +1,41 @@
+from datetime import date
+
+import pandas as pd
+
+from editor_persistence import compute_changes, shown_frame
+
+COLUMNS = {"amount": ("amount", "numeric"), "payment_date": ("payment_date", "date")}
+
+
+def _zahlungen(*ids):
+    # Neueste zuerst, wie fetch_page
+    return pd.DataFrame({
+        "id": list(ids),
+        "amount": [float(i * 100) for i in ids],
+        "payment_date": [date(2025, 1, i) for i in ids],
+    })
+
+
+def test_eingefuegte_zeile_verschiebt_update_nicht():
+    session = {}
+    angezeigt = shown_frame(session, "editor", _zahlungen(2, 1))
+    # Nutzer ändert die erste angezeigte Zeile (id 2) und löscht die zweite (id 1)
+    session["editor"] = {"edited_rows": {0: {"amount": 250.0}}, "added_rows": [], "deleted_rows": [1]}
+
+    # Vor dem Speichern fügt eine andere Sitzung eine neuere Zahlung ein
+    neu_geladen = _zahlungen(3, 2, 1)
+    df = shown_frame(session, "editor", neu_geladen)
+    updates, inserts, deletes = compute_changes(df, session["editor"], "id", COLUMNS)
+
+    assert df is angezeigt
+    assert updates == [(2, 250.0, date(2025, 1, 2))]
+    assert deletes == [1]
+    assert inserts == []
+
+
+def test_ohne_offene_aenderungen_werden_neue_daten_angezeigt():
+    session = {}
+    shown_frame(session, "editor", _zahlungen(2, 1))
+    session["editor"] = {"edited_rows": {}, "added_rows": [], "deleted_rows": []}
+    df = shown_frame(session, "editor", _zahlungen(3, 2, 1))
+    assert df["id"].tolist() == [3, 2, 1]
@@ -0,0 +1,25 @@
+from keyword_matcher import KeywordMatcher
+
+
+def test_kuerzerer_begriff_in_weiterem_vorkommen_ist_keine_konkurrenz():
+    m = KeywordMatcher({"kader": 3, "kad": 4})
+    treffer = m.match("Kader KADER")
+    assert treffer.tenant_id == 3
+    assert treffer.keyword == "kader"
+    assert treffer.candidates == (3,)
+    assert not treffer.ambiguous
+
+
+def test_eigenstaendiger_kuerzerer_begriff_bleibt_kandidat():
+    m = KeywordMatcher({"kader": 3, "kad": 4})
+    treffer = m.match("Kader Kad Miete")
+    assert treffer.tenant_id == 3
+    assert treffer.candidates == (3, 4)
+    assert treffer.ambiguous
+
+
+def test_gleich_lange_begriffe_verschiedener_mieter():
+    m = KeywordMatcher({"miete og": 1, "miete eg": 2})
+    treffer = m.match("Miete OG und Miete EG")
+    assert treffer.tenant_id is None
+    assert treffer.ambiguous
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from database import get_conn
+
+
+@pytest.fixture
+def zwei_verbindungen():
+    # Braucht eine migrierte Datenbank (DB_NAME) mit mindestens einem Mieter
+    a = get_conn()
+    if a is None:
+        pytest.skip("Keine Datenbankverbindung")
+    b = get_conn()
+    yield a, b
+    for conn in (a, b):
+        conn.rollback()
+        conn.close()
+
+
+def test_gleichzeitige_neuberechnung_desselben_mieters(zwei_verbindungen):
+    a, b = zwei_verbindungen
+    cur = a.cursor()
+    cur.execute("SELECT min(id) FROM tenants")
+    t_id = cur.fetchone()[0]
+    if t_id is None:
+        pytest.skip("Keine Mieter in der Datenbank")
+
+    # Erster Lauf hält seine Transaktion offen ...
+    cur.execute("SELECT refresh_tenant_ledger(%s)", ([t_id],))
+
+    # ... der zweite (z.B. ensure_current einer anderen Sitzung) muss warten
+    fehler = []
+
+    def zweiter_lauf():
+        try:
+            with b.cursor() as cur_b:
+                cur_b.execute("SELECT refresh_tenant_ledger(%s)", ([t_id],))
+            b.commit()
+        except Exception as e:
+            fehler.append(e)
+
+    thread = threading.Thread(target=zweiter_lauf)
+    thread.start()
+    thread.join(0.5)
+    assert thread.is_alive(), "zweiter Lauf hätte auf den ersten warten müssen"
+
+    a.commit()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert fehler == []
+
+    cur.execute("""
+        SELECT count(*), count(DISTINCT month) FROM tenant_ledger_monthly WHERE tenant_id = %s
+    """, (t_id,))
+    anzahl, monate = cur.fetchone()
+    assert anzahl == monate > 0
+    cur.close()
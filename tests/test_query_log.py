@@ -0,0 +1,31 @@
+import types
+
+import query_log
+from query_log import TimedCursor, template
+
+
+def _ausfuehren(sql):
+    # Wie TimedCursor.execute, nur ohne Datenbank
+    cur = types.SimpleNamespace(connection=types.SimpleNamespace(page="test", db_ms=0.0, queries=0), rowcount=2)
+    query_log.clear()
+    TimedCursor._timed(cur, lambda q, *args: None, sql)
+    return query_log._snapshot()[0][-1][2]
+
+
+def test_execute_values_speichert_keine_werte():
+    # So kommt ein execute_values aus editor_persistence beim Cursor an
+    sql = ("INSERT INTO payments (tenant_id, amount, payment_date, note) VALUES "
+           "(7::integer,1234.56::numeric,'2025-03-01'::date,'Miete Max Müller DE02120300000000202051'::varchar),"
+           "(8::integer, -50.0::numeric,'2025-03-02'::date,'O''Brien'::varchar)").encode("utf-8")
+    gespeichert = _ausfuehren(sql)
+    for wert in ("Müller", "DE02", "1234.56", "50.0", "2025-03", "O''Brien", "7::", "8::"):
+        assert wert not in gespeichert
+    assert gespeichert == ("INSERT INTO payments (tenant_id, amount, payment_date, note) VALUES "
+                           "(?::integer,?::numeric,?::date,?::varchar), ...")
+
+
+def test_vorlage_mit_platzhaltern_bleibt_gruppierbar():
+    sql = "SELECT id FROM tenants t1 WHERE last_name = %s AND t1.id > %(id)s"
+    assert template(sql) == sql
+    assert template("SELECT * FROM payments WHERE amount > 100 AND note = 'x'") == \
+        "SELECT * FROM payments WHERE amount > ? AND note = ?"
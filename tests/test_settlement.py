@@ -0,0 +1,91 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from settlement import allocate, allocation_matrix, compute_settlement
+
+JAHR = 2025
+HAUS = {"total_area": 100.0, "total_units": 2, "total_occupants": 4}
+
+
+def _mieter(t_id, wohnung, flaeche, personen, einzug=None, auszug=None):
+    return {"id": t_id, "first_name": "M", "last_name": str(t_id), "move_in": einzug, "move_out": auszug,
+            "monthly_prepayment": 100.0, "unit_name": wohnung, "area": flaeche, "occupants": personen,
+            "base_rent": 500.0}
+
+
+# Wohnung A (60 m²) wechselt zum 01.07. den Mieter, Wohnung B (40 m²) ganzjährig belegt
+MIETER = [
+    _mieter(1, "A", 60, 2, date(2020, 1, 1), date(2025, 6, 30)),
+    _mieter(2, "A", 60, 1, date(2025, 7, 1)),
+    _mieter(3, "B", 40, 3),
+]
+AUSGABEN = [
+    ("Grundsteuer", 1000.0, "area", None),
+    ("Müllabfuhr", 730.0, "persons", None),
+    ("Hausmeister", 600.0, "unit", None),
+    ("Wallbox", 365.0, "direct", 1),
+]
+
+
+def test_tage_bei_mieterwechsel():
+    _, _, tage = allocation_matrix(MIETER, HAUS, AUSGABEN, JAHR)
+    assert tage.tolist() == [181, 184, 365]
+
+
+def test_umlage_ergibt_je_schluessel_die_gesamtkosten():
+    anteile, gilt, _ = allocation_matrix(MIETER, HAUS, AUSGABEN[:3], JAHR)
+    # Haus voll vermietet: Fläche, Einheiten und Personen verteilen zusammen genau 100 %
+    np.testing.assert_allclose(anteile.sum(axis=0), [1000.0, 730.0, 600.0])
+    assert gilt.all()
+
+
+def test_personentage_als_nenner():
+    anteile, _, _ = allocation_matrix(MIETER, HAUS, [AUSGABEN[1]], JAHR)
+    personentage = 2 * 181 + 1 * 184 + 3 * 365
+    np.testing.assert_allclose(anteile[:, 0], np.array([2 * 181, 184, 3 * 365]) / personentage * 730.0)
+
+    # Einzelabrechnung mit den Personentagen des Jahres aus load_landlord(..., jahr)
+    haus = dict(HAUS, person_days=personentage)
+    nk = compute_settlement(MIETER[1], haus, [AUSGABEN[1]], JAHR)
+    assert nk["summe"] == pytest.approx(anteile[1, 0])
+
+
+def test_unterjaehrige_mieter_tragen_flaeche_und_einheit_anteilig():
+    anteile, _, _ = allocation_matrix(MIETER, HAUS, [AUSGABEN[0], AUSGABEN[2]], JAHR)
+    np.testing.assert_allclose(anteile[0], [600.0 * 181 / 365, 300.0 * 181 / 365])
+    np.testing.assert_allclose(anteile[1], [600.0 * 184 / 365, 300.0 * 184 / 365])
+    np.testing.assert_allclose(anteile[2], [400.0, 300.0])
+
+
+def test_direktkosten_nur_fuer_den_zugeordneten_mieter():
+    anteile, gilt, _ = allocation_matrix(MIETER, HAUS, AUSGABEN, JAHR)
+    assert gilt[:, 3].tolist() == [True, False, False]
+    assert anteile[0, 3] == pytest.approx(365.0 * 181 / 365)
+    assert anteile[1:, 3].tolist() == [0.0, 0.0]
+
+    ergebnis = allocate(MIETER, HAUS, AUSGABEN, JAHR)
+    assert [r["Kostenart"] for r in ergebnis[1]["rows"]] == ["Grundsteuer", "Müllabfuhr", "Hausmeister"]
+    assert ergebnis[0]["summe"] == pytest.approx(anteile[0].sum())
+
+
+@pytest.mark.parametrize("haus, ausgabe", [
+    (dict(HAUS, total_area=0), ("Grundsteuer", 100.0, "area", None)),
+    (dict(HAUS, total_units=0), ("Hausmeister", 100.0, "unit", None)),
+    (dict(HAUS, person_days=0), ("Müllabfuhr", 100.0, "persons", None)),
+])
+def test_nenner_null(haus, ausgabe):
+    with pytest.raises(ValueError):
+        allocation_matrix(MIETER, haus, [ausgabe], JAHR)
+
+
+def test_personen_ohne_personentage_der_mieter():
+    leer = [dict(m, occupants=0) for m in MIETER]
+    with pytest.raises(ValueError, match="Personentage 2025"):
+        allocation_matrix(leer, HAUS, [AUSGABEN[1]], JAHR)
+
+
+def test_nenner_null_ohne_passende_kosten_ist_kein_fehler():
+    anteile, _, _ = allocation_matrix(MIETER, dict(HAUS, total_area=0), [AUSGABEN[2]], JAHR)
+    assert anteile.sum() == pytest.approx(600.0)
@@ -13,6 +13,9 @@ echo "📦 Aktualisiere Python-Pakete..."
 ./venv/bin/pip install -r requirements.txt --upgrade 2>/dev/null || ./venv/bin/pip install streamlit pandas psycopg2-binary fpdf python-dotenv
 
 
+# 3. Datenbank-Schema aktualisieren (nummerierte Migrationen)
+echo "🗄️ Spiele Datenbank-Migrationen ein..."
+./venv/bin/python migrate.py || { echo "❌ Migration fehlgeschlagen!"; exit 1; }
 
 echo "✅ Update erfolgreich abgeschlossen!"
 # In deinem update_app.sh statt der alten Restart-Zeile: